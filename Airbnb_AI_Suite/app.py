@@ -1,19 +1,59 @@
 import os
 os.environ['KMP_DUPLICATE_LIB_OK']='True'
-os.environ['OMP_NUM_THREADS'] = '1'
+# Default 1 thread per inference thread (executors below run in parallel), can be overridden
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+import time
 import uvicorn
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import json
+from typing import List
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+import numpy as np
 import pandas as pd
-from src.pipeline.predict_pipeline import PredictPipeline, CustomData
+from src.pipeline.predict_pipeline import PredictPipeline, CustomData, FEATURE_COLUMNS
 from src.components.genai_engine import GenAIEngine
+from src.components.model_registry import get_model_registry, ModelNotReady
+from src.pipeline.micro_batcher import MicroBatcher, MicroBatcherConfig
+from src.pipeline.prediction_cache import PredictionCache, PredictionCacheConfig
+from src.pipeline.inference_executor import (
+    InferenceExecutor, InferenceExecutorConfig, ExecutorOverloaded, RouteLatencyMetrics
+)
+from src.exception import CustomException
+from src.logger import logging
+
+# Startup / Shutdown
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load Model + Preprocessor once, then watch artifacts for new versions
+    model_registry = get_model_registry()
+    model_registry.load()
+    model_registry.start_watcher()
+    
+    # Load FAISS Index + Metadata + Encoder before first request
+    # (Price API should still come up if Vector DB is not built yet)
+    try:
+        genai_engine.warm_up()
+    except CustomException as e:
+        logging.info(f"GenAI warm up skipped: {e}")
+    
+    # Start collecting concurrent /predict calls into batches
+    await price_batcher.start()
+    yield
+    await price_batcher.stop()
+    model_registry.stop_watcher()
+    prediction_cache.close()
+    search_executor.shutdown()
+    predict_executor.shutdown()
 
 # 1. App Initialize
 app = FastAPI(
     title="Airbnb AI Suite API",
     description="API for Price Prediction & GenAI Search",
-    version="1.0"
+    version="1.0",
+    lifespan=lifespan
 )
 
 # CORS Middleware
@@ -29,20 +69,115 @@ app.add_middleware(
 genai_engine = GenAIEngine()
 predict_pipeline = PredictPipeline()
 
+# 3. Separate Threads for Search and Prediction (+ queue limit -> 503)
+search_executor = InferenceExecutor("search", InferenceExecutorConfig(
+    threads=int(os.environ.get("SEARCH_THREADS", 2)),
+    max_pending=int(os.environ.get("SEARCH_MAX_PENDING", 32))
+))
+predict_executor = InferenceExecutor("predict", InferenceExecutorConfig(
+    threads=int(os.environ.get("PREDICT_THREADS", 2)),
+    max_pending=int(os.environ.get("PREDICT_MAX_PENDING", 256))
+))
+route_latency = RouteLatencyMetrics()
+
+@app.exception_handler(ExecutorOverloaded)
+async def overloaded_handler(request: Request, exc: ExecutorOverloaded):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after_seconds)}
+    )
+
+@app.exception_handler(ModelNotReady)
+async def model_not_ready_handler(request: Request, exc: ModelNotReady):
+    # Watcher picks up the release once training publishes it
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Model is not ready yet"},
+        headers={"Retry-After": str(exc.retry_after_seconds)}
+    )
+
+@app.middleware("http")
+async def record_route_latency(request: Request, call_next):
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        route_latency.record(
+            route.path if route is not None else "unmatched",
+            status_code,
+            (time.perf_counter() - started) * 1000
+        )
+
+def predict_rows(rows):
+    '''
+    Stacked /predict rows -> one transform + one predict
+    (compiled preprocessor, no DataFrame on this path)
+    '''
+    return predict_pipeline.predict_records(rows)
+
+# Micro Batching (Window / Size can be tuned from env)
+price_batcher = MicroBatcher(
+    predict_fn=predict_rows,
+    config=MicroBatcherConfig(
+        max_batch_size=int(os.environ.get("PREDICT_BATCH_MAX_SIZE", 64)),
+        max_wait_ms=float(os.environ.get("PREDICT_BATCH_WAIT_MS", 5))
+    ),
+    executor=predict_executor.executor
+)
+
+# Prediction Cache (PREDICTION_CACHE_BACKEND=sqlite / redis shares it between workers)
+prediction_cache = PredictionCache(
+    feature_columns=FEATURE_COLUMNS,
+    config=PredictionCacheConfig(
+        max_entries=int(os.environ.get("PREDICTION_CACHE_SIZE", 100000)),
+        ttl_seconds=float(os.environ.get("PREDICTION_CACHE_TTL", 3600)),
+        shared_backend=os.environ.get("PREDICTION_CACHE_BACKEND", "none"),
+        redis_url=os.environ.get("PREDICTION_CACHE_REDIS_URL", "redis://localhost:6379/0")
+    )
+)
+
 # Health Check Route
 @app.get("/")
-def home():
+async def home():
     return {"message": "Airbnb AI Engine is Running!"}
 
 # GenAI Search Route
 @app.get("/search")
-def search_listings(query: str):
+async def search_listings(query: str):
     '''
     Example: /search?query=apartment near park
     '''
-    results = genai_engine.search_listings(query)
+    with search_executor.admit():
+        results = await search_executor.run(genai_engine.search_listings, query)
     return {"results": results}
 
+# Batch GenAI Search Route
+class SearchBatchInput(BaseModel):
+    queries: List[str]
+    top_k: int = 3
+
+@app.post("/search/batch")
+async def search_listings_batch(input_data: SearchBatchInput):
+    '''
+    Example body: {"queries": ["apartment near park", "loft in soho"], "top_k": 3}
+    '''
+    with search_executor.admit():
+        results = await search_executor.run(genai_engine.search_many, input_data.queries, top_k=input_data.top_k)
+    return {"results": [
+        {"query": query, "results": query_results}
+        for query, query_results in zip(input_data.queries, results)
+    ]}
+
+# Embedding Cache Metrics
+@app.get("/metrics/embedding_cache")
+async def embedding_cache_metrics():
+    return genai_engine.embedding_cache.stats()
+
 # Price Prediction Route
 class ListingInput(BaseModel):
     neighbourhood_group: str
@@ -57,33 +192,109 @@ class ListingInput(BaseModel):
     availability_365: int
     
 @app.post("/predict")
-def predict_price(input_data: ListingInput):
-    # 1. Convert Input JSON to Object
-    data = CustomData(
-        neighbourhood_group=input_data.neighbourhood_group,
-        neighbourhood=input_data.neighbourhood,
-        latitude=input_data.latitude,
-        longitude=input_data.longitude,
-        room_type=input_data.room_type,
-        minimum_nights=input_data.minimum_nights,
-        number_of_reviews=input_data.number_of_reviews,
-        reviews_per_month=input_data.reviews_per_month,
-        calculated_host_listings_count=input_data.calculated_host_listings_count,
-        availability_365=input_data.availability_365
-    )
+async def predict_price(input_data: ListingInput):
+    row = input_data.model_dump()
     
-    # 2. Convert to DataFrame
-    df = data.get_data_as_data_frame()
+    # 1. Same listing + same live model -> reuse earlier prediction
+    # (no model loaded yet -> ModelNotReady -> 503)
+    model_version = get_model_registry().get().version
+    pred_log = await prediction_cache.aget(row, model_version)
     
-    # 3. Predict
-    pred_log = predict_pipeline.predict(df)
+    # 2. Otherwise queue the row, micro batcher predicts it together with concurrent requests
+    if pred_log is None:
+        with predict_executor.admit():
+            pred_log = await price_batcher.submit(row)
+        await prediction_cache.aset(row, model_version, pred_log)
     
-    # 4. Inverse Log (Original Price)
-    import numpy as np
-    final_price = np.expm1(pred_log[0])
+    # 3. Inverse Log (Original Price)
+    final_price = np.expm1(float(pred_log))
     
     return {"predicted_price": float(final_price)}
 
+# Micro Batching Metrics
+@app.get("/metrics/batching")
+async def batching_metrics():
+    return price_batcher.metrics.snapshot()
+
+# Executor + Per Route Latency Metrics
+@app.get("/metrics/latency")
+async def latency_metrics():
+    return {
+        "executors": {"search": search_executor.stats(), "predict": predict_executor.stats()},
+        "routes": route_latency.snapshot(),
+    }
+
+# Prediction Cache Metrics (hit rate)
+@app.get("/metrics/prediction_cache")
+async def prediction_cache_metrics():
+    return prediction_cache.stats()
+
+async def stream_batch_prices(df):
+    '''
+    Runs whole DataFrame through preprocessor + model chunk by chunk
+    (in predict executor) and streams one JSON line per listing (NDJSON).
+    Holds one predict slot until the stream ends, is cancelled (client gone)
+    or fails. Start it with open_batch_stream.
+    '''
+    predict_executor.acquire()
+    try:
+        # First step only takes the slot (see open_batch_stream)
+        yield ""
+        ids = df["id"].tolist() if "id" in df.columns else None
+        chunks = predict_pipeline.iter_predict_batch(df)
+        
+        while True:
+            chunk = await predict_executor.run(next, chunks, None)
+            if chunk is None:
+                break
+            start, pred_log = chunk
+            prices = np.expm1(pred_log)
+            lines = []
+            for offset, price in enumerate(prices):
+                row = {"index": start + offset, "predicted_price": float(price)}
+                if ids is not None:
+                    row["id"] = ids[start + offset]
+                lines.append(json.dumps(row))
+            yield "\n".join(lines) + "\n"
+    finally:
+        predict_executor.release()
+
+async def open_batch_stream(df):
+    '''
+    Takes the predict slot before the response starts, so overload is a
+    503 and not a broken 200 stream. Slot belongs to the generator: a
+    stream that is dropped without being read is closed by the event loop
+    and releases it too.
+    '''
+    stream = stream_batch_prices(df)
+    await stream.__anext__()
+    return StreamingResponse(stream, media_type="application/x-ndjson")
+
+# Batch Price Prediction Route (JSON Array)
+@app.post("/predict/batch")
+async def predict_price_batch(input_data: List[ListingInput]):
+    '''
+    Example body: [{...listing 1...}, {...listing 2...}]
+    Response: one {"index", "predicted_price"} JSON per line
+    '''
+    df = CustomData.get_batch_as_data_frame([item.model_dump() for item in input_data])
+    # 503 now, not in the middle of a stream
+    get_model_registry().get()
+    return await open_batch_stream(df)
+
+# Batch Price Prediction Route (CSV / Parquet Upload)
+@app.post("/predict/batch/file")
+async def predict_price_batch_file(file: UploadFile = File(...)):
+    get_model_registry().get()
+    try:
+        with predict_executor.admit():
+            df = await predict_executor.run(CustomData.read_batch_file, file.file, file.filename)
+    except CustomException as e:
+        # Details (paths, parser errors) only in the log
+        logging.info(f"Batch file '{file.filename}' rejected: {e}")
+        raise HTTPException(status_code=400, detail="Could not read file: upload a CSV or Parquet file with the listing columns")
+    return await open_batch_stream(df)
+
 # Run Server (For Debugging)
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
@@ -1,19 +1,92 @@
 import os
 import sys
+from contextlib import ExitStack
 from src.exception import CustomException
 from src.logger import logging
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from sklearn.model_selection import train_test_split
 from dataclasses import dataclass
 from src.utils import get_database_connection
 
+# Explicit dtypes: pandas doesn't guess per chunk (and no object columns for numbers)
+LISTING_DTYPES = {
+    "id": "int64",
+    "name": "object",
+    "host_id": "int64",
+    "host_name": "object",
+    "neighbourhood_group": "object",
+    "neighbourhood": "object",
+    "latitude": "float64",
+    "longitude": "float64",
+    "room_type": "object",
+    "price": "float64",
+    "minimum_nights": "int64",
+    "number_of_reviews": "int64",
+    "last_review": "object",
+    "reviews_per_month": "float64",
+    "calculated_host_listings_count": "int64",
+    "availability_365": "int64",
+}
+
+# Stored as dictionary (category) columns in Parquet, so they are not re-inferred
+CATEGORY_COLUMNS = ("neighbourhood_group", "neighbourhood", "room_type")
+
 # 1. Configuration
 @dataclass
 class DataIngestionConfig:
-    # Will Create this 3 files in Artifacts folder
-    train_data_path: str = os.path.join('artifacts', "train.csv")
-    test_data_path: str = os.path.join('artifacts', "test.csv")
+    # Typed columnar split files for next stages
+    train_data_path: str = os.path.join('artifacts', "train.parquet")
+    test_data_path: str = os.path.join('artifacts', "test.parquet")
+    # CSV copies only if export_csv is True (for manual checks / other tools)
+    export_csv: bool = False
+    train_csv_path: str = os.path.join('artifacts', "train.csv")
+    test_csv_path: str = os.path.join('artifacts', "test.csv")
     raw_data_path: str = os.path.join('artifacts', "raw.csv")
+    source_data_path: str = os.path.join('data', 'raw', 'listings.csv')
+    table_name: str = "listings_raw"
+    test_size: float = 0.2
+    # Streaming: read / insert / split chunk by chunk (memory ~ chunk_size rows).
+    # Off by default: it splits by id hash, so train / test rows differ from
+    # train_test_split(random_state=42) used by the in-memory mode
+    streaming: bool = False
+    chunk_size: int = 50000
+
+def is_test_row(ids, test_size):
+    '''
+    Deterministic train/test membership from id hash. Same id always goes
+    to same side, so split can be done one chunk at a time.
+    '''
+    hashes = pd.util.hash_pandas_object(pd.Series(ids), index=False).to_numpy()
+    return (hashes % 10000) < int(test_size * 10000)
+
+def to_arrow_table(df):
+    '''
+    DataFrame -> Arrow table with category columns as dictionary<int32, string>
+    (same schema for every chunk, whatever categories the chunk has)
+    '''
+    df = df.copy()
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    schema = table.schema
+    for i, field in enumerate(schema):
+        if field.name in CATEGORY_COLUMNS:
+            schema = schema.set(i, field.with_type(pa.dictionary(pa.int32(), pa.string())))
+        elif pa.types.is_null(field.type):
+            # All empty text column in this chunk (e.g. last_review) -> keep as string
+            schema = schema.set(i, field.with_type(pa.string()))
+    return table.cast(schema)
+
+def sqlite_column_type(dtype):
+    if pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    return "TEXT"
     
 # 2. Data Ingestion Process
 class DataIngestion:
@@ -23,9 +96,11 @@ class DataIngestion:
     
     def initiate_data_ingestion(self):
         logging.info("Entered the data ingestion method or component")
+        if self.ingestion_config.streaming:
+            return self.initiate_streaming_ingestion()
         try:
             # 1. Reading Raw Data
-            df = pd.read_csv('data/raw/listings.csv')
+            df = pd.read_csv(self.ingestion_config.source_data_path)
             logging.info('Read the dataset as dataframe from Raw CSV')
             
             # 2. Database Initialize
@@ -46,8 +121,12 @@ class DataIngestion:
             train_set, test_set = train_test_split(df_new, test_size=0.2, random_state=42)
             
             # 6. Saving Split Files
-            train_set.to_csv(self.ingestion_config.train_data_path, index=False, header=True)
-            test_set.to_csv(self.ingestion_config.test_data_path, index=False, header=True)
+            pq.write_table(to_arrow_table(train_set), self.ingestion_config.train_data_path)
+            pq.write_table(to_arrow_table(test_set), self.ingestion_config.test_data_path)
+            
+            if self.ingestion_config.export_csv:
+                train_set.to_csv(self.ingestion_config.train_csv_path, index=False, header=True)
+                test_set.to_csv(self.ingestion_config.test_csv_path, index=False, header=True)
             
             logging.info(f"Ingestion Data Completed. Train shape: {train_set.shape}, Test shape: {test_set.shape}")
             
@@ -58,3 +137,98 @@ class DataIngestion:
             )
         except Exception as e:
             raise CustomException(e, sys)
+    
+    def initiate_streaming_ingestion(self):
+        '''
+        Same files as in-memory mode but one chunk at a time:
+        1. Read chunk (explicit dtypes)
+        2. Bulk insert into SQLite (executemany, one transaction per chunk)
+        3. Split by id hash and append to train / test Parquet (one row group per chunk)
+        Rows are split by id hash, not train_test_split, so train / test differ from in-memory mode.
+        '''
+        try:
+            config = self.ingestion_config
+            os.makedirs(os.path.dirname(config.train_data_path), exist_ok=True)
+            os.makedirs(os.path.dirname(config.test_data_path), exist_ok=True)
+            
+            # Remove old CSV exports (chunks are appended)
+            if config.export_csv:
+                for path in (config.train_csv_path, config.test_csv_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+            
+            # Parquet goes to .tmp files first, renamed only after the last chunk:
+            # a failed run never leaves half written (footer-less) files for next stage
+            tmp_paths = {path: f"{path}.tmp" for path in (config.train_data_path, config.test_data_path)}
+            engine = get_database_connection()
+            
+            # Only the columns present in file get a fixed dtype
+            header = pd.read_csv(config.source_data_path, nrows=0).columns
+            dtypes = {col: dtype for col, dtype in LISTING_DTYPES.items() if col in header}
+            
+            try:
+                # Connection and writers are closed on error too
+                with ExitStack() as stack:
+                    stack.callback(engine.dispose)
+                    connection = engine.raw_connection()
+                    stack.callback(connection.close)
+                    cursor = connection.cursor()
+                    
+                    reader = pd.read_csv(config.source_data_path, dtype=dtypes, chunksize=config.chunk_size)
+                    train_rows, test_rows, insert_sql = 0, 0, None
+                    train_writer, test_writer = None, None
+                    
+                    for chunk_number, chunk in enumerate(reader):
+                        if insert_sql is None:
+                            # Table created from first chunk (same as to_sql replace)
+                            columns = ", ".join(f'"{col}" {sqlite_column_type(chunk[col].dtype)}' for col in chunk.columns)
+                            cursor.execute(f'DROP TABLE IF EXISTS "{config.table_name}"')
+                            cursor.execute(f'CREATE TABLE "{config.table_name}" ({columns})')
+                            connection.commit()
+                            placeholders = ", ".join("?" * len(chunk.columns))
+                            insert_sql = f'INSERT INTO "{config.table_name}" VALUES ({placeholders})'
+                        
+                        # NaN -> NULL, numpy scalars -> Python (sqlite3 can't bind numpy types)
+                        rows = chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None)
+                        cursor.executemany(insert_sql, rows)
+                        connection.commit()
+                        
+                        test_mask = is_test_row(chunk["id"], config.test_size)
+                        train_table = to_arrow_table(chunk[~test_mask])
+                        test_table = to_arrow_table(chunk[test_mask])
+                        
+                        if train_writer is None:
+                            train_writer = stack.enter_context(
+                                pq.ParquetWriter(tmp_paths[config.train_data_path], train_table.schema)
+                            )
+                            test_writer = stack.enter_context(
+                                pq.ParquetWriter(tmp_paths[config.test_data_path], test_table.schema)
+                            )
+                        train_writer.write_table(train_table)
+                        test_writer.write_table(test_table)
+                        
+                        if config.export_csv:
+                            first_chunk = chunk_number == 0
+                            chunk[~test_mask].to_csv(config.train_csv_path, mode="a", index=False, header=first_chunk)
+                            chunk[test_mask].to_csv(config.test_csv_path, mode="a", index=False, header=first_chunk)
+                        
+                        train_rows += int((~test_mask).sum())
+                        test_rows += int(test_mask.sum())
+                        logging.info(f"Chunk {chunk_number}: {len(chunk)} rows ingested")
+            except Exception:
+                for tmp_path in tmp_paths.values():
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                raise
+            
+            for path, tmp_path in tmp_paths.items():
+                if os.path.exists(tmp_path):
+                    os.replace(tmp_path, path)
+            logging.info(f"Streaming Ingestion Completed. Train rows: {train_rows}, Test rows: {test_rows}")
+            
+            return(
+                config.train_data_path,
+                config.test_data_path
+            )
+        except Exception as e:
+            raise CustomException(e, sys)
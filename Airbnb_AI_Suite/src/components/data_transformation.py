@@ -1,8 +1,10 @@
 import sys
 import os
+import json
 from dataclasses import dataclass
 import numpy as np
 import pandas as pd
+from scipy import sparse
 from sklearn.compose import ColumnTransformer
 from sklearn.impute import SimpleImputer
 from sklearn.pipeline import Pipeline
@@ -10,11 +12,22 @@ from sklearn.preprocessing import OneHotEncoder, StandardScaler
 
 from src.exception import CustomException
 from src.logger import logging
-from src.utils import save_object
+from src.utils import save_object, read_table
+from src.components.fast_preprocessor import compile_preprocessor, check_preprocessor_parity
+from src.serialization import payload_checksum
 
 @dataclass
 class DataTransformationConfig:
     preprocessor_obj_file_path = os.path.join('artifacts', "preprocessor.pkl")
+    # Transformed matrices (so training can run again without this stage)
+    train_features_path = os.path.join('artifacts', "train_features.npz")
+    test_features_path = os.path.join('artifacts', "test_features.npz")
+    train_target_path = os.path.join('artifacts', "train_target.npy")
+    test_target_path = os.path.join('artifacts', "test_target.npy")
+    # Result of compiled preprocessor check, API only uses compiled version when it passed
+    preprocessor_parity_file_path = os.path.join('artifacts', "preprocessor_parity.json")
+    # Flat array version of preprocessor (written only when parity passed), memory-mapped by the API
+    compiled_preprocessor_file_path = os.path.join('artifacts', "preprocessor_compiled.pkl")
     
 class DataTransformation:
     def __init__(self):
@@ -26,6 +39,8 @@ class DataTransformation:
         1. Numerical (Standard) -> Mean Impute + Scaling
         2. Numerical (Reviews) -> Constant 0 Impute + Scaling
         3. Categorical -> Mode Impute + OneHotEncoding
+        
+        Output is a sparse CSR matrix (OHE columns are mostly zeros)
         '''
         try:
             # Define Column Groups based on EDA
@@ -68,7 +83,8 @@ class DataTransformation:
             cat_pipeline = Pipeline(
                 steps=[
                     ("imputer", SimpleImputer(strategy="most_frequent")),
-                    ("one_hot_encoder", OneHotEncoder(handle_unknown='ignore', sparse_output=False)),
+                    ("one_hot_encoder", OneHotEncoder(handle_unknown='ignore', sparse_output=True)),
+                    # with_mean=False keeps zeros as zeros, so matrix stays sparse
                     ("scaler", StandardScaler(with_mean=False)) # After OHE Scaling is Optional
                 ]
             )
@@ -82,7 +98,9 @@ class DataTransformation:
                     ("num_pipeline", num_pipeline, numerical_columns),
                     ("reviews_pipeline", reviews_pipeline, reviews_columns),
                     ("cat_pipeline", cat_pipeline, categorical_columns)
-                ]
+                ],
+                # Always stack as sparse (default 0.3 would turn it dense again)
+                sparse_threshold=1.0
             )
             
             return preprocessor
@@ -92,24 +110,24 @@ class DataTransformation:
         
     def initiate_data_transformation(self, train_path, test_path):
         try:
-            # Read Data
-            train_df = pd.read_csv(train_path)
-            test_df = pd.read_csv(test_path)
-            logging.info("Read train and test data completed")
-            
             logging.info("Obtaining preprocessing object")
             preprocessing_obj = self.get_data_transformer_object()
             
             target_column_name = "price"
             
-            # Drop Unwanted Columns
-            drop_columns = [target_column_name, "id", "name", "host_id", "host_name", "last_review"]
+            # Only columns used by preprocessor + target are read (no id, name, host etc.)
+            feature_columns = [col for _, _, cols in preprocessing_obj.transformers for col in cols]
+            
+            # Read Data
+            train_df = read_table(train_path, columns=feature_columns + [target_column_name])
+            test_df = read_table(test_path, columns=feature_columns + [target_column_name])
+            logging.info("Read train and test data completed")
             
             # Split Features and Target
-            input_feature_train_df = train_df.drop(columns=drop_columns, axis=1)
+            input_feature_train_df = train_df[feature_columns]
             target_feature_train_df = train_df[target_column_name]
             
-            input_feature_test_df = test_df.drop(columns=drop_columns, axis=1)
+            input_feature_test_df = test_df[feature_columns]
             target_feature_test_df = test_df[target_column_name]
             
             logging.info(f"Applying preprocessing object on training dataframe and testing dataframe.")
@@ -119,27 +137,100 @@ class DataTransformation:
             input_feature_train_arr = preprocessing_obj.fit_transform(input_feature_train_df)
             input_feature_test_arr = preprocessing_obj.transform(input_feature_test_df)
             
+            # API builds single rows with compiled version, must give exactly same matrix
+            parity = {"passed": False, "rows": len(input_feature_test_df), "error": None}
+            compiled_preprocessor = None
+            try:
+                compiled_preprocessor = compile_preprocessor(preprocessing_obj)
+                parity["passed"] = check_preprocessor_parity(
+                    preprocessing_obj, compiled_preprocessor, input_feature_test_df
+                )
+            except Exception as e:
+                parity["error"] = str(e)
+                logging.info(f"Compiled preprocessor can't be used for this preprocessor: {e}")
+            
             # Log Transformation on Target Variable
-            target_feature_train_df = np.log1p(target_feature_train_df)
-            target_feature_test_df = np.log1p(target_feature_test_df)
+            # Target stays a separate vector (no np.c_ copy of whole feature matrix)
+            target_feature_train_arr = np.log1p(target_feature_train_df).to_numpy()
+            target_feature_test_arr = np.log1p(target_feature_test_df).to_numpy()
             
-            # Combining Train and Test array to save
-            train_arr = np.c_[input_feature_train_arr, np.array(target_feature_train_df)]
-            test_arr = np.c_[input_feature_test_arr, np.array(target_feature_test_df)]
+            logging.info(
+                f"Train matrix: {input_feature_train_arr.shape}, "
+                f"non zero: {input_feature_train_arr.nnz}"
+            )
             
             logging.info(f"Saved preprocessing object.")
             
             # Used Utilize function to save pickle file
+            # joblib payload next to a small pointer (see src/serialization.py)
             save_object(
                 file_path=self.data_transformation_config.preprocessor_obj_file_path,
-                obj=preprocessing_obj
+                obj=preprocessing_obj,
+                fast_format=True
             )
+            self.save_compiled_preprocessor(compiled_preprocessor if parity["passed"] else None)
+            self.save_parity_report(parity)
+            
+            # Uncompressed npz: fast to load, still only non zero values
+            config = self.data_transformation_config
+            sparse.save_npz(config.train_features_path, sparse.csr_matrix(input_feature_train_arr), compressed=False)
+            sparse.save_npz(config.test_features_path, sparse.csr_matrix(input_feature_test_arr), compressed=False)
+            np.save(config.train_target_path, target_feature_train_arr)
+            np.save(config.test_target_path, target_feature_test_arr)
+            logging.info("Saved transformed train and test matrices.")
             
             return(
-                train_arr,
-                test_arr,
+                input_feature_train_arr,
+                target_feature_train_arr,
+                input_feature_test_arr,
+                target_feature_test_arr,
                 self.data_transformation_config.preprocessor_obj_file_path
             )
             
         except Exception as e:
-            raise CustomException(e, sys)
\ No newline at end of file
+            raise CustomException(e, sys)
+    
+    def save_compiled_preprocessor(self, compiled_preprocessor):
+        '''
+        Plain arrays in a joblib payload (see MMAP_CLASSES), so all API workers
+        share one copy of the pages. Old file is removed when parity failed.
+        '''
+        config = self.data_transformation_config
+        if compiled_preprocessor is None:
+            if os.path.exists(config.compiled_preprocessor_file_path):
+                os.remove(config.compiled_preprocessor_file_path)
+            return
+        save_object(
+            file_path=config.compiled_preprocessor_file_path,
+            obj=compiled_preprocessor,
+            fast_format=True
+        )
+
+    def save_parity_report(self, parity):
+        '''
+        Parity result + checksum of the preprocessor it belongs to
+        (publish_model_release copies it into release.json)
+        '''
+        config = self.data_transformation_config
+        report = dict(parity, preprocessor_sha256=payload_checksum(config.preprocessor_obj_file_path))
+        tmp_path = config.preprocessor_parity_file_path + ".tmp"
+        with open(tmp_path, "w") as file_obj:
+            json.dump(report, file_obj, indent=2)
+        os.replace(tmp_path, config.preprocessor_parity_file_path)
+        logging.info(f"Compiled preprocessor parity: {report['passed']}")
+
+    def load_transformed_data(self):
+        '''
+        Output of last initiate_data_transformation run (same order as its return)
+        '''
+        try:
+            config = self.data_transformation_config
+            return(
+                sparse.load_npz(config.train_features_path),
+                np.load(config.train_target_path),
+                sparse.load_npz(config.test_features_path),
+                np.load(config.test_target_path),
+                config.preprocessor_obj_file_path
+            )
+        except Exception as e:
+            raise CustomException(e, sys)
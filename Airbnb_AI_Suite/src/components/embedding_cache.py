@@ -0,0 +1,219 @@
+import os
+import sys
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.exception import CustomException
+from src.logger import logging
+
+@dataclass
+class EmbeddingCacheConfig:
+    cache_dir: str = os.path.join("artifacts", "embedding_cache")
+    # Hot queries kept in process memory
+    lru_size: int = 10000
+    # Rows reserved in memmap file at start (file grows x2 when full)
+    initial_capacity: int = 65536
+    # SQLite "IN (...)" limit per lookup query
+    lookup_chunk_size: int = 900
+
+def normalize_text(text):
+    '''
+    Same text with different spaces / unicode form -> same cache key
+    '''
+    return " ".join(unicodedata.normalize("NFC", str(text)).split())
+
+class EmbeddingCache:
+    '''
+    Disk backed embedding cache shared by index building and query serving.
+
+    Vectors: one float32 NumPy memmap file (row per text)
+    Keys:    SQLite table, sha256(model name + normalized text) -> row
+    Hot:     in-process LRU on top
+
+    A text found in cache never goes through the transformer again.
+    '''
+    def __init__(self, model_name, config=None):
+        self.model_name = model_name
+        self.cache_config = config or EmbeddingCacheConfig()
+
+        slug = model_name.replace("/", "_")
+        self.vectors_file = os.path.join(self.cache_config.cache_dir, f"{slug}.f32")
+        self.keys_file = os.path.join(self.cache_config.cache_dir, f"{slug}.sqlite")
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+        self._vectors = None
+        self._dimension = None
+
+    def _key(self, text):
+        return hashlib.sha256(f"{self.model_name}\x00{normalize_text(text)}".encode("utf-8")).digest()
+
+    def _connect(self):
+        if self._connection is None:
+            os.makedirs(self.cache_config.cache_dir, exist_ok=True)
+            self._connection = sqlite3.connect(self.keys_file, timeout=30, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, row INTEGER NOT NULL) WITHOUT ROWID"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS info (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+            self._connection.commit()
+
+        if self._dimension is None:
+            # Another process may have created the vectors file after we connected
+            stored = self._connection.execute("SELECT value FROM info WHERE name = 'dimension'").fetchone()
+            if stored is not None:
+                self._dimension = stored[0]
+        return self._connection
+
+    def _open_vectors(self, min_rows):
+        '''
+        Memmap with at least min_rows rows (grows file when needed,
+        reopens when another process already made it bigger)
+        '''
+        row_bytes = self._dimension * 4
+        current_rows = os.path.getsize(self.vectors_file) // row_bytes if os.path.exists(self.vectors_file) else 0
+
+        if current_rows < min_rows:
+            new_rows = max(self.cache_config.initial_capacity, current_rows)
+            while new_rows < min_rows:
+                new_rows *= 2
+            with open(self.vectors_file, "ab") as f:
+                f.truncate(new_rows * row_bytes)
+            current_rows = new_rows
+
+        if self._vectors is None or self._vectors.shape[0] < current_rows:
+            self._vectors = np.memmap(self.vectors_file, dtype="float32", mode="r+", shape=(current_rows, self._dimension))
+        return self._vectors
+
+    def _lru_get(self, key):
+        vector = self._lru.get(key)
+        if vector is not None:
+            self._lru.move_to_end(key)
+        return vector
+
+    def _lru_put(self, key, vector):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.cache_config.lru_size:
+            self._lru.popitem(last=False)
+
+    def _disk_lookup(self, keys):
+        connection = self._connect()
+        found = {}
+        for start in range(0, len(keys), self.cache_config.lookup_chunk_size):
+            chunk = keys[start:start + self.cache_config.lookup_chunk_size]
+            placeholders = ",".join("?" * len(chunk))
+            for key, row in connection.execute(f"SELECT key, row FROM embeddings WHERE key IN ({placeholders})", chunk):
+                found[key] = row
+
+        if not found:
+            return {}
+        vectors = self._open_vectors(max(found.values()) + 1)
+        return {key: np.array(vectors[row]) for key, row in found.items()}
+
+    def _disk_store(self, keys, vectors):
+        connection = self._connect()
+        # IMMEDIATE: only one writer (process) allocates rows at a time
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            if self._dimension is None:
+                self._dimension = vectors.shape[1]
+                connection.execute("INSERT OR IGNORE INTO info VALUES ('dimension', ?)", (self._dimension,))
+
+            next_row = connection.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM embeddings").fetchone()[0]
+            storage = self._open_vectors(next_row + len(keys))
+
+            # Vectors hit the disk before keys become visible to readers
+            storage[next_row:next_row + len(keys)] = vectors
+            storage.flush()
+
+            connection.executemany(
+                "INSERT OR IGNORE INTO embeddings VALUES (?, ?)",
+                [(key, next_row + i) for i, key in enumerate(keys)]
+            )
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+
+    def encode(self, texts, encode_fn):
+        '''
+        Embeddings for texts (same order). Only texts not seen before
+        are passed to encode_fn (one batched call).
+        '''
+        try:
+            texts = list(texts)
+            keys = [self._key(text) for text in texts]
+            results = {}
+
+            with self._lock:
+                # 1. Memory (LRU)
+                for key in keys:
+                    if key not in results:
+                        vector = self._lru_get(key)
+                        if vector is not None:
+                            results[key] = vector
+                            self.memory_hits += 1
+
+                # 2. Disk (SQLite + memmap)
+                pending = list({key: None for key in keys if key not in results})
+                if pending:
+                    for key, vector in self._disk_lookup(pending).items():
+                        results[key] = vector
+                        self._lru_put(key, vector)
+                        self.disk_hits += 1
+
+            # 3. Transformer only for misses (outside lock, this is the slow part)
+            missing = {}
+            for text, key in zip(texts, keys):
+                if key not in results and key not in missing:
+                    missing[key] = text
+
+            if missing:
+                self.misses += len(missing)
+                new_vectors = np.asarray(encode_fn(list(missing.values())), dtype="float32")
+
+                with self._lock:
+                    self._disk_store(list(missing.keys()), new_vectors)
+                    for key, vector in zip(missing.keys(), new_vectors):
+                        results[key] = vector
+                        self._lru_put(key, vector)
+
+            if not texts:
+                return np.zeros((0, self._dimension or 0), dtype="float32")
+            return np.vstack([results[key] for key in keys])
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "lru_entries": len(self._lru),
+        }
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+            self._vectors = None
+        logging.info(f"Embedding cache closed: {self.stats()}")
@@ -0,0 +1,201 @@
+import sys
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from src.exception import CustomException
+from src.logger import logging
+
+class CompiledPreprocessor:
+    '''
+    Fitted ColumnTransformer from DataTransformation turned into plain arrays:
+    numeric -> fill value, mean, scale, output column
+    category -> {category: output column}, value (1 / scale)
+
+    Listing dicts go straight into a NumPy matrix, no pandas DataFrame and
+    no sklearn validation per call. Output equals preprocessor.transform
+    (same values, CSR when preprocessor gives CSR).
+    '''
+    def __init__(self, numeric_columns, numeric_positions, fill_values, means, scales,
+                 category_columns, category_fill_values, category_index, category_values,
+                 n_features_out, sparse_output):
+        self.numeric_columns = numeric_columns
+        self.numeric_positions = numeric_positions
+        self.fill_values = fill_values
+        self.means = means
+        self.scales = scales
+        self.category_columns = category_columns
+        self.category_fill_values = category_fill_values
+        self.category_index = category_index
+        # Output column -> value of a present category (0 for numeric columns)
+        self.category_values = category_values
+        self.n_features_out = n_features_out
+        self.sparse_output = sparse_output
+
+    def transform_records(self, records):
+        '''
+        records: list of dicts (or one dict / ListingInput.model_dump())
+        '''
+        try:
+            if isinstance(records, dict):
+                records = [records]
+
+            output = np.zeros((len(records), self.n_features_out), dtype="float64")
+
+            # Numeric: None -> NaN -> fill value, then (x - mean) / scale (same steps as sklearn)
+            numeric = np.array(
+                [[record.get(col) for col in self.numeric_columns] for record in records], dtype="float64"
+            ).reshape(len(records), len(self.numeric_columns))
+            missing = np.isnan(numeric)
+            if missing.any():
+                numeric[missing] = np.broadcast_to(self.fill_values, numeric.shape)[missing]
+            numeric -= self.means
+            numeric /= self.scales
+            output[:, self.numeric_positions] = numeric
+
+            # Categories: one column per known value, unknown -> all zeros (handle_unknown='ignore')
+            # None and NaN are both missing -> fill value (as in the DataFrame the pandas path builds)
+            for row, record in enumerate(records):
+                for col, fill_value, index in zip(self.category_columns, self.category_fill_values, self.category_index):
+                    value = record.get(col)
+                    if value is None or (isinstance(value, float) and value != value):
+                        value = fill_value
+                    column = index.get(value)
+                    if column is not None:
+                        output[row, column] = self.category_values[column]
+
+            if self.sparse_output:
+                # Like ColumnTransformer hstack: zeros are not stored
+                return sparse.csr_matrix(output)
+            return output
+        except Exception as e:
+            raise CustomException(e, sys)
+
+def scaler_params(scaler, n_columns):
+    means = scaler.mean_ if scaler.with_mean else np.zeros(n_columns)
+    scales = scaler.scale_ if scaler.with_std else np.ones(n_columns)
+    return means, scales
+
+def compile_preprocessor(preprocessor):
+    '''
+    Works for the ColumnTransformer built in DataTransformation:
+    [imputer -> scaler] for numbers, [imputer -> one hot -> scaler] for categories.
+    Raises for anything else (then normal transform is used).
+    '''
+    try:
+        numeric_columns, numeric_positions, fill_values, means, scales = [], [], [], [], []
+        category_columns, category_fill_values, category_index = [], [], []
+        value_positions, values = [], []
+        offset = 0
+
+        # ColumnTransformer output = transformer outputs side by side, in this order
+        for name, pipeline, columns in preprocessor.transformers_:
+            if isinstance(pipeline, str) and pipeline == "drop":
+                continue
+            if not isinstance(pipeline, Pipeline):
+                raise ValueError(f"Transformer '{name}' is not a Pipeline")
+            columns = list(columns)
+            steps = [step for _, step in pipeline.steps]
+
+            if len(steps) == 2 and isinstance(steps[0], SimpleImputer) and isinstance(steps[1], StandardScaler):
+                imputer, scaler = steps
+                block_means, block_scales = scaler_params(scaler, len(columns))
+                numeric_columns += columns
+                numeric_positions += list(range(offset, offset + len(columns)))
+                fill_values += list(imputer.statistics_)
+                means += list(block_means)
+                scales += list(block_scales)
+                offset += len(columns)
+
+            elif (len(steps) == 3 and isinstance(steps[0], SimpleImputer)
+                  and isinstance(steps[1], OneHotEncoder) and isinstance(steps[2], StandardScaler)):
+                imputer, encoder, scaler = steps
+                if encoder.drop_idx_ is not None or getattr(encoder, "infrequent_categories_", None):
+                    raise ValueError("OneHotEncoder with drop / infrequent categories is not supported")
+
+                n_block = sum(len(categories) for categories in encoder.categories_)
+                block_means, block_scales = scaler_params(scaler, n_block)
+                if np.any(block_means != 0):
+                    raise ValueError("Scaler with mean after OneHotEncoder is not supported")
+
+                # A present category is 1.0 before scaling, so its output is 1 / scale
+                block_values = 1.0 / block_scales
+                value_positions += list(range(offset, offset + n_block))
+                values += list(block_values)
+
+                for col, fill_value, categories in zip(columns, imputer.statistics_, encoder.categories_):
+                    category_columns.append(col)
+                    category_fill_values.append(fill_value)
+                    category_index.append({category: offset + i for i, category in enumerate(categories)})
+                    offset += len(categories)
+
+            else:
+                raise ValueError(f"Transformer '{name}' has unsupported steps")
+
+        category_values = np.zeros(offset, dtype="float64")
+        category_values[value_positions] = values
+
+        return CompiledPreprocessor(
+            numeric_columns=numeric_columns,
+            numeric_positions=np.asarray(numeric_positions, dtype="int64"),
+            fill_values=np.asarray(fill_values, dtype="float64"),
+            means=np.asarray(means, dtype="float64"),
+            scales=np.asarray(scales, dtype="float64"),
+            category_columns=category_columns,
+            category_fill_values=category_fill_values,
+            category_index=category_index,
+            category_values=category_values,
+            n_features_out=offset,
+            sparse_output=preprocessor.sparse_output_,
+        )
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def same_output(expected, actual):
+    '''
+    Exactly equal values and, for CSR, stored positions
+    '''
+    if sparse.issparse(expected) != sparse.issparse(actual) or expected.shape != actual.shape:
+        raise ValueError("Compiled preprocessor output type / shape differs")
+    if sparse.issparse(expected):
+        expected, actual = expected.tocsr(), actual.tocsr()
+        expected.sort_indices()
+        actual.sort_indices()
+        return (np.array_equal(expected.indptr, actual.indptr)
+                and np.array_equal(expected.indices, actual.indices)
+                and np.array_equal(expected.data, actual.data))
+    return np.array_equal(expected, actual)
+
+def none_records(df, n_rows=50):
+    '''
+    API style records: missing values are None, not NaN.
+    First rows of df, each one with a different column set to None.
+    '''
+    records = [
+        {col: (None if isinstance(value, float) and value != value else value) for col, value in record.items()}
+        for record in df.head(n_rows).to_dict(orient="records")
+    ]
+    for row, record in enumerate(records):
+        record[df.columns[row % len(df.columns)]] = None
+    return records
+
+def check_preprocessor_parity(preprocessor, compiled, df):
+    '''
+    Compiled output must be exactly equal to preprocessor.transform(df)
+    (values and, for CSR, stored positions). Records with None are checked
+    against the DataFrame the pandas path builds from the same records.
+    '''
+    if not same_output(preprocessor.transform(df), compiled.transform_records(df.to_dict(orient="records"))):
+        raise ValueError("Compiled preprocessor output differs from preprocessor.transform")
+
+    records = none_records(df)
+    expected = preprocessor.transform(pd.DataFrame.from_records(records, columns=list(df.columns)))
+    if not same_output(expected, compiled.transform_records(records)):
+        raise ValueError("Compiled preprocessor output differs from preprocessor.transform for None values")
+
+    logging.info(f"Compiled preprocessor matches preprocessor.transform on {len(df)} rows (+{len(records)} with None)")
+    return True
@@ -1,68 +1,316 @@
 import os
 import sys
+import json
+import hashlib
+import numpy as np
 import pandas as pd
 import faiss
 import pickle
+import threading
 from sentence_transformers import SentenceTransformer
 from src.exception import CustomException
 from src.logger import logging
+from src.components.embedding_cache import EmbeddingCache
+from src.components.metadata_store import MetadataStore
+from src.components.vector_index import (
+    VectorIndexConfig,
+    build_index,
+    apply_search_params,
+    supports_incremental,
+    save_index_info,
+    load_index_info,
+    benchmark_indexes
+)
 
 class GenAIEngine:
-    def __init__(self):
+    # Listing details shown with search results
+    METADATA_COLUMNS = ['id', 'name', 'neighbourhood', 'price']
+    METADATA_CATEGORY_COLUMNS = ('neighbourhood',)
+    
+    def __init__(self, index_config=None):
         # We will use 'all-MiniLM-L6-v2' model (Small and Fast)
         # This converts text to 384 numbers list
         self.model_name = 'all-MiniLM-L6-v2'
         self.artifacts_path = 'artifacts'
+        self.listings_file = os.path.join('data', 'raw', 'listings.csv')
         self.index_file = os.path.join(self.artifacts_path, 'faiss_index.bin')
+        # Columnar, memory-mapped metadata (shared by all workers)
+        self.metadata_dir = os.path.join(self.artifacts_path, 'metadata')
+        # Old format (list of dicts), only read if metadata_dir is missing
         self.metadata_file = os.path.join(self.artifacts_path, 'metadata.pkl')
+        # Index type + params used to build faiss_index.bin
+        self.index_info_file = os.path.join(self.artifacts_path, 'faiss_index.json')
+        self.benchmark_file = os.path.join(self.artifacts_path, 'index_benchmark.json')
         
-    def create_vector_db(self):
+        # Flat (exact) by default, see VectorIndexConfig for IVF / PQ / HNSW
+        self.index_config = index_config
+        
+        # Disk + memory cache of embeddings (same text is never encoded twice)
+        self.embedding_cache = EmbeddingCache(self.model_name)
+        
+        # Resident objects (loaded once, then reused by every search)
+        self.index = None
+        self.metadata = None
+        self.encoder = None
+        self._load_lock = threading.Lock()
+        
+    def get_encoder(self):
+        '''
+        SentenceTransformer is heavy to build, so keep one copy
+        '''
+        if self.encoder is None:
+            with self._load_lock:
+                if self.encoder is None:
+                    logging.info("Loading Embedding Model (This downloads ~80MB data)...")
+                    self.encoder = SentenceTransformer(self.model_name)
+        return self.encoder
+    
+    def encode_texts(self, texts, batch_size=256):
+        '''
+        Embeddings via cache, transformer runs only for unseen texts
+        '''
+        return self.embedding_cache.encode(
+            texts,
+            lambda missing_texts: self.get_encoder().encode(missing_texts, batch_size=batch_size)
+        )
+    
+    def load_resources(self, force=False):
+        '''
+        Loads FAISS Index, Metadata and Encoder in memory.
+        Does nothing if they are already loaded (unless force=True)
+        '''
+        try:
+            if self.index is not None and self.metadata is not None and not force:
+                return
+            
+            with self._load_lock:
+                if self.index is None or self.metadata is None or force:
+                    index = faiss.read_index(self.index_file)
+                    
+                    # nprobe / efSearch are not stored in .bin, apply them again
+                    index_config = load_index_info(self.index_info_file)
+                    if self.index_config is not None:
+                        index_config.nprobe = self.index_config.nprobe
+                        index_config.ef_search = self.index_config.ef_search
+                    apply_search_params(index, index_config)
+                    
+                    self.index, self.metadata = index, self.load_metadata()
+                    logging.info(f"Vector Index loaded in memory with {index.ntotal} documents.")
+            
+            self.get_encoder()
+        except Exception as e:
+            raise CustomException(e, sys)
+    
+    def warm_up(self):
+        '''
+        Call before accepting traffic:
+        loads everything and runs one dummy query (first encode is slow)
+        '''
+        try:
+            self.load_resources()
+            self.search_listings("warm up", top_k=1)
+            logging.info("GenAI Engine warmed up.")
+        except Exception as e:
+            raise CustomException(e, sys)
+        
+    @staticmethod
+    def name_hash(name):
+        '''
+        Fingerprint of listing name (to know if it needs new embedding)
+        '''
+        return hashlib.md5(str(name).encode("utf-8")).hexdigest()
+    
+    def read_listings(self):
+        '''
+        Listings with a Name (one row per listing id)
+        '''
+        df = pd.read_csv(self.listings_file)
+        
+        # Only take those rows where Name is available
+        df = df.dropna(subset=['name'])
+        
+        # Listing id is the key for incremental updates
+        return df.drop_duplicates(subset=['id'], keep='last')
+    
+    def load_metadata(self):
+        '''
+        Memory-mapped metadata store (falls back to old metadata.pkl)
+        '''
+        if MetadataStore.exists(self.metadata_dir):
+            return MetadataStore.load(self.metadata_dir)
+        
+        logging.info("Metadata store not found, reading old metadata.pkl")
+        with open(self.metadata_file, "rb") as f:
+            return MetadataStore.from_records(pickle.load(f), category_columns=self.METADATA_CATEGORY_COLUMNS)
+    
+    def save_vector_db(self, index, index_config, metadata):
+        '''
+        Writes Index + Index Info + Metadata (temp file + rename,
+        so a reader never sees a half written file)
+        '''
+        os.makedirs(self.artifacts_path, exist_ok=True)
+        
+        # Save FAISS Index
+        faiss.write_index(index, self.index_file + ".tmp")
+        os.replace(self.index_file + ".tmp", self.index_file)
+        save_index_info(self.index_info_file, index_config, index, self.model_name)
+        
+        # Save Metadata (new version folder, readers switch atomically)
+        metadata.save(self.metadata_dir)
+        
+        logging.info("GenAI Artifacts Saved Successfully.")
+        
+        # New data is live for this engine too
+        self.index, self.metadata = index, MetadataStore.load(self.metadata_dir)
+    
+    def create_vector_db(self, incremental=False):
         '''
         This function reads listing names and creates Vector Database
-        Only run this ONCE (Training Time)
+        
+        incremental=True: only new / renamed listings are encoded and
+        removed listings are deleted from index + metadata. Falls back to
+        full build when there is no old index (or index can't remove ids).
         '''
         try:
             logging.info("Starting Vector Database Creation...")
             
             # 1. Load Raw Data
-            df = pd.read_csv('data/raw/listings.csv')
-            
-            # Only take those rows where Name is available
-            df = df.dropna(subset=['name'])
+            df_subset = self.read_listings()
             
-            df_subset = df.copy()
+            if incremental:
+                status = self.update_vector_db(df_subset)
+                if status is not None:
+                    return status
             
             documents = df_subset['name'].tolist()
             
             # Store Metadata (Price, Neighbourhood) so we can show details after search
-            metadata = df_subset[['id', 'name', 'neighbourhood', 'price']].to_dict(orient='records')
+            # FAISS id of a listing = its row in metadata store
+            metadata = MetadataStore.from_frame(
+                df_subset[self.METADATA_COLUMNS].reset_index(drop=True),
+                category_columns=self.METADATA_CATEGORY_COLUMNS
+            )
             
-            # 2. Generate Embeddings
-            logging.info("Loading Embedding Model (This downloads ~80MB data)...")
-            encoder = SentenceTransformer(self.model_name)
-            embeddings = encoder.encode(documents)
+            # 2. Generate Embeddings (cached names are not encoded again)
+            embeddings = self.encode_texts(documents)
             
-            # 3. Build FAISS Index (Search Engine)
-            dimension = embeddings.shape[1] # 384 dimensions
-            index = faiss.IndexFlatL2(dimension)
-            index.add(embeddings)
+            # 3. Build FAISS Index (Search Engine): Flat / IVF-Flat / IVF-PQ / HNSW
+            index_config = self.index_config or VectorIndexConfig()
+            index = build_index(embeddings, index_config, ids=np.arange(len(metadata)))
             
-            logging.info(f"Vector Index Created with {index.ntotal} documents.")
+            logging.info(f"Vector Index ({index_config.index_type}) Created with {index.ntotal} documents.")
             
             # 4. Save Artifacts
-            os.makedirs(self.artifacts_path, exist_ok=True)
+            self.save_vector_db(index, index_config, metadata)
             
-            # Save FAISS Index
-            faiss.write_index(index, self.index_file)
+            return "Vector DB Created Successfully!"
+        
+        except Exception as e:
+            raise CustomException(e, sys)
+    
+    def update_vector_db(self, df):
+        '''
+        Diffs listings with saved metadata by id + name hash.
+        Returns None when incremental update is not possible.
+        '''
+        metadata_exists = MetadataStore.exists(self.metadata_dir) or os.path.exists(self.metadata_file)
+        if not (os.path.exists(self.index_file) and metadata_exists):
+            logging.info("No existing Vector DB, doing full build")
+            return None
+        
+        index = faiss.read_index(self.index_file)
+        if not supports_incremental(index):
+            logging.info("Existing index can't remove ids (old flat / HNSW), doing full build")
+            return None
+        
+        index_config = load_index_info(self.index_info_file)
+        if self.index_config is not None and self.index_config.index_type != index_config.index_type:
+            logging.info(f"Index type changed to {self.index_config.index_type}, doing full build")
+            return None
+        
+        old_store = self.load_metadata()
+        old_df = old_store.to_frame()
+        alive = np.array(old_store.alive, dtype=bool)
+        
+        # Match old (alive) rows with new rows by listing id
+        old_alive = old_df[alive].rename_axis('pos').reset_index()
+        merged = old_alive.merge(df[self.METADATA_COLUMNS], on='id', how='outer', suffixes=('_old', ''), indicator=True)
+        
+        deleted = merged[merged['_merge'] == 'left_only']
+        # Outer merge makes int columns float (NaN for deleted rows), get original types back
+        current = merged[merged['_merge'] != 'left_only'].astype(old_df[self.METADATA_COLUMNS].dtypes.to_dict())
+        
+        both = current[current['_merge'] == 'both']
+        renamed = both[both['name_old'].map(self.name_hash) != both['name'].map(self.name_hash)]
+        kept = both.drop(index=renamed.index)
+        added = current[current['_merge'] == 'right_only']
+        
+        # Same name -> keep vector, just refresh price / neighbourhood in place
+        kept_pos = kept['pos'].astype('int64').to_numpy()
+        for col in self.METADATA_COLUMNS:
+            if col != 'id':
+                old_df.loc[kept_pos, col] = kept[col].to_numpy()
+        
+        # Deleted + renamed listings: vector out of index, row marked dead
+        removed_positions = np.concatenate([
+            deleted['pos'].astype('int64').to_numpy(),
+            renamed['pos'].astype('int64').to_numpy()
+        ])
+        if len(removed_positions):
+            index.remove_ids(removed_positions)
+            alive[removed_positions] = False
+        
+        # New + renamed listings: encode and append as new rows
+        rows_to_encode = pd.concat([renamed, added])[self.METADATA_COLUMNS]
+        if len(rows_to_encode):
+            embeddings = self.encode_texts(rows_to_encode['name'].tolist())
+            new_ids = np.arange(len(old_df), len(old_df) + len(rows_to_encode), dtype="int64")
+            index.add_with_ids(np.ascontiguousarray(embeddings, dtype="float32"), new_ids)
+        
+        metadata = MetadataStore.from_frame(
+            pd.concat([old_df, rows_to_encode], ignore_index=True),
+            category_columns=self.METADATA_CATEGORY_COLUMNS,
+            alive=np.concatenate([alive, np.ones(len(rows_to_encode), dtype=bool)])
+        )
+        
+        apply_search_params(index, index_config)
+        self.save_vector_db(index, index_config, metadata)
+        
+        status = (
+            f"Vector DB Updated: {len(added)} new, {len(renamed)} renamed, "
+            f"{len(deleted)} deleted (encoded {len(rows_to_encode)})"
+        )
+        logging.info(status)
+        return status
             
-            # Save Metadata & Model Info
-            with open(self.metadata_file, "wb") as f:
-                pickle.dump(metadata, f)
+    def benchmark_index_types(self, index_configs=None, num_queries=1000, top_k=10):
+        '''
+        Compares IVF-Flat / IVF-PQ / HNSW with exact Flat index on listing names:
+        recall@k (accuracy) vs latency, so we can pick index_type knowingly.
+        Report is saved in artifacts/index_benchmark.json
+        '''
+        try:
+            if index_configs is None:
+                index_configs = [
+                    VectorIndexConfig(index_type="ivf_flat"),
+                    VectorIndexConfig(index_type="ivf_pq"),
+                    VectorIndexConfig(index_type="hnsw"),
+                ]
             
-            logging.info("GenAI Artifacts Saved Successfully.")
+            df = self.read_listings()
+            embeddings = self.encode_texts(df['name'].tolist())
             
-            return "Vector DB Created Successfully!"
-        
+            # Random listing names act as queries
+            rng = np.random.default_rng(42)
+            query_rows = rng.choice(len(embeddings), size=min(num_queries, len(embeddings)), replace=False)
+            
+            report = benchmark_indexes(embeddings, embeddings[query_rows], index_configs, top_k=top_k)
+            
+            os.makedirs(self.artifacts_path, exist_ok=True)
+            with open(self.benchmark_file, "w") as f:
+                json.dump(report, f, indent=2)
+            
+            return report
         except Exception as e:
             raise CustomException(e, sys)
             
@@ -71,28 +319,44 @@ class GenAIEngine:
         It takes user query and returns Best Matches
         '''
         try:
-            # Load Index and Metadata
-            index = faiss.read_index(self.index_file)
-            with open(self.metadata_file, "rb") as f:
-                metadata = pickle.load(f)
+            return self.search_many([query], top_k=top_k)[0]
+        except Exception as e:
+            raise CustomException(e, sys)
+    
+    def search_many(self, queries, top_k=3, batch_size=256):
+        '''
+        Many queries at once: one batched encode + one FAISS search
+        over all query vectors. Returns list of results per query.
+        '''
+        try:
+            if len(queries) == 0:
+                return []
             
-            # Load Encoder
-            encoder = SentenceTransformer(self.model_name)
+            # Resident Index, Metadata and Encoder (loaded only first time)
+            self.load_resources()
+            index, metadata = self.index, self.metadata
             
-            # Create Vector from Query
-            query_vector = encoder.encode([query])
+            # Create Vectors from all Queries (one matrix, repeated queries come from cache)
+            query_vectors = self.encode_texts(list(queries), batch_size=batch_size)
             
-            # Do Search (Distance Calculation)
-            distances, indices = index.search(query_vector, top_k)
+            # Do Search (Distance Calculation) for all rows together
+            distances, indices = index.search(query_vectors, top_k)
             
-            results = []
+            all_results = []
             
-            for i in range(top_k):
-                idx = indices[0][i]
-                result = metadata[idx]
-                result['score'] = float(distances[0][i]) # Similarity Score
-                results.append(result)
+            for row in range(len(queries)):
+                results = []
+                for i in range(top_k):
+                    idx = indices[row][i]
+                    # FAISS gives -1 when index has less than top_k documents
+                    if idx < 0:
+                        continue
+                    # New dict per row, shared metadata is never modified
+                    result = metadata.row(idx)
+                    result['score'] = float(distances[row][i]) # Similarity Score
+                    results.append(result)
+                all_results.append(results)
                 
-            return results
+            return all_results
         except Exception as e:
             raise CustomException(e, sys)
\ No newline at end of file
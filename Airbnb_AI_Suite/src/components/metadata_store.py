@@ -0,0 +1,169 @@
+import os
+import sys
+import json
+import time
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from src.exception import CustomException
+from src.logger import logging
+
+class MetadataStore:
+    '''
+    Columnar listing metadata, one row per FAISS id.
+
+    numeric columns -> <col>.npy
+    category columns -> <col>.codes.npy + categories in manifest
+    text columns -> <col>.offsets.npy + <col>.data.npy (UTF-8 bytes)
+
+    Files are memory-mapped, so every uvicorn worker shares the same
+    pages instead of holding its own copy. Rows are built on demand and
+    returned as new dicts (shared arrays are read only).
+    '''
+    CURRENT_FILE = "CURRENT"
+    KEEP_VERSIONS = 2
+
+    def __init__(self, columns, arrays, alive):
+        # columns: list of (name, kind, extra) in display order
+        self.columns = columns
+        self.arrays = arrays
+        self.alive = alive
+
+    def __len__(self):
+        return len(self.alive)
+
+    @classmethod
+    def from_frame(cls, df, category_columns=(), alive=None):
+        '''
+        Builds in-memory store from DataFrame (row position = FAISS id)
+        '''
+        try:
+            columns, arrays = [], {}
+            for col in df.columns:
+                values = df[col]
+                if col in category_columns:
+                    categorical = pd.Categorical(values)
+                    columns.append((col, "category", [str(c) for c in categorical.categories]))
+                    arrays[f"{col}.codes"] = categorical.codes.astype("int32")
+                elif pd.api.types.is_numeric_dtype(values):
+                    columns.append((col, "numeric", None))
+                    arrays[col] = values.to_numpy()
+                else:
+                    # Text -> one bytes buffer + offsets (like Arrow string column)
+                    encoded = [b"" if pd.isna(v) else str(v).encode("utf-8") for v in values]
+                    lengths = np.fromiter((len(b) for b in encoded), dtype="int64", count=len(encoded))
+                    offsets = np.zeros(len(encoded) + 1, dtype="int64")
+                    np.cumsum(lengths, out=offsets[1:])
+                    columns.append((col, "text", None))
+                    arrays[f"{col}.offsets"] = offsets
+                    arrays[f"{col}.data"] = np.frombuffer(b"".join(encoded), dtype="uint8")
+
+            if alive is None:
+                alive = np.ones(len(df), dtype=bool)
+            return cls(columns, arrays, np.asarray(alive, dtype=bool))
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @classmethod
+    def from_records(cls, records, category_columns=()):
+        '''
+        Old metadata.pkl format: list of dicts (None = deleted row)
+        '''
+        alive = np.array([record is not None for record in records], dtype=bool)
+        template = next((record for record in records if record is not None), {})
+        rows = [record if record is not None else {key: None for key in template} for record in records]
+        return cls.from_frame(pd.DataFrame(rows, columns=list(template)), category_columns, alive)
+
+    def to_frame(self):
+        '''
+        Full DataFrame (for rebuild / incremental update, not for serving)
+        '''
+        data = {}
+        for col, kind, extra in self.columns:
+            if kind == "numeric":
+                data[col] = np.asarray(self.arrays[col])
+            elif kind == "category":
+                data[col] = pd.Categorical.from_codes(np.asarray(self.arrays[f"{col}.codes"]), extra).astype(object)
+            else:
+                offsets, raw = self.arrays[f"{col}.offsets"], self.arrays[f"{col}.data"]
+                data[col] = [bytes(raw[offsets[i]:offsets[i + 1]]).decode("utf-8") for i in range(len(self))]
+        return pd.DataFrame(data)
+
+    def row(self, pos):
+        '''
+        One listing as dict, O(1) by FAISS id. Always a new dict.
+        '''
+        record = {}
+        for col, kind, extra in self.columns:
+            if kind == "numeric":
+                record[col] = self.arrays[col][pos].item()
+            elif kind == "category":
+                code = self.arrays[f"{col}.codes"][pos]
+                record[col] = extra[code] if code >= 0 else None
+            else:
+                offsets = self.arrays[f"{col}.offsets"]
+                record[col] = bytes(self.arrays[f"{col}.data"][offsets[pos]:offsets[pos + 1]]).decode("utf-8")
+        return record
+
+    def save(self, store_dir):
+        '''
+        Writes a new version folder, then points CURRENT to it.
+        Readers with old version open keep working (files are not changed).
+        '''
+        try:
+            # Sortable name, newest last
+            version = f"v{time.time_ns()}"
+            version_dir = os.path.join(store_dir, version)
+            os.makedirs(version_dir, exist_ok=True)
+
+            for name, array in self.arrays.items():
+                np.save(os.path.join(version_dir, f"{name}.npy"), np.ascontiguousarray(array))
+            np.save(os.path.join(version_dir, "alive.npy"), self.alive)
+
+            with open(os.path.join(version_dir, "manifest.json"), "w") as f:
+                json.dump({"rows": len(self), "columns": self.columns}, f)
+
+            # Atomic switch to new version
+            current_file = os.path.join(store_dir, self.CURRENT_FILE)
+            with open(current_file + ".tmp", "w") as f:
+                f.write(version)
+            os.replace(current_file + ".tmp", current_file)
+
+            # Clean old versions
+            versions = sorted(d for d in os.listdir(store_dir) if os.path.isdir(os.path.join(store_dir, d)))
+            for old_version in versions[:-self.KEEP_VERSIONS]:
+                shutil.rmtree(os.path.join(store_dir, old_version), ignore_errors=True)
+
+            logging.info(f"Metadata store version {version} saved with {len(self)} rows")
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @classmethod
+    def exists(cls, store_dir):
+        return os.path.exists(os.path.join(store_dir, cls.CURRENT_FILE))
+
+    @classmethod
+    def load(cls, store_dir):
+        '''
+        Memory-maps current version (nothing is read until rows are used)
+        '''
+        try:
+            with open(os.path.join(store_dir, cls.CURRENT_FILE)) as f:
+                version_dir = os.path.join(store_dir, f.read().strip())
+
+            with open(os.path.join(version_dir, "manifest.json")) as f:
+                manifest = json.load(f)
+            columns = [tuple(column) for column in manifest["columns"]]
+
+            arrays = {}
+            for col, kind, _ in columns:
+                names = {"numeric": [col], "category": [f"{col}.codes"], "text": [f"{col}.offsets", f"{col}.data"]}[kind]
+                for name in names:
+                    arrays[name] = np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode="r")
+
+            alive = np.load(os.path.join(version_dir, "alive.npy"), mmap_mode="r")
+            return cls(columns, arrays, alive)
+        except Exception as e:
+            raise CustomException(e, sys)
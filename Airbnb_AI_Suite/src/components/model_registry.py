@@ -0,0 +1,281 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+from dataclasses import dataclass
+
+from src.exception import CustomException
+from src.logger import logging
+from src.utils import load_object
+from src.components.fast_preprocessor import compile_preprocessor
+
+@dataclass
+class ModelRegistryConfig:
+    model_file_path: str = os.path.join("artifacts", "model.pkl")
+    preprocessor_file_path: str = os.path.join("artifacts", "preprocessor.pkl")
+    # Written by TrainPipeline after model + preprocessor are both saved
+    release_file_path: str = os.path.join("artifacts", "release.json")
+    # Flat array version of tree model (see tree_compiler), used when release lists it
+    compiled_model_file_path: str = os.path.join("artifacts", "model_compiled.pkl")
+    use_compiled_model: bool = True
+    # Written by DataTransformation: does compiled preprocessor match sklearn exactly?
+    preprocessor_parity_file_path: str = os.path.join("artifacts", "preprocessor_parity.json")
+    # Compiled preprocessor saved by DataTransformation (arrays memory-mapped, shared by workers)
+    compiled_preprocessor_file_path: str = os.path.join("artifacts", "preprocessor_compiled.pkl")
+    poll_interval_seconds: float = 5.0
+
+class ModelNotReady(Exception):
+    '''
+    No bundle loaded yet: release.json does not match model / preprocessor
+    (training still writing them, or files changed without a new release)
+    '''
+    def __init__(self, release_file_path, retry_after_seconds):
+        super().__init__(
+            f"No model release loaded: checksums in {release_file_path} do not match "
+            f"model / preprocessor artifacts"
+        )
+        self.retry_after_seconds = retry_after_seconds
+
+@dataclass(frozen=True)
+class ModelBundle:
+    '''
+    One consistent pair of model + preprocessor.
+    Never modified after creation, a reload creates a new bundle.
+    '''
+    model: object
+    preprocessor: object
+    version: str
+    loaded_at: float
+    # Dict -> feature matrix without pandas (None if preprocessor can't be compiled)
+    fast_preprocessor: object = None
+
+def file_checksum(file_path, chunk_size=1024 * 1024):
+    '''
+    SHA256 of a file (read in chunks so big models don't need 2x memory)
+    '''
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as file_obj:
+        for chunk in iter(lambda: file_obj.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def publish_model_release(config=None):
+    '''
+    Marks current model.pkl + preprocessor.pkl as one release.
+    Registry watches this file, so half finished training (new preprocessor,
+    old model) is never served.
+    '''
+    try:
+        config = config or ModelRegistryConfig()
+        release = {
+            "model_sha256": file_checksum(config.model_file_path),
+            "preprocessor_sha256": file_checksum(config.preprocessor_file_path),
+            "published_at": time.time(),
+        }
+        # Compiled model belongs to this release only if trainer exported it
+        if os.path.exists(config.compiled_model_file_path):
+            release["compiled_model_sha256"] = file_checksum(config.compiled_model_file_path)
+        # Compiled preprocessor is allowed only if its parity check passed for this exact preprocessor
+        release["fast_preprocessor_parity"] = False
+        if os.path.exists(config.preprocessor_parity_file_path):
+            with open(config.preprocessor_parity_file_path) as file_obj:
+                parity = json.load(file_obj)
+            release["fast_preprocessor_parity"] = bool(
+                parity.get("passed") and parity.get("preprocessor_sha256") == release["preprocessor_sha256"]
+            )
+        if release["fast_preprocessor_parity"] and os.path.exists(config.compiled_preprocessor_file_path):
+            release["compiled_preprocessor_sha256"] = file_checksum(config.compiled_preprocessor_file_path)
+        release["version"] = hashlib.sha256(
+            (release["model_sha256"] + release["preprocessor_sha256"]).encode()
+        ).hexdigest()[:16]
+
+        # Atomic write: readers see old file or new file, never half file
+        tmp_path = config.release_file_path + ".tmp"
+        with open(tmp_path, "w") as file_obj:
+            json.dump(release, file_obj, indent=2)
+        os.replace(tmp_path, config.release_file_path)
+
+        logging.info(f"Published model release {release['version']}")
+        return release["version"]
+    except Exception as e:
+        raise CustomException(e, sys)
+
+class ModelRegistry:
+    '''
+    Keeps model and preprocessor in memory.
+    Loads once, then a background thread checks artifacts and swaps in
+    new versions without restarting the server.
+    '''
+    def __init__(self, config=None):
+        self.registry_config = config or ModelRegistryConfig()
+        self._bundle = None
+        self._signature = None
+        self._load_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._watcher = None
+
+    def _stat_signature(self):
+        # Cheap check first (mtime + size), checksum only when this changes
+        if os.path.exists(self.registry_config.release_file_path):
+            paths = [self.registry_config.release_file_path]
+        else:
+            paths = [self.registry_config.model_file_path, self.registry_config.preprocessor_file_path]
+
+        signature = []
+        for path in paths:
+            stat = os.stat(path)
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def _read_release(self):
+        if not os.path.exists(self.registry_config.release_file_path):
+            return None
+        with open(self.registry_config.release_file_path) as file_obj:
+            return json.load(file_obj)
+
+    def _expected_version(self, release):
+        model_sha = file_checksum(self.registry_config.model_file_path)
+        preprocessor_sha = file_checksum(self.registry_config.preprocessor_file_path)
+
+        if release is not None:
+            # Files are still being written, try again on next poll
+            if release["model_sha256"] != model_sha or release["preprocessor_sha256"] != preprocessor_sha:
+                return None
+
+        return hashlib.sha256((model_sha + preprocessor_sha).encode()).hexdigest()[:16]
+
+    def _use_compiled(self, release):
+        '''
+        Compiled model is served only when it was published with this release
+        '''
+        compiled_path = self.registry_config.compiled_model_file_path
+        if not self.registry_config.use_compiled_model or release is None:
+            return False
+        if "compiled_model_sha256" not in release or not os.path.exists(compiled_path):
+            return False
+        return file_checksum(compiled_path) == release["compiled_model_sha256"]
+
+    def _load_fast_preprocessor(self, release, preprocessor):
+        '''
+        Compiled preprocessor for this release: saved payload (memory-mapped)
+        when it was published with the release, else compiled here.
+        None when parity was not confirmed (pandas path is used).
+        '''
+        if release is None or release.get("fast_preprocessor_parity") is not True:
+            logging.info("Compiled preprocessor parity not confirmed in release, pandas path will be used")
+            return None
+
+        compiled_path = self.registry_config.compiled_preprocessor_file_path
+        if ("compiled_preprocessor_sha256" in release and os.path.exists(compiled_path)
+                and file_checksum(compiled_path) == release["compiled_preprocessor_sha256"]):
+            return load_object(file_path=compiled_path)
+
+        try:
+            return compile_preprocessor(preprocessor)
+        except Exception as e:
+            logging.info(f"Preprocessor not compiled, pandas path will be used: {e}")
+            return None
+
+    def load(self, force=False):
+        '''
+        Loads artifacts if they changed (or if force=True)
+        Returns True when a new bundle was swapped in.
+        '''
+        try:
+            with self._load_lock:
+                return self._load(force)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _load(self, force):
+        signature = self._stat_signature()
+        if not force and self._bundle is not None and signature == self._signature:
+            return False
+
+        release = self._read_release()
+        version = self._expected_version(release)
+        if version is None:
+            logging.info("Model release does not match artifacts yet, skipping reload")
+            return False
+
+        if not force and self._bundle is not None and version == self._bundle.version:
+            self._signature = signature
+            return False
+
+        # Heavy work happens before the swap, requests keep using old bundle meanwhile
+        logging.info(f"Loading model bundle {version}")
+        if self._use_compiled(release):
+            # Only NumPy arrays, original training library is not imported
+            model_file_path = self.registry_config.compiled_model_file_path
+        else:
+            model_file_path = self.registry_config.model_file_path
+
+        preprocessor = load_object(file_path=self.registry_config.preprocessor_file_path)
+        fast_preprocessor = self._load_fast_preprocessor(release, preprocessor)
+
+        bundle = ModelBundle(
+            model=load_object(file_path=model_file_path),
+            preprocessor=preprocessor,
+            version=version,
+            loaded_at=time.time(),
+            fast_preprocessor=fast_preprocessor,
+        )
+
+        # Swap (single reference assignment is atomic)
+        self._bundle = bundle
+        self._signature = signature
+
+        logging.info(f"Model bundle {version} is live ({type(bundle.model).__name__})")
+        return True
+
+    def get(self):
+        '''
+        Current bundle. First call loads it if app startup did not.
+        Raises ModelNotReady while no release could be loaded at all
+        (once one is live, a bad new release keeps the old bundle).
+        '''
+        if self._bundle is None:
+            self.load()
+        bundle = self._bundle
+        if bundle is None:
+            raise ModelNotReady(self.registry_config.release_file_path,
+                                int(self.registry_config.poll_interval_seconds))
+        return bundle
+
+    def _watch(self):
+        while not self._stop_event.wait(self.registry_config.poll_interval_seconds):
+            try:
+                self.load()
+            except Exception as e:
+                # Keep serving old model if new one is broken
+                logging.info(f"Model reload failed: {e}")
+
+    def start_watcher(self):
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop_event.clear()
+        self._watcher = threading.Thread(target=self._watch, name="model-registry-watcher", daemon=True)
+        self._watcher.start()
+        logging.info("Model registry watcher started")
+
+    def stop_watcher(self):
+        self._stop_event.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=self.registry_config.poll_interval_seconds + 1)
+        self._watcher = None
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+def get_model_registry():
+    '''
+    Process wide registry (one copy of the model per worker)
+    '''
+    global _default_registry
+    if _default_registry is None:
+        with _default_registry_lock:
+            if _default_registry is None:
+                _default_registry = ModelRegistry()
+    return _default_registry
@@ -1,6 +1,8 @@
 import os
 import sys
+import json
 from dataclasses import dataclass
+from scipy import sparse
 
 from catboost import CatBoostRegressor
 from sklearn.ensemble import (
@@ -16,27 +18,31 @@ from xgboost import XGBRegressor
 
 from src.exception import CustomException
 from src.logger import logging
-from src.utils import save_object, evaluate_models
+from src.utils import save_object, evaluate_models, prepare_model_input
+from src.components.tree_compiler import compile_tree_model, check_parity, compare_latency
 
 @dataclass
 class ModelTrainerConfig:
     trained_model_file_path = os.path.join("artifacts", "model.pkl")
+    # Flat array copy of best tree model for serving (only if it matches + is faster)
+    compiled_model_file_path = os.path.join("artifacts", "model_compiled.pkl")
+    compiled_report_file_path = os.path.join("artifacts", "model_compiled.json")
+    # Successive halving instead of evaluate_models' exhaustive "grid" default:
+    # much faster, but may pick different hyperparameters than a full grid
+    search = "halving"
     
 class ModelTrainer:
     def __init__(self):
         self.model_trainer_config = ModelTrainerConfig()
         
-    def initiate_model_trainer(self, train_array, test_array):
+    def initiate_model_trainer(self, X_train, y_train, X_test, y_test, n_jobs=None):
+        '''
+        X_train / X_test: sparse CSR features from DataTransformation
+        y_train / y_test: log1p(price) vectors
+        n_jobs: cores for the model search (default all)
+        '''
         try:
-            logging.info("Split training and test input data")
-            
-            # Array Slicing: Last column is Target (Price) except that all other columns are features
-            X_train, y_train, X_test, y_test = (
-                train_array[:, :-1],
-                train_array[:, -1],
-                test_array[:, :-1],
-                test_array[:, -1],
-            )
+            logging.info(f"Training input: {X_train.shape[0]} rows, {X_train.shape[1]} features")
             
             # Dictionary of models to try
             models = {
@@ -77,7 +83,7 @@ class ModelTrainer:
                     'n_estimators': [8, 16, 32, 64, 128, 256]
                 }
             }
-            logging.info("Model Training Started with Hyperparameter Tuning")
+            logging.info(f"Model Training Started with Hyperparameter Tuning ({self.model_trainer_config.search} search)")
             
             # Calling Utility Function
             model_report: dict = evaluate_models(
@@ -86,13 +92,23 @@ class ModelTrainer:
                 X_test=X_test,
                 y_test=y_test,
                 models=models,
-                param=params
+                param=params,
+                search=self.model_trainer_config.search,
+                n_jobs=n_jobs
             )
             
+            # Timings next to scores
+            for model_name, result in model_report.items():
+                logging.info(
+                    f"{model_name}: R2 Score {result['r2_score']:.4f}, "
+                    f"search time {result['fit_seconds']:.2f}s"
+                )
+            
             # Best Model Logic
-            best_model_score = max(sorted(model_report.values()))
-            best_model_name = list(model_report.keys())[list(model_report.values()).index(best_model_score)]
+            best_model_name = max(model_report, key=lambda name: model_report[name]["r2_score"])
+            best_model_score = model_report[best_model_name]["r2_score"]
             
+            # Already fitted with best params by evaluate_models
             best_model = models[best_model_name]
             
             if best_model_score < 0.6:
@@ -100,16 +116,57 @@ class ModelTrainer:
             
             logging.info(f"Best Found Model: {best_model_name} with R2 Score: {best_model_score}")
             
-            # Saving Best Model
+            # Saving Best Model (UBJSON / .cbm / joblib, model.pkl points to it)
             save_object(
                 file_path=self.model_trainer_config.trained_model_file_path,
-                obj=best_model
+                obj=best_model,
+                fast_format=True
             )
             
-            predicted = best_model.predict(X_test)
+            self.export_compiled_model(best_model, X_train, X_test)
+            
+            predicted = best_model.predict(prepare_model_input(best_model, X_test))
             r2_square = r2_score(y_test, predicted)
             
             return r2_square
             
         except Exception as e:
-            raise CustomException(e, sys)
\ No newline at end of file
+            raise CustomException(e, sys)
+    
+    def export_compiled_model(self, best_model, X_train, X_test):
+        '''
+        Tree models -> CompiledTreeEnsemble (NumPy arrays only).
+        Saved only if predictions match original on test data and
+        single row prediction is faster, otherwise API keeps original model.
+        '''
+        config = self.model_trainer_config
+        
+        # Old compiled file must never be served with new model
+        for path in (config.compiled_model_file_path, config.compiled_report_file_path):
+            if os.path.exists(path):
+                os.remove(path)
+        
+        try:
+            # XGBoost on CSR: absent entries were "missing" during training
+            compiled = compile_tree_model(best_model, trained_on_sparse=sparse.issparse(X_train))
+            if compiled is None:
+                return None
+            
+            max_diff = check_parity(best_model, compiled, X_test, prepare_model_input)
+            latency = compare_latency(best_model, compiled, X_test, prepare_model_input)
+        except Exception as e:
+            logging.info(f"Compiled model not exported: {e}")
+            return None
+        
+        report = {"model": compiled.source, "max_abs_diff": max_diff, "latency_us": latency}
+        logging.info(f"Compiled model report: {report}")
+        
+        if latency["compiled_1_row"] >= latency["original_1_row"]:
+            logging.info("Compiled model is not faster for single rows, original model will be served")
+            return None
+        
+        save_object(file_path=config.compiled_model_file_path, obj=compiled, fast_format=True)
+        with open(config.compiled_report_file_path, "w") as f:
+            json.dump(report, f, indent=2)
+        
+        return config.compiled_model_file_path
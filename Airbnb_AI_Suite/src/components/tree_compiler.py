@@ -0,0 +1,341 @@
+import os
+import sys
+import json
+import time
+import tempfile
+
+import numpy as np
+from scipy import sparse
+
+from src.exception import CustomException
+from src.logger import logging
+
+class CompiledTreeEnsemble:
+    '''
+    Tree ensemble as flat NumPy arrays (all trees in one node table).
+
+    Every node: feature, threshold, left, right, default_left, value.
+    Leaves point to themselves, so walking max_depth steps from the roots
+    always ends on a leaf. Rule everywhere: x <= threshold -> left.
+
+    Only NumPy / SciPy are needed to predict (no sklearn / xgboost / catboost).
+    '''
+    def __init__(self, feature, threshold, left, right, default_left, value, roots,
+                 max_depth, n_features, aggregation="sum", base_score=0.0, scale=1.0,
+                 weights=None, missing_as_nan=False, source=""):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_features = n_features
+        # sum -> base_score + scale * sum, mean -> average, weighted_median -> AdaBoost
+        self.aggregation = aggregation
+        self.base_score = base_score
+        self.scale = scale
+        self.weights = weights
+        # XGBoost trained on CSR: entries not stored in matrix are "missing", not 0
+        self.missing_as_nan = missing_as_nan
+        self.source = source
+
+    def _to_dense(self, X):
+        if not sparse.issparse(X):
+            return np.asarray(X, dtype="float32")
+        if not self.missing_as_nan:
+            return X.toarray().astype("float32", copy=False)
+        X = X.tocsr()
+        dense = np.full(X.shape, np.nan, dtype="float32")
+        rows = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+        dense[rows, X.indices] = X.data
+        return dense
+
+    def leaf_values(self, X):
+        '''
+        (n_rows, n_trees) value of the leaf each row lands in
+        '''
+        X = self._to_dense(X)
+        n_rows, n_columns = X.shape
+        X_flat = X.ravel()
+        # Row start in flat X, so one gather picks x[row, feature[node]]
+        row_offsets = (np.arange(n_rows) * n_columns)[:, None]
+        node = np.broadcast_to(self.roots, (n_rows, len(self.roots))).copy()
+        has_missing = np.isnan(X_flat).any()
+
+        # children[node, 1] = left, children[node, 0] = right
+        children = self.children
+        for step in range(self.max_depth):
+            x = X_flat[row_offsets + self.feature[node]]
+            go_left = x <= self.threshold[node]
+            if has_missing:
+                go_left |= np.isnan(x) & self.default_left[node]
+            node = children[node, go_left.view("int8")]
+
+            # Deep trees: most paths end long before max_depth
+            if step % 8 == 7 and (children[node, 0] == node).all():
+                break
+
+        return self.value[node]
+
+    @property
+    def children(self):
+        if getattr(self, "_children", None) is None:
+            self._children = np.stack([self.right, self.left], axis=1)
+        return self._children
+
+    def predict(self, X):
+        try:
+            values = self.leaf_values(X)
+
+            if self.aggregation == "mean":
+                return values.mean(axis=1)
+
+            if self.aggregation == "weighted_median":
+                # Same as AdaBoostRegressor._get_median_predict
+                sorted_idx = np.argsort(values, axis=1)
+                weight_cdf = np.cumsum(self.weights[sorted_idx], axis=1)
+                median_or_above = weight_cdf >= 0.5 * weight_cdf[:, -1][:, None]
+                median_idx = median_or_above.argmax(axis=1)
+                rows = np.arange(values.shape[0])
+                return values[rows, sorted_idx[rows, median_idx]]
+
+            return self.base_score + self.scale * values.sum(axis=1)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+def tree_depth(left, right, root=0):
+    depth, stack = 0, [(root, 0)]
+    while stack:
+        node, level = stack.pop()
+        if left[node] == -1:
+            depth = max(depth, level)
+        else:
+            stack.append((left[node], level + 1))
+            stack.append((right[node], level + 1))
+    return depth
+
+def merge_trees(trees, n_features, **kwargs):
+    '''
+    trees: list of dicts with per tree node arrays (children -1 for leaves)
+    -> one CompiledTreeEnsemble with global node ids
+    '''
+    parts = {key: [] for key in ("feature", "threshold", "left", "right", "default_left", "value")}
+    roots, offset, max_depth = [], 0, 0
+
+    for tree in trees:
+        n_nodes = len(tree["left"])
+        own_ids = np.arange(n_nodes) + offset
+        is_leaf = tree["left"] == -1
+
+        parts["feature"].append(np.where(is_leaf, 0, tree["feature"]))
+        parts["threshold"].append(np.where(is_leaf, np.inf, tree["threshold"]))
+        # Leaves loop to themselves
+        parts["left"].append(np.where(is_leaf, own_ids, tree["left"] + offset))
+        parts["right"].append(np.where(is_leaf, own_ids, tree["right"] + offset))
+        parts["default_left"].append(tree["default_left"])
+        parts["value"].append(tree["value"])
+
+        roots.append(offset)
+        max_depth = max(max_depth, tree_depth(tree["left"], tree["right"]))
+        offset += n_nodes
+
+    return CompiledTreeEnsemble(
+        feature=np.concatenate(parts["feature"]).astype("int32"),
+        threshold=np.concatenate(parts["threshold"]).astype("float64"),
+        left=np.concatenate(parts["left"]).astype("int32"),
+        right=np.concatenate(parts["right"]).astype("int32"),
+        default_left=np.concatenate(parts["default_left"]).astype(bool),
+        value=np.concatenate(parts["value"]).astype("float64"),
+        roots=np.asarray(roots, dtype="int32"),
+        max_depth=max_depth,
+        n_features=n_features,
+        **kwargs
+    )
+
+def sklearn_tree_arrays(estimator):
+    tree = estimator.tree_
+    missing_left = getattr(tree, "missing_go_to_left", np.zeros(tree.node_count, dtype=bool))
+    return {
+        "feature": tree.feature,
+        "threshold": tree.threshold,
+        "left": tree.children_left,
+        "right": tree.children_right,
+        "default_left": np.asarray(missing_left, dtype=bool),
+        "value": tree.value[:, 0, 0],
+    }
+
+def xgboost_tree_arrays(booster):
+    '''
+    Node arrays from booster JSON. XGBoost goes left on x < split, that is
+    x <= (largest float32 below split), so the same <= rule works.
+    '''
+    model = json.loads(booster.save_raw(raw_format="json"))
+    learner = model["learner"]
+
+    objective = learner["objective"]["name"]
+    if not objective.startswith("reg:") or objective == "reg:logistic":
+        raise ValueError(f"XGBoost objective '{objective}' is not supported")
+
+    trees = []
+    for tree in learner["gradient_booster"]["model"]["trees"]:
+        left = np.asarray(tree["left_children"])
+        split = np.asarray(tree["split_conditions"], dtype="float32")
+        trees.append({
+            "feature": np.asarray(tree["split_indices"]),
+            "threshold": np.nextafter(split, np.float32(-np.inf)),
+            "left": left,
+            "right": np.asarray(tree["right_children"]),
+            "default_left": np.asarray(tree["default_left"], dtype=bool),
+            # Leaf value is kept in split_conditions
+            "value": np.where(left == -1, split, 0.0),
+        })
+
+    base_score = float(str(learner["learner_model_param"]["base_score"]).strip("[]"))
+    return trees, base_score, int(learner["learner_model_param"]["num_feature"])
+
+def catboost_tree_arrays(model):
+    '''
+    Oblivious trees (one split per level) expanded to normal binary trees.
+    Level d split goes right on x > border, leaf id bit d = that decision.
+    '''
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_path = os.path.join(tmp_dir, "model.json")
+        model.save_model(json_path, format="json")
+        with open(json_path) as f:
+            model_json = json.load(f)
+
+    float_features = {
+        feature["feature_index"]: feature["flat_feature_index"]
+        for feature in model_json["features_info"]["float_features"]
+    }
+    if model_json["features_info"].get("categorical_features"):
+        raise ValueError("CatBoost categorical features are not supported")
+
+    trees = []
+    for tree in model_json["oblivious_trees"]:
+        splits = tree["splits"]
+        depth = len(splits)
+        n_internal = 2 ** depth - 1
+        n_nodes = n_internal + 2 ** depth
+
+        # Heap layout: node i -> children 2i+1 / 2i+2, leaves after internal nodes
+        feature = np.zeros(n_nodes, dtype="int64")
+        threshold = np.zeros(n_nodes, dtype="float64")
+        left = np.full(n_nodes, -1, dtype="int64")
+        right = np.full(n_nodes, -1, dtype="int64")
+        value = np.zeros(n_nodes, dtype="float64")
+
+        for node in range(n_internal):
+            level = int(np.floor(np.log2(node + 1)))
+            feature[node] = float_features[splits[level]["float_feature_index"]]
+            threshold[node] = np.float32(splits[level]["border"])
+            left[node], right[node] = 2 * node + 1, 2 * node + 2
+
+        for position in range(2 ** depth):
+            # Path bits from root: first level is most significant in heap order
+            leaf_id = sum(((position >> (depth - 1 - level)) & 1) << level for level in range(depth))
+            value[n_internal + position] = tree["leaf_values"][leaf_id]
+
+        trees.append({
+            "feature": feature,
+            "threshold": threshold,
+            "left": left,
+            "right": right,
+            # NaN treated as smallest value (CatBoost default "Min") -> left
+            "default_left": np.ones(n_nodes, dtype=bool),
+            "value": value,
+        })
+
+    scale, bias = model_json.get("scale_and_bias", [1.0, [0.0]])
+    bias = bias[0] if isinstance(bias, list) else bias
+    return trees, float(bias), float(scale), len(float_features)
+
+def gradient_boosting_init(model):
+    '''
+    Constant first guess of GradientBoostingRegressor from public init_:
+    DummyRegressor (mean / median / quantile of y) or "zero".
+    Any other init estimator depends on X, so it can't be one base score.
+    '''
+    init = model.init_
+    if isinstance(init, str) and init == "zero":
+        return 0.0
+    if type(init).__name__ == "DummyRegressor":
+        # Dummy ignores the row, one zero row gives its constant
+        return float(np.ravel(init.predict(np.zeros((1, model.n_features_in_))))[0])
+    raise ValueError(f"GradientBoosting init {type(init).__name__} is not a constant")
+
+def compile_tree_model(model, trained_on_sparse=False):
+    '''
+    Converts fitted tree model to CompiledTreeEnsemble.
+    Returns None for models without trees (Linear Regression, KNN ...)
+    '''
+    try:
+        name = type(model).__name__
+
+        if name == "DecisionTreeRegressor":
+            return merge_trees([sklearn_tree_arrays(model)], model.n_features_in_, source=name)
+
+        if name in ("RandomForestRegressor", "ExtraTreesRegressor"):
+            trees = [sklearn_tree_arrays(estimator) for estimator in model.estimators_]
+            return merge_trees(trees, model.n_features_in_, aggregation="mean", source=name)
+
+        if name == "GradientBoostingRegressor":
+            trees = [sklearn_tree_arrays(estimator) for estimator in model.estimators_[:, 0]]
+            return merge_trees(trees, model.n_features_in_, base_score=gradient_boosting_init(model),
+                               scale=model.learning_rate, source=name)
+
+        if name == "AdaBoostRegressor":
+            trees = [sklearn_tree_arrays(estimator) for estimator in model.estimators_]
+            weights = np.asarray(model.estimator_weights_[:len(model.estimators_)], dtype="float64")
+            return merge_trees(trees, model.n_features_in_, aggregation="weighted_median",
+                               weights=weights, source=name)
+
+        if name == "XGBRegressor":
+            trees, base_score, n_features = xgboost_tree_arrays(model.get_booster())
+            return merge_trees(trees, n_features, base_score=base_score,
+                               missing_as_nan=trained_on_sparse, source=name)
+
+        if name == "CatBoostRegressor":
+            trees, bias, scale, n_features = catboost_tree_arrays(model)
+            return merge_trees(trees, n_features, base_score=bias, scale=scale, source=name)
+
+        logging.info(f"{name} has no trees to compile, original model will be used")
+        return None
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def check_parity(model, compiled, X, prepare_input, rtol=1e-5, atol=1e-5):
+    '''
+    Compiled predictions must match original model on X.
+    Returns max absolute difference.
+    '''
+    expected = np.asarray(model.predict(prepare_input(model, X)), dtype="float64")
+    actual = compiled.predict(X)
+    max_diff = float(np.max(np.abs(expected - actual))) if len(expected) else 0.0
+    if not np.allclose(expected, actual, rtol=rtol, atol=atol):
+        raise ValueError(f"Compiled {compiled.source} does not match original model (max diff {max_diff})")
+    return max_diff
+
+def compare_latency(model, compiled, X, prepare_input, batch_sizes=(1, 32), repeats=50):
+    '''
+    Median predict time in microseconds, original vs compiled
+    '''
+    report = {}
+    for batch_size in batch_sizes:
+        X_batch = X[:batch_size]
+        for label, predict in (
+            ("original", lambda: model.predict(prepare_input(model, X_batch))),
+            ("compiled", lambda: compiled.predict(X_batch)),
+        ):
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                predict()
+                timings.append(time.perf_counter() - start)
+            report[f"{label}_{batch_size}_row" + ("s" if batch_size > 1 else "")] = round(
+                float(np.median(timings)) * 1e6, 1
+            )
+    return report
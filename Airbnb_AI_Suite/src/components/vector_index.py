@@ -0,0 +1,197 @@
+import os
+import sys
+import json
+import time
+from dataclasses import dataclass, asdict, replace
+
+import numpy as np
+import faiss
+
+from src.exception import CustomException
+from src.logger import logging
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+@dataclass
+class VectorIndexConfig:
+    '''
+    Which FAISS index to build and its parameters.
+    flat     -> exact brute force (best accuracy, slow on big corpus)
+    ivf_flat -> clusters + exact vectors (nlist / nprobe)
+    ivf_pq   -> clusters + compressed vectors (least memory)
+    hnsw     -> graph search (fast, no training needed)
+    '''
+    index_type: str = "flat"
+    # IVF: number of clusters and how many to visit per query
+    nlist: int = 1024
+    nprobe: int = 16
+    # PQ: sub vectors (must divide dimension) and bits per code
+    pq_m: int = 16
+    pq_nbits: int = 8
+    # HNSW: graph links per node and search depth
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    ef_search: int = 64
+    # Vectors used to train IVF / PQ (training on all rows is slow)
+    train_sample_size: int = 100000
+    random_state: int = 42
+
+def build_index(embeddings, config, ids=None):
+    '''
+    Creates, trains and fills FAISS index as per config.
+    With ids, search returns these ids (not positions) and rows can
+    later be removed / added one by one (incremental updates).
+    '''
+    try:
+        if config.index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index_type '{config.index_type}', choose from {INDEX_TYPES}")
+
+        embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+        n_rows, dimension = embeddings.shape
+
+        if config.index_type == "flat":
+            index = faiss.IndexFlatL2(dimension)
+
+        elif config.index_type == "hnsw":
+            index = faiss.IndexHNSWFlat(dimension, config.hnsw_m)
+            index.hnsw.efConstruction = config.ef_construction
+
+        else:
+            # FAISS wants ~39 training points per cluster
+            nlist = max(1, min(config.nlist, n_rows // 39))
+            if nlist != config.nlist:
+                logging.info(f"nlist reduced from {config.nlist} to {nlist} for {n_rows} vectors")
+                # Local copy, caller's config is reused for later builds
+                # (index_params reads the real value from the index)
+                config = replace(config, nlist=nlist)
+
+            quantizer = faiss.IndexFlatL2(dimension)
+            if config.index_type == "ivf_flat":
+                index = faiss.IndexIVFFlat(quantizer, dimension, nlist)
+            else:
+                index = faiss.IndexIVFPQ(quantizer, dimension, nlist, config.pq_m, config.pq_nbits)
+
+            # Train on random sample
+            rng = np.random.default_rng(config.random_state)
+            sample_size = min(config.train_sample_size, n_rows)
+            sample = embeddings[rng.choice(n_rows, size=sample_size, replace=False)]
+            logging.info(f"Training {config.index_type} index on {sample_size} vectors")
+            index.train(sample)
+
+        if ids is None:
+            index.add(embeddings)
+        else:
+            # IVF keeps ids itself, Flat / HNSW need an id map around them
+            if config.index_type in ("flat", "hnsw"):
+                index = faiss.IndexIDMap2(index)
+            index.add_with_ids(embeddings, np.asarray(ids, dtype="int64"))
+
+        apply_search_params(index, config)
+        return index
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def apply_search_params(index, config):
+    '''
+    Query time knobs (nprobe for IVF, efSearch for HNSW)
+    '''
+    params = faiss.ParameterSpace()
+    if config.index_type in ("ivf_flat", "ivf_pq"):
+        params.set_index_parameter(index, "nprobe", config.nprobe)
+    elif config.index_type == "hnsw":
+        params.set_index_parameter(index, "efSearch", config.ef_search)
+
+def supports_incremental(index):
+    '''
+    True if ids can be removed from index without renumbering other rows
+    (HNSW graph can't remove, old flat indexes have no id map)
+    '''
+    if isinstance(index, faiss.IndexIVF):
+        return True
+    if isinstance(index, faiss.IndexIDMap2):
+        return not isinstance(faiss.downcast_index(index.index), faiss.IndexHNSW)
+    return False
+
+def index_params(config, index):
+    '''
+    Config as dict, with the nlist the IVF index really has
+    (build_index lowers it for small corpora)
+    '''
+    params = asdict(config)
+    if config.index_type in ("ivf_flat", "ivf_pq"):
+        params["nlist"] = int(faiss.extract_index_ivf(index).nlist)
+    return params
+
+def save_index_info(info_file, config, index, model_name):
+    '''
+    Stores index type + params next to faiss_index.bin
+    '''
+    info = {
+        "index_type": config.index_type,
+        "params": index_params(config, index),
+        "dimension": index.d,
+        "ntotal": index.ntotal,
+        "model_name": model_name,
+        "built_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    with open(info_file, "w") as f:
+        json.dump(info, f, indent=2)
+
+def load_index_info(info_file):
+    '''
+    Returns saved VectorIndexConfig (flat for old indexes without info file)
+    '''
+    if not os.path.exists(info_file):
+        return VectorIndexConfig()
+    with open(info_file) as f:
+        info = json.load(f)
+    return VectorIndexConfig(**info["params"])
+
+def benchmark_indexes(embeddings, query_vectors, configs, top_k=10):
+    '''
+    Recall@k and latency of each index config compared with exact flat search.
+    Recall = how many of flat's top_k neighbours the index also found.
+    '''
+    try:
+        embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+        query_vectors = np.ascontiguousarray(query_vectors, dtype="float32")
+
+        report = []
+        exact_neighbours = None
+
+        for config in [VectorIndexConfig(index_type="flat")] + list(configs):
+            build_start = time.perf_counter()
+            index = build_index(embeddings, config)
+            build_seconds = time.perf_counter() - build_start
+
+            search_start = time.perf_counter()
+            _, neighbours = index.search(query_vectors, top_k)
+            search_seconds = time.perf_counter() - search_start
+
+            if exact_neighbours is None:
+                exact_neighbours = neighbours
+
+            hits = sum(
+                len(set(found[found >= 0]) & set(exact))
+                for found, exact in zip(neighbours, exact_neighbours)
+            )
+            recall = hits / exact_neighbours.size
+
+            row = {
+                "index_type": config.index_type,
+                "params": index_params(config, index),
+                f"recall@{top_k}": round(recall, 4),
+                "latency_ms_per_query": round(search_seconds * 1000 / len(query_vectors), 4),
+                "build_seconds": round(build_seconds, 2),
+            }
+            report.append(row)
+            logging.info(
+                f"Index: {config.index_type} | Recall@{top_k}: {row[f'recall@{top_k}']} | "
+                f"Latency: {row['latency_ms_per_query']} ms/query"
+            )
+
+        return report
+
+    except Exception as e:
+        raise CustomException(e, sys)
@@ -0,0 +1,131 @@
+import asyncio
+import functools
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from src.logger import logging
+
+@dataclass
+class InferenceExecutorConfig:
+    # Threads doing CPU work for this route group
+    threads: int = 2
+    # Requests allowed in flight (running + waiting) before we answer 503
+    max_pending: int = 64
+    # Sent to client in Retry-After header on 503
+    retry_after_seconds: int = 1
+
+class ExecutorOverloaded(Exception):
+    def __init__(self, name, retry_after_seconds):
+        super().__init__(f"{name} executor is overloaded")
+        self.name = name
+        self.retry_after_seconds = retry_after_seconds
+
+class InferenceExecutor:
+    '''
+    Own thread pool + admission limit for one kind of inference
+    (search / predict), so a slow route can't use up the threads of
+    another one or of the health check.
+
+    acquire / release are only called from the event loop thread,
+    so plain counters are enough.
+    '''
+    def __init__(self, name, config=None):
+        self.name = name
+        self.executor_config = config or InferenceExecutorConfig()
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.executor_config.threads, thread_name_prefix=f"{name}-inference"
+        )
+        self.pending = 0
+        self.max_seen_pending = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    def acquire(self):
+        '''
+        Takes one slot or raises ExecutorOverloaded (-> 503)
+        '''
+        if self.pending >= self.executor_config.max_pending:
+            self.rejected += 1
+            raise ExecutorOverloaded(self.name, self.executor_config.retry_after_seconds)
+        self.pending += 1
+        self.admitted += 1
+        self.max_seen_pending = max(self.max_seen_pending, self.pending)
+
+    def release(self):
+        self.pending -= 1
+
+    @contextmanager
+    def admit(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def run(self, fn, *args, **kwargs):
+        '''
+        Runs fn in this executor's threads, event loop stays free
+        '''
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+
+    def stats(self):
+        return {
+            "threads": self.executor_config.threads,
+            "max_pending": self.executor_config.max_pending,
+            "pending": self.pending,
+            "max_seen_pending": self.max_seen_pending,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        logging.info(f"{self.name} executor stopped: {self.stats()}")
+
+class RouteLatencyMetrics:
+    '''
+    Latency histogram per route (time until response starts)
+    '''
+    LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+    def __init__(self):
+        self.routes = {}
+
+    def record(self, route, status_code, latency_ms):
+        stats = self.routes.get(route)
+        if stats is None:
+            stats = {
+                "requests": 0,
+                "errors": 0,
+                "rejected": 0,
+                "latency_ms_total": 0.0,
+                "latency_ms_max": 0.0,
+                "histogram": {bucket: 0 for bucket in self.LATENCY_BUCKETS_MS},
+            }
+            self.routes[route] = stats
+
+        stats["requests"] += 1
+        if status_code == 503:
+            stats["rejected"] += 1
+        elif status_code >= 500:
+            stats["errors"] += 1
+        stats["latency_ms_total"] += latency_ms
+        stats["latency_ms_max"] = max(stats["latency_ms_max"], latency_ms)
+
+        bucket = next((b for b in self.LATENCY_BUCKETS_MS if latency_ms <= b), "inf")
+        stats["histogram"][bucket] = stats["histogram"].get(bucket, 0) + 1
+
+    def snapshot(self):
+        return {
+            route: {
+                "requests": stats["requests"],
+                "errors": stats["errors"],
+                "rejected": stats["rejected"],
+                "avg_latency_ms": stats["latency_ms_total"] / stats["requests"] if stats["requests"] else 0.0,
+                "max_latency_ms": stats["latency_ms_max"],
+                "latency_ms_histogram": {str(k): v for k, v in stats["histogram"].items()},
+            }
+            for route, stats in self.routes.items()
+        }
@@ -0,0 +1,170 @@
+import sys
+import time
+import asyncio
+from dataclasses import dataclass
+
+from src.exception import CustomException
+from src.logger import logging
+
+@dataclass
+class MicroBatcherConfig:
+    # Flush when this many requests are waiting...
+    max_batch_size: int = 64
+    # ...or when the first request in batch has waited this long
+    max_wait_ms: float = 5.0
+
+class BatchingMetrics:
+    '''
+    Batch size and queue wait numbers for /metrics
+    '''
+    BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+    QUEUE_WAIT_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250)
+
+    def __init__(self):
+        self.batches = 0
+        self.requests = 0
+        self.failed_batches = 0
+        self.max_batch_size = 0
+        self.queue_wait_ms_total = 0.0
+        self.queue_wait_ms_max = 0.0
+        self.batch_size_histogram = {bucket: 0 for bucket in self.BATCH_SIZE_BUCKETS}
+        self.queue_wait_histogram = {bucket: 0 for bucket in self.QUEUE_WAIT_BUCKETS_MS}
+
+    @staticmethod
+    def _bucket(value, buckets):
+        for bucket in buckets:
+            if value <= bucket:
+                return bucket
+        return "inf"
+
+    def record_batch(self, batch_size, queue_waits_ms):
+        self.batches += 1
+        self.requests += batch_size
+        self.max_batch_size = max(self.max_batch_size, batch_size)
+        bucket = self._bucket(batch_size, self.BATCH_SIZE_BUCKETS)
+        self.batch_size_histogram[bucket] = self.batch_size_histogram.get(bucket, 0) + 1
+
+        for wait_ms in queue_waits_ms:
+            self.queue_wait_ms_total += wait_ms
+            self.queue_wait_ms_max = max(self.queue_wait_ms_max, wait_ms)
+            bucket = self._bucket(wait_ms, self.QUEUE_WAIT_BUCKETS_MS)
+            self.queue_wait_histogram[bucket] = self.queue_wait_histogram.get(bucket, 0) + 1
+
+    def snapshot(self):
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "failed_batches": self.failed_batches,
+            "avg_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "avg_queue_wait_ms": self.queue_wait_ms_total / self.requests if self.requests else 0.0,
+            "max_queue_wait_ms": self.queue_wait_ms_max,
+            "batch_size_histogram": {str(k): v for k, v in self.batch_size_histogram.items()},
+            "queue_wait_ms_histogram": {str(k): v for k, v in self.queue_wait_histogram.items()},
+        }
+
+class MicroBatcher:
+    '''
+    Collects concurrent single row requests and runs them as one batch.
+
+    predict_fn gets a list of rows (dicts) and must return one prediction
+    per row. It runs in an executor so the event loop stays free.
+    '''
+    def __init__(self, predict_fn, config=None, executor=None):
+        self.predict_fn = predict_fn
+        self.batcher_config = config or MicroBatcherConfig()
+        self.executor = executor
+        self.metrics = BatchingMetrics()
+        self._queue = None
+        self._worker = None
+        # Rows taken from the queue and not answered yet (being collected / predicted)
+        self._batch = []
+
+    async def start(self):
+        if self._worker is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+        logging.info(
+            f"Micro batcher started (max_batch_size={self.batcher_config.max_batch_size}, "
+            f"max_wait_ms={self.batcher_config.max_wait_ms})"
+        )
+
+    async def stop(self):
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+        # Nobody will answer these anymore
+        while not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            self._fail_stopped([future])
+
+    @staticmethod
+    def _fail_stopped(futures):
+        for future in futures:
+            if not future.done():
+                future.set_exception(RuntimeError("Micro batcher stopped"))
+
+    async def submit(self, row):
+        '''
+        Adds one row to the queue and waits for its prediction
+        '''
+        if self._worker is None:
+            await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future, time.perf_counter()))
+        return await future
+
+    async def _collect_batch(self):
+        # Wait for first request, then collect more until window closes or batch is full
+        # Kept on self, so stop() can answer them if it cancels us mid batch
+        batch = self._batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batcher_config.max_wait_ms / 1000
+
+        while len(batch) < self.batcher_config.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                batch = await self._collect_batch()
+                rows = [row for row, _, _ in batch]
+                futures = [future for _, future, _ in batch]
+
+                started = time.perf_counter()
+                queue_waits_ms = [(started - enqueued) * 1000 for _, _, enqueued in batch]
+                self.metrics.record_batch(len(batch), queue_waits_ms)
+
+                try:
+                    preds = await loop.run_in_executor(self.executor, self.predict_fn, rows)
+                    for future, pred in zip(futures, preds):
+                        if not future.done():
+                            future.set_result(pred)
+                except Exception as e:
+                    self.metrics.failed_batches += 1
+                    error = e if isinstance(e, CustomException) else CustomException(e, sys)
+                    for future in futures:
+                        if not future.done():
+                            future.set_exception(error)
+                self._batch = []
+        except asyncio.CancelledError:
+            # CancelledError is not an Exception: rows of the current batch
+            # (collecting or waiting on the executor) would never be answered
+            self._fail_stopped([future for _, future, _ in self._batch])
+            self._batch = []
+            raise
@@ -1,12 +1,29 @@
+import os
 import sys
+import numpy as np
 import pandas as pd
-import os
 from src.exception import CustomException
-from src.utils import load_object
+from src.components.model_registry import get_model_registry
+from src.utils import prepare_model_input
+
+# Input columns expected by preprocessor (same order as CustomData)
+FEATURE_COLUMNS = [
+    "neighbourhood_group",
+    "neighbourhood",
+    "latitude",
+    "longitude",
+    "room_type",
+    "minimum_nights",
+    "number_of_reviews",
+    "reviews_per_month",
+    "calculated_host_listings_count",
+    "availability_365",
+]
 
 class PredictPipeline:
-    def __init__(self):
-        pass
+    def __init__(self, registry=None):
+        # Model + Preprocessor stay in memory (loaded once, hot reloaded by registry)
+        self.registry = registry or get_model_registry()
     
     def predict(self, features):
         '''
@@ -14,23 +31,65 @@ class PredictPipeline:
         it will do preprocess and it will predict
         '''
         try:
-            # Load Artifacts
-            model_path = os.path.join("artifacts", "model.pkl")
-            preprocessor_path = os.path.join("artifacts", "preprocessor.pkl")
-            
-            print("Loading Model and Preprocessor...")
-            model = load_object(file_path=model_path)
-            preprocessor = load_object(file_path=preprocessor_path)
+            # Same bundle for both steps, so a reload in between can't mix versions
+            bundle = self.registry.get()
             
             # Step 1: Transform Data (Scaling + OneHotEncoding)
-            data_scaled = preprocessor.transform(features)
+            data_scaled = bundle.preprocessor.transform(features)
             
             # Step 2: Do prediction
-            preds = model.predict(data_scaled)
+            preds = bundle.model.predict(prepare_model_input(bundle.model, data_scaled))
             
             return preds
         except Exception as e:
             raise CustomException(e, sys)
+    
+    def predict_records(self, records):
+        '''
+        Hot path for API: list of listing dicts -> predictions.
+        Compiled preprocessor fills feature matrix directly (no DataFrame).
+        '''
+        try:
+            bundle = self.registry.get()
+            
+            if bundle.fast_preprocessor is not None:
+                data_scaled = bundle.fast_preprocessor.transform_records(records)
+            else:
+                data_scaled = bundle.preprocessor.transform(CustomData.get_batch_as_data_frame(records))
+            
+            return bundle.model.predict(prepare_model_input(bundle.model, data_scaled))
+        except Exception as e:
+            raise CustomException(e, sys)
+    
+    def iter_predict_batch(self, features, chunk_size=10000):
+        '''
+        Many listings at once: one transform + one predict per chunk
+        (instead of one per row). Yields (start_row, preds) so callers
+        can stream results while next chunk is running.
+        '''
+        try:
+            # Whole batch is scored by the same model version
+            bundle = self.registry.get()
+            features = features[FEATURE_COLUMNS]
+            
+            for start in range(0, len(features), chunk_size):
+                chunk = features.iloc[start:start + chunk_size]
+                data_scaled = bundle.preprocessor.transform(chunk)
+                yield start, bundle.model.predict(prepare_model_input(bundle.model, data_scaled))
+        except Exception as e:
+            raise CustomException(e, sys)
+    
+    def predict_batch(self, features, chunk_size=10000):
+        '''
+        Same as predict but for thousands of rows, returns all predictions
+        '''
+        try:
+            preds = [chunk_preds for _, chunk_preds in self.iter_predict_batch(features, chunk_size)]
+            if not preds:
+                return np.array([])
+            return np.concatenate(preds)
+        except Exception as e:
+            raise CustomException(e, sys)
         
 class CustomData:
     def __init__(self,
@@ -78,4 +137,39 @@ class CustomData:
             return pd.DataFrame(custom_data_input_dict)
         
         except Exception as e:
-            raise CustomException(e, sys)
\ No newline at end of file
+            raise CustomException(e, sys)
+    
+    @staticmethod
+    def get_batch_as_data_frame(records):
+        '''
+        List of listing dicts -> one DataFrame (for batch prediction)
+        '''
+        try:
+            return pd.DataFrame.from_records(records, columns=FEATURE_COLUMNS)
+        except Exception as e:
+            raise CustomException(e, sys)
+    
+    @staticmethod
+    def read_batch_file(file_obj, file_name):
+        '''
+        Uploaded CSV / Parquet file -> DataFrame with only the feature columns
+        (plus 'id' if file has it, so results can be matched back)
+        '''
+        try:
+            extension = os.path.splitext(file_name)[1].lower()
+            
+            if extension == ".csv":
+                df = pd.read_csv(file_obj)
+            elif extension in (".parquet", ".pq"):
+                df = pd.read_parquet(file_obj)
+            else:
+                raise ValueError(f"Unsupported file type '{extension}', use .csv or .parquet")
+            
+            missing_columns = [col for col in FEATURE_COLUMNS if col not in df.columns]
+            if missing_columns:
+                raise ValueError(f"Missing columns: {missing_columns}")
+            
+            keep_columns = (["id"] if "id" in df.columns else []) + FEATURE_COLUMNS
+            return df[keep_columns]
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -0,0 +1,252 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from src.exception import CustomException
+from src.logger import logging
+
+@dataclass
+class PredictionCacheConfig:
+    # Entries kept in process memory (LRU)
+    max_entries: int = 100000
+    # Cached prediction expires after this many seconds
+    ttl_seconds: float = 3600.0
+    # Shared between workers: "none", "sqlite" or "redis"
+    shared_backend: str = "none"
+    sqlite_path: str = os.path.join("artifacts", "prediction_cache.sqlite")
+    redis_url: str = "redis://localhost:6379/0"
+    # Rows kept in shared SQLite table (oldest removed first)
+    shared_max_entries: int = 1000000
+
+def canonical_key(record, feature_columns, model_version):
+    '''
+    Same listing features + same model -> same key
+    (key order, int vs float and extra fields don't matter)
+    '''
+    features = []
+    for col in feature_columns:
+        value = record.get(col)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = repr(float(value))
+        features.append(value)
+    payload = json.dumps([model_version, features], separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class SQLiteBackend:
+    '''
+    One SQLite file shared by all uvicorn workers on the machine
+    '''
+    def __init__(self, cache_config):
+        self.cache_config = cache_config
+        os.makedirs(os.path.dirname(cache_config.sqlite_path), exist_ok=True)
+        self._connection = sqlite3.connect(cache_config.sqlite_path, timeout=5, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS predictions (key TEXT PRIMARY KEY, value REAL NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._connection.commit()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def get(self, key):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM predictions WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?)",
+                (key, value, time.time() + self.cache_config.ttl_seconds)
+            )
+            self._writes += 1
+            # Clean up now and then, not on every write
+            if self._writes % 1000 == 0:
+                self._connection.execute("DELETE FROM predictions WHERE expires_at <= ?", (time.time(),))
+                self._connection.execute(
+                    "DELETE FROM predictions WHERE key IN (SELECT key FROM predictions ORDER BY expires_at "
+                    "LIMIT MAX(0, (SELECT COUNT(*) FROM predictions) - ?))",
+                    (self.cache_config.shared_max_entries,)
+                )
+            self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+class RedisBackend:
+    '''
+    Redis shared by workers on many machines (needs `pip install redis`)
+    '''
+    def __init__(self, cache_config):
+        import redis
+
+        self.cache_config = cache_config
+        self._client = redis.Redis.from_url(cache_config.redis_url)
+
+    def get(self, key):
+        value = self._client.get(f"prediction:{key}")
+        return None if value is None else float(value)
+
+    def set(self, key, value):
+        self._client.setex(f"prediction:{key}", int(self.cache_config.ttl_seconds), repr(float(value)))
+
+    def close(self):
+        self._client.close()
+
+SHARED_BACKENDS = {"sqlite": SQLiteBackend, "redis": RedisBackend}
+
+class PredictionCache:
+    '''
+    Model output per listing input, keyed by canonical_key (includes model
+    version, so a new release never serves old predictions).
+
+    Lookup: process LRU first, then optional shared backend.
+    '''
+    def __init__(self, feature_columns, config=None):
+        self.feature_columns = feature_columns
+        self.cache_config = config or PredictionCacheConfig()
+
+        self.shared = None
+        if self.cache_config.shared_backend not in ("none", "", None):
+            if self.cache_config.shared_backend not in SHARED_BACKENDS:
+                raise ValueError(f"Unknown shared_backend '{self.cache_config.shared_backend}'")
+            self.shared = SHARED_BACKENDS[self.cache_config.shared_backend](self.cache_config)
+
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._model_version = None
+
+        self.memory_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.shared_errors = 0
+        self.invalidations = 0
+
+    def _check_version(self, model_version):
+        # New model: old entries can't be hit anymore, free the memory now
+        if model_version != self._model_version:
+            if self._model_version is not None:
+                self._lru.clear()
+                self.invalidations += 1
+                logging.info(f"Prediction cache cleared for model version {model_version}")
+            self._model_version = model_version
+
+    def _memory_get(self, key, model_version):
+        with self._lock:
+            self._check_version(model_version)
+            entry = self._lru.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._lru.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._lru[key]
+        return None
+
+    def _shared_get(self, key):
+        # Blocking I/O (SQLite lock / Redis round trip): async callers run this in a thread
+        try:
+            return self.shared.get(key)
+        except Exception as e:
+            # Shared cache down: just predict
+            self.shared_errors += 1
+            logging.info(f"Shared prediction cache read failed: {e}")
+            return None
+
+    def _shared_set(self, key, value):
+        try:
+            self.shared.set(key, value)
+        except Exception as e:
+            self.shared_errors += 1
+            logging.info(f"Shared prediction cache write failed: {e}")
+
+    def _after_shared_get(self, key, value):
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.shared_hits += 1
+                self._put(key, value, time.monotonic())
+        return value
+
+    def _put(self, key, value, now):
+        self._lru[key] = (value, now + self.cache_config.ttl_seconds)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.cache_config.max_entries:
+            self._lru.popitem(last=False)
+
+    def _memory_set(self, record, model_version, value):
+        key = canonical_key(record, self.feature_columns, model_version)
+        with self._lock:
+            self._check_version(model_version)
+            self._put(key, value, time.monotonic())
+        return key
+
+    def get(self, record, model_version):
+        '''
+        Cached prediction or None (blocking, for sync code)
+        '''
+        key = canonical_key(record, self.feature_columns, model_version)
+        value = self._memory_get(key, model_version)
+        if value is not None:
+            return value
+        return self._after_shared_get(key, self._shared_get(key) if self.shared is not None else None)
+
+    def set(self, record, model_version, value):
+        try:
+            key = self._memory_set(record, model_version, float(value))
+            if self.shared is not None:
+                self._shared_set(key, float(value))
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    async def aget(self, record, model_version):
+        '''
+        get() for async routes: memory lookup inline, shared backend in a thread
+        so a slow SQLite / Redis never blocks the event loop
+        '''
+        key = canonical_key(record, self.feature_columns, model_version)
+        value = self._memory_get(key, model_version)
+        if value is not None:
+            return value
+        if self.shared is None:
+            return self._after_shared_get(key, None)
+        return self._after_shared_get(key, await asyncio.to_thread(self._shared_get, key))
+
+    async def aset(self, record, model_version, value):
+        try:
+            key = self._memory_set(record, model_version, float(value))
+            if self.shared is not None:
+                await asyncio.to_thread(self._shared_set, key, float(value))
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def stats(self):
+        lookups = self.memory_hits + self.shared_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.shared_hits) / lookups if lookups else 0.0,
+            "entries": len(self._lru),
+            "model_version": self._model_version,
+            "invalidations": self.invalidations,
+            "shared_backend": self.cache_config.shared_backend,
+            "shared_errors": self.shared_errors,
+        }
+
+    def close(self):
+        if self.shared is not None:
+            self.shared.close()
+        logging.info(f"Prediction cache closed: {self.stats()}")
@@ -0,0 +1,103 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import inspect
+from dataclasses import dataclass
+
+from src.exception import CustomException
+from src.logger import logging
+from src.components.model_registry import file_checksum
+
+@dataclass
+class StageCacheConfig:
+    cache_file: str = os.path.join("artifacts", "stage_cache.json")
+
+def module_files(*objects):
+    '''
+    Source files of classes / functions used by a stage (code version)
+    '''
+    return sorted({inspect.getsourcefile(obj) for obj in objects})
+
+def config_dict(config):
+    '''
+    Public attributes of a config object (works for dataclass fields
+    and plain class attributes like DataTransformationConfig)
+    '''
+    if config is None or isinstance(config, (dict, str, int, float, bool)):
+        return config
+    return {
+        name: getattr(config, name)
+        for name in dir(config)
+        if not name.startswith("_") and not callable(getattr(config, name))
+    }
+
+class StageCache:
+    '''
+    Remembers fingerprint of each stage's last successful run.
+
+    Fingerprint = hash of input files + config + stage source code.
+    Same fingerprint and all outputs still on disk -> stage can be skipped.
+    '''
+    def __init__(self, config=None):
+        self.cache_config = config or StageCacheConfig()
+        self.state = self._read()
+
+    def _read(self):
+        if not os.path.exists(self.cache_config.cache_file):
+            return {"stages": {}, "files": {}}
+        with open(self.cache_config.cache_file) as f:
+            return json.load(f)
+
+    def _write(self):
+        os.makedirs(os.path.dirname(self.cache_config.cache_file), exist_ok=True)
+        tmp_path = self.cache_config.cache_file + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.cache_config.cache_file)
+
+    def file_hash(self, file_path):
+        '''
+        SHA256 of file, reused while size + mtime are unchanged
+        (big listings CSV is not hashed again on every run)
+        '''
+        if not os.path.exists(file_path):
+            return "missing"
+        stat = os.stat(file_path)
+        cached = self.state["files"].get(file_path)
+        if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+            return cached["sha256"]
+
+        sha256 = file_checksum(file_path)
+        self.state["files"][file_path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256}
+        return sha256
+
+    def fingerprint(self, input_files=(), config=None, code_files=()):
+        try:
+            parts = {
+                "inputs": {path: self.file_hash(path) for path in input_files},
+                "config": config_dict(config),
+                "code": {path: self.file_hash(path) for path in code_files},
+            }
+            return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def is_fresh(self, stage, stage_fingerprint, output_files):
+        last_run = self.state["stages"].get(stage)
+        if last_run is None or last_run["fingerprint"] != stage_fingerprint:
+            return False
+        # Cached outputs must still be there (also payloads / optional files
+        # found after the last run, e.g. compiled model)
+        output_files = list(output_files) + last_run.get("outputs", [])
+        return all(os.path.exists(path) for path in output_files)
+
+    def record(self, stage, stage_fingerprint, output_files):
+        self.state["stages"][stage] = {
+            "fingerprint": stage_fingerprint,
+            "outputs": list(output_files),
+            "completed_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        self._write()
+        logging.info(f"Stage '{stage}' recorded in stage cache")
@@ -1,54 +1,301 @@
+import os
 import sys
+import argparse
+import multiprocessing
+from dataclasses import dataclass
+from typing import Optional
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from threadpoolctl import threadpool_limits
 from src.components.data_ingestion import DataIngestion
 from src.components.data_transformation import DataTransformation
 from src.components.model_trainer import ModelTrainer
 from src.components.genai_engine import GenAIEngine
+from src.components.model_registry import ModelRegistryConfig, publish_model_release
+from src.components import fast_preprocessor, tree_compiler
+from src.components import vector_index, metadata_store, embedding_cache
+from src.components.vector_index import VectorIndexConfig, INDEX_TYPES
+from src.pipeline.stage_cache import StageCache, module_files
 from src.exception import CustomException
+from src.logger import logging
+from src.utils import save_object
+from src import serialization
 
-class TrainPipeline:
-    def __init__(self):
+# Pipeline order (later stages use outputs of earlier ones)
+STAGES = ("ingestion", "transformation", "training", "vector_db")
+
+# Stage -> stages it needs. Vector DB only reads raw listings CSV,
+# so it runs next to ingestion -> transformation -> training.
+STAGE_DEPENDENCIES = {
+    "ingestion": (),
+    "transformation": ("ingestion",),
+    "training": ("transformation",),
+    "vector_db": (),
+}
+
+@dataclass
+class TrainPipelineConfig:
+    # Stages running at the same time (each in its own process)
+    max_parallel_stages: int = 2
+    # Threads for the sentence encoder (torch / BLAS) in vector_db stage
+    encoder_threads: int = max(1, (os.cpu_count() or 1) // 4)
+    # FAISS index for vector_db stage (None: flat for a new index,
+    # incremental updates keep the type of the existing one)
+    index_config: Optional[VectorIndexConfig] = None
+
+    def stage_threads(self, stage):
+        '''
+        Per stage CPU limit: encoder gets encoder_threads, model search
+        gets the rest, so both branches don't fight for same cores
+        '''
+        cores = os.cpu_count() or 1
+        if stage == "vector_db":
+            return self.encoder_threads
+        if stage == "training" and self.max_parallel_stages > 1:
+            return max(1, cores - self.encoder_threads)
+        return cores
+
+def run_stage_process(stage, threads, pipeline_config):
+    '''
+    Runs in a worker process: applies thread limit, then runs one stage
+    '''
+    # For libraries which read env when they start their pools
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
         pass
 
-    def run_pipeline(self):
+    # BLAS / OpenMP pools already loaded in this process
+    with threadpool_limits(limits=threads):
+        TrainPipeline(pipeline_config).stage_definitions()[stage]["run"](threads)
+    return stage
+
+class TrainPipeline:
+    def __init__(self, config=None):
+        self.pipeline_config = config or TrainPipelineConfig()
+        self.stage_cache = StageCache()
+
+    def stage_definitions(self):
+        '''
+        For every stage: input files, config, code files, output files
+        (these decide the fingerprint) and the function that runs it
+        '''
+        ingestion_obj = DataIngestion()
+        transform_obj = DataTransformation()
+        trainer_obj = ModelTrainer()
+        genai_obj = GenAIEngine(index_config=self.pipeline_config.index_config)
+
+        ingestion_config = ingestion_obj.ingestion_config
+        transform_config = transform_obj.data_transformation_config
+        trainer_config = trainer_obj.model_trainer_config
+        transformed_files = [
+            transform_config.preprocessor_obj_file_path,
+            transform_config.train_features_path,
+            transform_config.train_target_path,
+            transform_config.test_features_path,
+            transform_config.test_target_path,
+        ]
+
+        return {
+            "ingestion": {
+                "inputs": [ingestion_config.source_data_path],
+                "config": ingestion_config,
+                "code": module_files(DataIngestion, save_object),
+                "outputs": [ingestion_config.train_data_path, ingestion_config.test_data_path],
+                "run": lambda threads: self.run_ingestion(ingestion_obj),
+            },
+            "transformation": {
+                "inputs": [ingestion_config.train_data_path, ingestion_config.test_data_path],
+                "config": transform_config,
+                "code": module_files(DataTransformation, save_object, fast_preprocessor, serialization),
+                "outputs": transformed_files + [transform_config.preprocessor_parity_file_path],
+                # Written only if compiled preprocessor passed its parity check
+                "optional_outputs": [transform_config.compiled_preprocessor_file_path],
+                "run": lambda threads: self.run_transformation(transform_obj, ingestion_config),
+            },
+            "training": {
+                "inputs": transformed_files,
+                "config": trainer_config,
+                # Hyperparameter grids live in model_trainer.py, so editing them changes this
+                "code": module_files(ModelTrainer, save_object, tree_compiler, serialization, publish_model_release),
+                "outputs": [trainer_config.trained_model_file_path, ModelRegistryConfig().release_file_path],
+                # Written only if the compiled model matches and is faster
+                "optional_outputs": [trainer_config.compiled_model_file_path, trainer_config.compiled_report_file_path],
+                "run": lambda threads: self.run_training(trainer_obj, transform_obj, threads),
+            },
+            "vector_db": {
+                "inputs": [genai_obj.listings_file],
+                "config": {"model_name": genai_obj.model_name, "index_config": genai_obj.index_config},
+                "code": module_files(GenAIEngine, vector_index, metadata_store, embedding_cache),
+                "outputs": [genai_obj.index_file, os.path.join(genai_obj.metadata_dir, "CURRENT")],
+                "run": lambda threads: self.run_vector_db(genai_obj),
+            },
+        }
+
+    def stage_outputs(self, definition):
+        '''
+        Files a finished stage wrote: outputs, optional outputs that exist,
+        and the payload file behind every pointer (model.pkl -> model.ubj)
+        '''
+        paths = list(definition["outputs"]) + [
+            path for path in definition.get("optional_outputs", []) if os.path.exists(path)
+        ]
+        # .pkl outputs are pointers written by save_object(fast_format=True)
+        return [
+            file_path
+            for path in paths
+            for file_path in (serialization.artifact_files(path) if path.endswith(".pkl") else [path])
+        ]
+
+    def run_ingestion(self, ingestion_obj):
+        print("\n🔵 Step 1: Data Ingestion Started")
+        ingestion_obj.initiate_data_ingestion()
+        print("✅ Data Ingestion Completed")
+
+    def run_transformation(self, transform_obj, ingestion_config):
+        print("\n🔵 Step 2: Data Transformation Started")
+        transform_obj.initiate_data_transformation(ingestion_config.train_data_path, ingestion_config.test_data_path)
+        print("✅ Data Transformation Completed")
+
+    def run_training(self, trainer_obj, transform_obj, threads=None):
+        print("\n🔵 Step 3: Model Training Started")
+        # Saved matrices, so this works when transformation was skipped
+        X_train, y_train, X_test, y_test, _ = transform_obj.load_transformed_data()
+        # threads = number of search processes, each of them runs 1 native thread
+        # (evaluate_models resets OMP / BLAS limits in its workers)
+        r2_square = trainer_obj.initiate_model_trainer(X_train, y_train, X_test, y_test, n_jobs=threads)
+        print(f"✅ Model Training Completed. Best R2 Score: {r2_square}")
+
+        # Tell running API (ModelRegistry) that new model + preprocessor are ready
+        release_version = publish_model_release()
+        print(f"📦 Model Release Published: {release_version}")
+
+    def run_vector_db(self, genai_obj):
+        print("\n🔵 Step 4: GenAI Engine (Vector DB) Creation Started")
+        # Incremental: only new / renamed listings are encoded again
+        status = genai_obj.create_vector_db(incremental=True)
+        print(f"{status}")
+
+    def run_pipeline(self, stages=None, force=False):
         """
         Ye function poora training process automate karta hai:
         1. Data Ingestion
         2. Transformation
         3. Model Training
         4. GenAI Vector DB Creation
+
+        Stages run as a small DAG: a stage starts (in its own process) as
+        soon as the stages it depends on are done, so vector DB is built
+        while models are training.
+
+        stages: which stages to run (default all). A stage whose inputs,
+        config and code did not change since its last run is skipped
+        and its saved outputs are reused (force=True runs it anyway).
         """
         try:
             print("🚀 Training Pipeline Started...")
+            stages = [stage for stage in STAGES if stage in (stages or STAGES)]
+            definitions = self.stage_definitions()
+
+            pending = list(stages)
+            done, running, failed = set(), {}, []
+
+            # spawn: clean process per stage (no forked thread pools / locks)
+            with ProcessPoolExecutor(
+                max_workers=self.pipeline_config.max_parallel_stages,
+                mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                while pending or running:
+                    # Not selected stages count as done (their outputs are reused)
+                    ready = [
+                        stage for stage in pending
+                        if all(dep in done or dep not in stages for dep in STAGE_DEPENDENCIES[stage])
+                    ]
+                    if failed:
+                        ready = []
+
+                    for stage in ready:
+                        pending.remove(stage)
+                        definition = definitions[stage]
+                        # Fingerprint before running (upstream outputs are ready now)
+                        stage_fingerprint = self.stage_cache.fingerprint(
+                            definition["inputs"], definition["config"], definition["code"]
+                        )
 
-            # --- Step 1: Data Ingestion ---
-            print("\n🔵 Step 1: Data Ingestion Started")
-            ingestion_obj = DataIngestion()
-            train_data_path, test_data_path = ingestion_obj.initiate_data_ingestion()
-            print("✅ Data Ingestion Completed")
-
-            # --- Step 2: Data Transformation ---
-            print("\n🔵 Step 2: Data Transformation Started")
-            transform_obj = DataTransformation()
-            train_arr, test_arr, _ = transform_obj.initiate_data_transformation(train_data_path, test_data_path)
-            print("✅ Data Transformation Completed")
-
-            # --- Step 3: Model Training ---
-            print("\n🔵 Step 3: Model Training Started")
-            trainer_obj = ModelTrainer()
-            r2_square = trainer_obj.initiate_model_trainer(train_arr, test_arr)
-            print(f"✅ Model Training Completed. Best R2 Score: {r2_square}")
-
-            # --- Step 4: GenAI Vector DB Creation ---
-            print("\n🔵 Step 4: GenAI Engine (Vector DB) Creation Started")
-            genai_obj = GenAIEngine()
-            status = genai_obj.create_vector_db()
-            print(f"{status}")
+                        if not force and self.stage_cache.is_fresh(stage, stage_fingerprint, definition["outputs"]):
+                            print(f"\n⏭️  Stage '{stage}' unchanged, using cached outputs")
+                            done.add(stage)
+                            continue
+
+                        threads = self.pipeline_config.stage_threads(stage)
+                        logging.info(f"Stage '{stage}' started with {threads} threads")
+                        future = executor.submit(run_stage_process, stage, threads, self.pipeline_config)
+                        running[future] = (stage, stage_fingerprint)
+
+                    if not running:
+                        if failed or not pending:
+                            break
+                        # A skipped stage may have unblocked others
+                        continue
+
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        stage, stage_fingerprint = running.pop(future)
+                        try:
+                            future.result()
+                        except Exception as e:
+                            # Let other running stages finish, start nothing new
+                            logging.info(f"Stage '{stage}' failed: {e}")
+                            failed.append((stage, e))
+                            continue
+                        self.stage_cache.record(stage, stage_fingerprint, self.stage_outputs(definitions[stage]))
+                        done.add(stage)
+
+            if failed:
+                stage, error = failed[0]
+                raise RuntimeError(f"Stage '{stage}' failed: {error}")
 
             print("\n🏆 All Training Pipelines Completed Successfully!")
 
         except Exception as e:
             raise CustomException(e, sys)
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Airbnb AI Suite training pipeline")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--from-stage", choices=STAGES, help="Run this stage and all stages after it")
+    group.add_argument("--only", choices=STAGES, nargs="+", help="Run only these stages")
+    parser.add_argument("--force", action="store_true", help="Run selected stages even if unchanged")
+    parser.add_argument("--parallel", type=int, default=TrainPipelineConfig.max_parallel_stages,
+                        help="Stages running at the same time (1 = one after another)")
+    parser.add_argument("--encoder-threads", type=int, default=TrainPipelineConfig.encoder_threads,
+                        help="CPU threads for the sentence encoder")
+    parser.add_argument("--index-type", choices=INDEX_TYPES,
+                        help="FAISS index for the vector DB (default: flat, or the type of the existing index)")
+    parser.add_argument("--nlist", type=int, default=VectorIndexConfig.nlist, help="IVF clusters")
+    parser.add_argument("--nprobe", type=int, default=VectorIndexConfig.nprobe, help="IVF clusters searched per query")
+    parser.add_argument("--hnsw-m", type=int, default=VectorIndexConfig.hnsw_m, help="HNSW links per node")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    pipeline = TrainPipeline()
-    pipeline.run_pipeline()
\ No newline at end of file
+    args = parse_args()
+    if args.from_stage:
+        selected_stages = STAGES[STAGES.index(args.from_stage):]
+    else:
+        selected_stages = args.only
+
+    index_config = None
+    if args.index_type:
+        index_config = VectorIndexConfig(
+            index_type=args.index_type, nlist=args.nlist, nprobe=args.nprobe, hnsw_m=args.hnsw_m
+        )
+
+    pipeline = TrainPipeline(TrainPipelineConfig(
+        max_parallel_stages=args.parallel,
+        encoder_threads=args.encoder_threads,
+        index_config=index_config
+    ))
+    pipeline.run_pipeline(stages=selected_stages, force=args.force)
@@ -0,0 +1,127 @@
+import os
+import sys
+import pickle
+import hashlib
+import importlib
+from dataclasses import dataclass
+
+import joblib
+
+from src.exception import CustomException
+from src.logger import logging
+
+# Format -> payload file extension
+FORMAT_EXTENSIONS = {
+    "xgboost_ubj": "ubj",
+    "catboost_cbm": "cbm",
+    "joblib": "joblib",
+}
+
+# joblib payloads loaded with mmap_mode="r": objects that keep plain NumPy
+# arrays after unpickling (flat arrays of tree_compiler / fast_preprocessor).
+# sklearn trees / GBMs copy their arrays into their own buffers in
+# Tree.__setstate__, and ColumnTransformer keeps its fitted values in small
+# Python lists / object arrays, so mapping those saves nothing and they are
+# loaded normally.
+MMAP_CLASSES = ("CompiledTreeEnsemble", "CompiledPreprocessor")
+
+@dataclass(frozen=True)
+class ArtifactPointer:
+    '''
+    Small object pickled into model.pkl / preprocessor.pkl instead of the
+    estimator itself. load_object() follows it to the real payload file.
+    sha256 is part of the pointer, so a new payload always gives a new
+    model.pkl checksum (ModelRegistry notices the change).
+    '''
+    format: str
+    payload_file: str
+    class_path: str
+    sha256: str
+    # Load with mmap_mode="r" (see MMAP_CLASSES)
+    mmap: bool = False
+
+def choose_format(obj):
+    '''
+    XGBoost -> UBJSON, CatBoost -> .cbm (their own fast formats),
+    everything else (sklearn estimators, ColumnTransformer) -> joblib
+    '''
+    module = type(obj).__module__
+    if module.startswith("xgboost"):
+        return "xgboost_ubj"
+    if module.startswith("catboost"):
+        return "catboost_cbm"
+    return "joblib"
+
+def payload_checksum(file_path, chunk_size=1024 * 1024):
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as file_obj:
+        for chunk in iter(lambda: file_obj.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def dump_payload(file_path, obj):
+    '''
+    Writes estimator next to file_path in its best format.
+    Returns ArtifactPointer to be pickled at file_path.
+    '''
+    try:
+        artifact_format = choose_format(obj)
+        base_path = os.path.splitext(file_path)[0]
+        payload_path = f"{base_path}.{FORMAT_EXTENSIONS[artifact_format]}"
+
+        # Same tmp + rename as save_object: processes that already mapped
+        # the old payload keep reading the old file
+        tmp_path = f"{base_path}.tmp.{FORMAT_EXTENSIONS[artifact_format]}"
+        if artifact_format == "xgboost_ubj":
+            obj.save_model(tmp_path)
+        elif artifact_format == "catboost_cbm":
+            obj.save_model(tmp_path, format="cbm")
+        else:
+            # No compression: fast to load, and arrays of MMAP_CLASSES can be memory-mapped
+            joblib.dump(obj, tmp_path)
+        os.replace(tmp_path, payload_path)
+
+        logging.info(f"Saved {type(obj).__name__} as {artifact_format} at {payload_path}")
+        return ArtifactPointer(
+            format=artifact_format,
+            payload_file=os.path.basename(payload_path),
+            class_path=f"{type(obj).__module__}.{type(obj).__name__}",
+            sha256=payload_checksum(payload_path),
+            mmap=artifact_format == "joblib" and type(obj).__name__ in MMAP_CLASSES,
+        )
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def artifact_files(file_path):
+    '''
+    file_path + the payload file its pointer refers to
+    (only the pointer itself if the file is missing or not a pointer)
+    '''
+    try:
+        if not os.path.exists(file_path):
+            return [file_path]
+        with open(file_path, "rb") as file_obj:
+            obj = pickle.load(file_obj)
+        if isinstance(obj, ArtifactPointer):
+            return [file_path, os.path.join(os.path.dirname(file_path), obj.payload_file)]
+        return [file_path]
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def load_payload(pointer, base_dir):
+    '''
+    Loads the estimator a pointer refers to (payload is next to pointer file)
+    '''
+    try:
+        payload_path = os.path.join(base_dir, pointer.payload_file)
+
+        if pointer.format == "joblib":
+            # Flat arrays stay on disk, pages are shared by all API workers
+            return joblib.load(payload_path, mmap_mode="r" if pointer.mmap else None)
+
+        module_name, class_name = pointer.class_path.rsplit(".", 1)
+        model = getattr(importlib.import_module(module_name), class_name)()
+        model.load_model(payload_path)
+        return model
+    except Exception as e:
+        raise CustomException(e, sys)
@@ -1,12 +1,24 @@
 import os
 import sys
+import time
 import pickle
+import numpy as np
 import pandas as pd
+from scipy import sparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from threadpoolctl import threadpool_limits
 from src.exception import CustomException
 from src.logger import logging
+from src.serialization import ArtifactPointer, dump_payload, load_payload
 from sqlalchemy import create_engine
 from sklearn.metrics import r2_score
-from sklearn.model_selection import GridSearchCV
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (enables Halving*SearchCV)
+from sklearn.model_selection import (
+    GridSearchCV,
+    RandomizedSearchCV,
+    HalvingGridSearchCV,
+    HalvingRandomSearchCV
+)
 
 def get_database_connection():
     try:
@@ -30,13 +42,28 @@ def get_database_connection():
     except Exception as e:
         raise CustomException(e, sys)
 
-def save_object(file_path, obj):
+def read_table(file_path, columns=None):
+    '''
+    Reads stage artifact (Parquet memory-mapped, only needed columns).
+    CSV still works for old artifacts / manual exports.
+    '''
+    try:
+        if file_path.endswith(".csv"):
+            return pd.read_csv(file_path, usecols=columns)
+        return pd.read_parquet(file_path, columns=columns, memory_map=True)
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def save_object(file_path, obj, fast_format=False):
     '''
     Serilization/Pickling: To Save Python Object (Model, Preprocessor) in file
     
     Args:
         file_path: Where to save?
         obj: What to save? (e.g., trained model)
+        fast_format: Estimator goes to its own file (XGBoost UBJSON,
+            CatBoost .cbm, joblib for sklearn) and file_path only keeps
+            a small pointer to it. load_object handles both.
     '''
     
     try:
@@ -45,9 +72,16 @@ def save_object(file_path, obj):
         # Create Folder if not exist
         os.makedirs(dir_path, exist_ok=True)
         
-        # Open file in write mode and save it
-        with open(file_path, "wb") as file_obj:
+        # Payload is written first, pointer after it
+        if fast_format:
+            obj = dump_payload(file_path, obj)
+        
+        # Write to temp file first then rename, so a running API
+        # never reads a half written pickle
+        tmp_path = file_path + ".tmp"
+        with open(tmp_path, "wb") as file_obj:
             pickle.dump(obj, file_obj)
+        os.replace(tmp_path, file_path)
             
         logging.info(f"Object saved successfully at {file_path}")
         
@@ -56,48 +90,153 @@ def save_object(file_path, obj):
     
 def load_object(file_path):
     '''
-    Load Objects
+    Load Objects (plain pickle, or pointer written by save_object(fast_format=True))
     '''
     try:
         with open(file_path, "rb") as file_obj:
-            return pickle.load(file_obj)
+            obj = pickle.load(file_obj)
+        
+        if isinstance(obj, ArtifactPointer):
+            return load_payload(obj, os.path.dirname(file_path))
+        return obj
     except Exception as e:
         raise CustomException(e, sys)
     
-def evaluate_models(X_train, y_train, X_test, y_test, models, param):
+# Models which need a dense matrix (everything else gets CSR as is)
+DENSE_ONLY_MODELS = ("CatBoostRegressor",)
+
+def prepare_model_input(model, X):
+    '''
+    Sparse feature matrix goes to models as CSR, only dense-only
+    models get X.toarray() (training and serving both use this)
+    '''
+    if sparse.issparse(X) and type(model).__name__ in DENSE_ONLY_MODELS:
+        return X.toarray()
+    return X
+
+def build_search(model, para, search, cv, n_jobs, n_iter, random_state):
+    '''
+    Hyperparameter search object for one model
+    grid           -> every combination (old behaviour)
+    random         -> n_iter random combinations
+    halving        -> successive halving over grid: all configs start on a
+                      small sample, only the best third moves to more data
+    halving_random -> successive halving over n_iter random combinations
+    '''
+    if search == "grid":
+        return GridSearchCV(model, para, cv=cv, n_jobs=n_jobs, refit=True)
+    if search == "random":
+        return RandomizedSearchCV(model, para, n_iter=n_iter, cv=cv, n_jobs=n_jobs,
+                                  refit=True, random_state=random_state)
+    if search == "halving":
+        return HalvingGridSearchCV(model, para, cv=cv, factor=3, n_jobs=n_jobs,
+                                   refit=True, random_state=random_state)
+    if search == "halving_random":
+        return HalvingRandomSearchCV(model, para, n_candidates=n_iter, cv=cv, factor=3,
+                                     n_jobs=n_jobs, refit=True, random_state=random_state)
+    raise ValueError(f"Unknown search '{search}', use grid / random / halving / halving_random")
+
+def limit_worker_threads(threads):
+    '''
+    Initializer of the model search workers: caps native threads (OpenMP / BLAS)
+    per worker, so workers x search jobs x native threads stays within the budget
+    '''
+    # For pools started later in this worker (and the search's own loky workers)
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    
+    # Pools already loaded (forked workers inherit the parent's libraries)
+    threadpool_limits(limits=threads)
+
+def search_one_model(model_name, model, para, X_train, y_train, X_test, y_test,
+                     search, cv, n_jobs, n_iter, random_state):
+    '''
+    Runs in a worker process: tunes one model and scores it on test data
+    '''
+    start_time = time.perf_counter()
+    
+    # CatBoost ignores OMP_NUM_THREADS and uses all cores by default
+    if type(model).__name__.startswith("CatBoost"):
+        model.set_params(thread_count=1)
+    
+    # Dense copy only inside this worker and only for dense-only models
+    X_train = prepare_model_input(model, X_train)
+    X_test = prepare_model_input(model, X_test)
+    
+    if para:
+        # refit=True: best config is trained on full train data by the search itself
+        gs = build_search(model, para, search, cv, n_jobs, n_iter, random_state)
+        gs.fit(X_train, y_train)
+        best_model, best_params = gs.best_estimator_, gs.best_params_
+    else:
+        # Nothing to tune (e.g. Linear Regression)
+        best_model, best_params = model.fit(X_train, y_train), {}
+    
+    fit_seconds = time.perf_counter() - start_time
+    
+    # Prediction + Metrics
+    test_model_score = r2_score(y_test, best_model.predict(X_test))
+    
+    return model_name, best_model, {
+        "r2_score": test_model_score,
+        "fit_seconds": round(fit_seconds, 2),
+        "best_params": best_params,
+    }
+
+def evaluate_models(X_train, y_train, X_test, y_test, models, param,
+                    search="grid", cv=3, n_iter=20, n_jobs=None, random_state=42):
     '''
-    This will train all models one by one
-    and Hyperparameter tuning will also be done (GridSearchCV)
+    This will train all models in parallel (process pool)
+    and Hyperparameter tuning will also be done (cv folds in parallel too)
+    
+    CPU budget = n_jobs processes in total (model workers x search jobs),
+    each with 1 native thread (see limit_worker_threads)
+    
+    Returns report: model_name -> {r2_score, fit_seconds, best_params}
+    models dict is updated with fitted best estimators.
     '''
     try:
         report = {}
+        # Never more processes than cores (n_jobs=None / -1 -> all cores)
+        cpu_count = os.cpu_count() or 1
+        n_cores = min(n_jobs, cpu_count) if n_jobs and n_jobs > 0 else cpu_count
         
-        for i in range(len(list(models))):
-            model_name = list(models.keys())[i]
-            model = list(models.values())[i]
-            para = param[model_name]
-            
-            # use GridSearchCV for best params
-            gs = GridSearchCV(model, para, cv=3)
-            gs.fit(X_train, y_train)
-            
-            # Set models with best params
-            model.set_params(**gs.best_params_)
-            
-            # Train Final Model
-            model.fit(X_train, y_train)
-            
-            # Prediction
-            y_test_pred = model.predict(X_test)
-            
-            # Metrics
-            test_model_score = r2_score(y_test, y_test_pred)
-            
-            report[model_name] = test_model_score
-            
-            logging.info(f"Model: {model_name} | R2 Score: {test_model_score}")
-        return report
+        # Models in parallel, remaining cores go to folds / candidates of each search
+        # (model_workers x search_jobs <= n_cores)
+        model_workers = max(1, min(len(models), n_cores))
+        search_jobs = max(1, n_cores // model_workers)
+        
+        # Biggest grids first, so they don't start last and delay everything
+        grid_size = lambda name: int(np.prod([len(v) for v in param[name].values()])) if param[name] else 0
+        model_names = sorted(models, key=grid_size, reverse=True)
+        
+        logging.info(f"Model search '{search}': {model_workers} models at a time, {search_jobs} jobs per search")
+        
+        with ProcessPoolExecutor(max_workers=model_workers, initializer=limit_worker_threads,
+                                 initargs=(1,)) as executor:
+            futures = [
+                executor.submit(
+                    search_one_model, model_name, models[model_name], param[model_name],
+                    X_train, y_train, X_test, y_test,
+                    search, cv, search_jobs, n_iter, random_state
+                )
+                for model_name in model_names
+            ]
             
+            for future in as_completed(futures):
+                model_name, best_model, result = future.result()
+                
+                # Set models with best params (already trained)
+                models[model_name] = best_model
+                report[model_name] = result
+                
+                logging.info(
+                    f"Model: {model_name} | R2 Score: {result['r2_score']} | "
+                    f"Time: {result['fit_seconds']}s | Params: {result['best_params']}"
+                )
+        
+        # Same order as models dict
+        return {model_name: report[model_name] for model_name in models}
             
     except Exception as e:
-        raise CustomException(e, sys)
\ No newline at end of file
+        raise CustomException(e, sys)
@@ -0,0 +1,57 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from src.components.data_transformation import DataTransformation
+from src.components.fast_preprocessor import compile_preprocessor, check_preprocessor_parity, same_output
+from src.pipeline.predict_pipeline import CustomData, FEATURE_COLUMNS
+from src.utils import save_object, load_object
+
+# Fake Listings (some missing values, like the real CSV)
+rng = np.random.default_rng(0)
+n_rows = 300
+df = pd.DataFrame({
+    "latitude": rng.uniform(40.5, 40.9, n_rows),
+    "longitude": rng.uniform(-74.2, -73.7, n_rows),
+    "minimum_nights": rng.integers(1, 30, n_rows),
+    "number_of_reviews": rng.integers(0, 200, n_rows),
+    "calculated_host_listings_count": rng.integers(1, 5, n_rows),
+    "availability_365": rng.integers(0, 365, n_rows),
+    "reviews_per_month": np.where(rng.random(n_rows) < 0.2, np.nan, rng.uniform(0, 5, n_rows)),
+    "neighbourhood_group": rng.choice(["Manhattan", "Brooklyn", "Queens"], n_rows),
+    "room_type": rng.choice(["Entire home/apt", "Private room", "Shared room", None], n_rows),
+    "neighbourhood": rng.choice(["Harlem", "Williamsburg", "Astoria", "Bushwick"], n_rows),
+})
+preprocessor = DataTransformation().get_data_transformer_object().fit(df)
+compiled = compile_preprocessor(preprocessor)
+
+def test_parity_with_nan_and_none():
+    assert check_preprocessor_parity(preprocessor, compiled, df)
+
+def test_none_category_is_imputed():
+    # API request with missing categories: same matrix as the pandas path (predict_records fallback)
+    records = df.head(3).to_dict(orient="records")
+    records[1].update(room_type=None, neighbourhood=None)
+    records[2].update(neighbourhood_group=None, reviews_per_month=None)
+
+    expected = preprocessor.transform(CustomData.get_batch_as_data_frame(records)[FEATURE_COLUMNS])
+    assert same_output(expected, compiled.transform_records(records))
+
+def test_saved_payload_is_memory_mapped():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "preprocessor_compiled.pkl")
+        save_object(file_path, compiled, fast_format=True)
+        loaded = load_object(file_path)
+
+        # Arrays stay in the page cache, shared by all API workers
+        assert isinstance(loaded.means, np.memmap)
+        assert isinstance(loaded.category_values, np.memmap)
+        assert check_preprocessor_parity(preprocessor, loaded, df)
+
+if __name__ == "__main__":
+    test_parity_with_nan_and_none()
+    test_none_category_is_imputed()
+    test_saved_payload_is_memory_mapped()
+    print("Compiled preprocessor: NaN / None parity / memory-mapped payload checks passed")
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+
+from src.pipeline.micro_batcher import MicroBatcher, MicroBatcherConfig
+
+def test_rows_are_batched():
+    async def run():
+        batcher = MicroBatcher(lambda rows: [row["x"] * 2 for row in rows], MicroBatcherConfig(max_wait_ms=20))
+        await batcher.start()
+        preds = await asyncio.gather(*(batcher.submit({"x": i}) for i in range(10)))
+        await batcher.stop()
+        return preds, batcher.metrics.snapshot()
+
+    preds, metrics = asyncio.run(run())
+    assert preds == [i * 2 for i in range(10)]
+    assert metrics["requests"] == 10 and metrics["batches"] < 10
+
+def stopped_error(result):
+    return isinstance(result, RuntimeError) and "stopped" in str(result)
+
+def test_stop_answers_rows_being_collected():
+    async def run():
+        # Long window: rows are taken from the queue, batch is not full yet
+        batcher = MicroBatcher(lambda rows: rows, MicroBatcherConfig(max_batch_size=64, max_wait_ms=10000))
+        await batcher.start()
+        tasks = [asyncio.create_task(batcher.submit({"x": i})) for i in range(3)]
+        await asyncio.sleep(0.05)
+        await batcher.stop()
+        return await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), 1)
+
+    assert all(stopped_error(result) for result in asyncio.run(run()))
+
+def test_stop_answers_rows_in_executor():
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_predict(rows):
+        started.set()
+        release.wait(5)
+        return rows
+
+    async def run():
+        batcher = MicroBatcher(slow_predict, MicroBatcherConfig(max_wait_ms=1))
+        await batcher.start()
+        tasks = [asyncio.create_task(batcher.submit({"x": i})) for i in range(2)]
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        await batcher.stop()
+        try:
+            return await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), 1)
+        finally:
+            release.set()
+
+    assert all(stopped_error(result) for result in asyncio.run(run()))
+
+if __name__ == "__main__":
+    test_rows_are_batched()
+    test_stop_answers_rows_being_collected()
+    test_stop_answers_rows_in_executor()
+    print("Micro batcher: batching / stop while collecting / stop while predicting checks passed")
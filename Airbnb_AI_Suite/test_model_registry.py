@@ -0,0 +1,67 @@
+import os
+import tempfile
+
+import numpy as np
+from sklearn.linear_model import LinearRegression
+from sklearn.preprocessing import StandardScaler
+
+from src.utils import save_object
+from src.components.model_registry import (
+    ModelRegistry, ModelRegistryConfig, ModelNotReady, publish_model_release
+)
+
+# Small fitted model + preprocessor
+X = np.arange(20, dtype=float).reshape(10, 2)
+y = X.sum(axis=1)
+preprocessor = StandardScaler().fit(X)
+model = LinearRegression().fit(preprocessor.transform(X), y)
+
+def registry_config(tmp_dir):
+    return ModelRegistryConfig(
+        model_file_path=os.path.join(tmp_dir, "model.pkl"),
+        preprocessor_file_path=os.path.join(tmp_dir, "preprocessor.pkl"),
+        release_file_path=os.path.join(tmp_dir, "release.json"),
+        compiled_model_file_path=os.path.join(tmp_dir, "model_compiled.pkl"),
+        preprocessor_parity_file_path=os.path.join(tmp_dir, "preprocessor_parity.json"),
+        compiled_preprocessor_file_path=os.path.join(tmp_dir, "preprocessor_compiled.pkl"),
+    )
+
+def test_release_loads():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config = registry_config(tmp_dir)
+        save_object(config.preprocessor_file_path, preprocessor, fast_format=True)
+        save_object(config.model_file_path, model, fast_format=True)
+        version = publish_model_release(config)
+
+        bundle = ModelRegistry(config).get()
+        assert bundle.version == version
+        assert np.allclose(bundle.model.predict(bundle.preprocessor.transform(X)), y)
+
+def test_checksum_mismatch_at_startup_raises():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config = registry_config(tmp_dir)
+        save_object(config.preprocessor_file_path, preprocessor, fast_format=True)
+        save_object(config.model_file_path, model, fast_format=True)
+        publish_model_release(config)
+
+        # New model written, release not published yet (training still running)
+        save_object(config.model_file_path, LinearRegression().fit(X, y * 2), fast_format=True)
+
+        registry = ModelRegistry(config)
+        assert registry.load() is False
+        try:
+            registry.get()
+        except ModelNotReady as e:
+            assert "release.json" in str(e)
+            assert e.retry_after_seconds == int(config.poll_interval_seconds)
+        else:
+            raise AssertionError("get() must raise ModelNotReady when no release matches")
+
+        # Release published -> same registry serves it
+        publish_model_release(config)
+        assert registry.get().model.coef_.sum() > 0
+
+if __name__ == "__main__":
+    test_release_loads()
+    test_checksum_mismatch_at_startup_raises()
+    print("Model registry: release load / checksum mismatch checks passed")
@@ -0,0 +1,107 @@
+import time
+import asyncio
+import tempfile
+import os
+
+from src.pipeline.predict_pipeline import FEATURE_COLUMNS
+from src.pipeline.prediction_cache import PredictionCache, PredictionCacheConfig
+
+# Fake Listing
+row = {
+    "neighbourhood_group": "Manhattan",
+    "neighbourhood": "Harlem",
+    "latitude": 40.82085,
+    "longitude": -73.94025,
+    "room_type": "Private room",
+    "minimum_nights": 3,
+    "number_of_reviews": 50,
+    "reviews_per_month": 1.5,
+    "calculated_host_listings_count": 1,
+    "availability_365": 200,
+}
+
+def test_hit_miss_and_version_change():
+    cache = PredictionCache(FEATURE_COLUMNS)
+
+    # 1. Miss, then hit (int vs float and key order don't change the key)
+    assert cache.get(row, "v1") is None
+    cache.set(row, "v1", 4.2)
+    same_row = dict(reversed(list(dict(row, minimum_nights=3.0).items())))
+    assert cache.get(same_row, "v1") == 4.2
+    assert cache.get(dict(row, minimum_nights=4), "v1") is None
+
+    # 2. New model version: old prediction is not served, LRU is cleared
+    assert cache.get(row, "v2") is None
+    assert cache.stats()["invalidations"] == 1
+    assert cache.stats()["entries"] == 0
+
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["misses"]) == (1, 3)
+
+def test_shared_sqlite_backend():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config = PredictionCacheConfig(shared_backend="sqlite", sqlite_path=os.path.join(tmp_dir, "cache.sqlite"))
+        worker_1 = PredictionCache(FEATURE_COLUMNS, config)
+        worker_2 = PredictionCache(FEATURE_COLUMNS, config)
+
+        worker_1.set(row, "v1", 4.2)
+        # Other worker finds it in SQLite
+        assert worker_2.get(row, "v1") == 4.2
+        assert worker_2.stats()["shared_hits"] == 1
+        assert worker_2.get(row, "v2") is None
+
+        worker_1.close()
+        worker_2.close()
+
+class SlowBackend:
+    '''
+    Shared backend that blocks like a slow Redis / locked SQLite
+    '''
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        time.sleep(0.2)
+        return self.data.get(key)
+
+    def set(self, key, value):
+        time.sleep(0.2)
+        self.data[key] = value
+
+    def close(self):
+        pass
+
+def test_async_calls_do_not_block_event_loop():
+    cache = PredictionCache(FEATURE_COLUMNS)
+    cache.shared = SlowBackend()
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        assert await cache.aget(row, "v1") is None
+        await cache.aset(row, "v1", 4.2)
+        # Memory hit, then shared hit after the LRU is gone
+        assert await cache.aget(row, "v1") == 4.2
+        cache._lru.clear()
+        assert await cache.aget(row, "v1") == 4.2
+        task.cancel()
+        return ticks
+
+    ticks = asyncio.run(main())
+    # 3 slow calls = 0.6s; event loop kept running meanwhile
+    assert ticks >= 20, ticks
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["shared_hits"], stats["misses"]) == (1, 1, 1)
+
+if __name__ == "__main__":
+    test_hit_miss_and_version_change()
+    test_shared_sqlite_backend()
+    test_async_calls_do_not_block_event_loop()
+    print("Prediction cache: hit / miss / model version change / async checks passed")
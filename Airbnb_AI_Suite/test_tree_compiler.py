@@ -0,0 +1,91 @@
+import os
+import tempfile
+import numpy as np
+from scipy import sparse
+from sklearn.ensemble import AdaBoostRegressor, GradientBoostingRegressor, RandomForestRegressor
+from sklearn.tree import DecisionTreeRegressor
+from xgboost import XGBRegressor
+
+from src.utils import save_object, load_object, prepare_model_input
+from src.components.tree_compiler import compile_tree_model, check_parity, compare_latency
+
+# Fake Data: sparse like our preprocessor output (few numbers + one hot columns)
+rng = np.random.default_rng(42)
+n_rows = 3000
+numeric = rng.normal(size=(n_rows, 6))
+one_hot = sparse.random(n_rows, 40, density=0.05, random_state=42, data_rvs=lambda k: np.ones(k))
+X = sparse.hstack([sparse.csr_matrix(numeric), one_hot]).tocsr()
+y = numeric[:, 0] * 2 + np.sin(numeric[:, 1]) + one_hot.toarray()[:, 0] + rng.normal(scale=0.1, size=n_rows)
+
+X_train, X_test = X[:2500], X[2500:]
+y_train = y[:2500]
+
+models = {
+    "Decision Tree": DecisionTreeRegressor(max_depth=12),
+    "Random Forest": RandomForestRegressor(n_estimators=32, random_state=42),
+    "Gradient Boosting": GradientBoostingRegressor(n_estimators=64, subsample=0.8, random_state=42),
+    "AdaBoost Regressor": AdaBoostRegressor(n_estimators=32, random_state=42),
+    "XGBRegressor": XGBRegressor(n_estimators=64),
+    "GB (zero init)": GradientBoostingRegressor(n_estimators=32, init="zero", random_state=42),
+    "GB (huber)": GradientBoostingRegressor(n_estimators=32, loss="huber", random_state=42),
+}
+
+# CatBoost is optional here: sklearn / XGBoost checks still run without it
+try:
+    from catboost import CatBoostRegressor
+    models["CatBoost Regressor"] = CatBoostRegressor(iterations=50, depth=6, verbose=False)
+except ImportError:
+    print("catboost not installed, skipping CatBoost parity check")
+
+print(f"{'Model':<22}{'Max Diff':>12}{'Original 1 row (us)':>22}{'Compiled 1 row (us)':>22}")
+for name, model in models.items():
+    model.fit(prepare_model_input(model, X_train), y_train)
+    compiled = compile_tree_model(model, trained_on_sparse=True)
+
+    # Raises if compiled predictions differ from original model
+    max_diff = check_parity(model, compiled, X_test, prepare_model_input)
+    latency = compare_latency(model, compiled, X_test, prepare_model_input)
+    print(f"{name:<22}{max_diff:>12.2e}{latency['original_1_row']:>22}{latency['compiled_1_row']:>22}")
+
+# Saved payloads: only the flat arrays are memory-mapped, sklearn trees copy theirs on load anyway
+with tempfile.TemporaryDirectory() as tmp_dir:
+    forest = models["Random Forest"]
+    save_object(os.path.join(tmp_dir, "model.pkl"), forest, fast_format=True)
+    save_object(os.path.join(tmp_dir, "model_compiled.pkl"), compile_tree_model(forest), fast_format=True)
+
+    loaded_compiled = load_object(os.path.join(tmp_dir, "model_compiled.pkl"))
+    assert isinstance(loaded_compiled.threshold, np.memmap)
+    assert not isinstance(load_object(os.path.join(tmp_dir, "model.pkl")).estimators_[0].tree_.threshold, np.memmap)
+    check_parity(forest, loaded_compiled, X_test, prepare_model_input)
+    print("\nCompiled payload memory-mapped, sklearn payload loaded normally")
+
+# Saved production model (if trained) with real preprocessor output
+model_path = os.path.join("artifacts", "model.pkl")
+preprocessor_path = os.path.join("artifacts", "preprocessor.pkl")
+if os.path.exists(model_path) and os.path.exists(preprocessor_path):
+    import pandas as pd
+    from src.pipeline.predict_pipeline import FEATURE_COLUMNS
+
+    model = load_object(model_path)
+    preprocessor = load_object(preprocessor_path)
+
+    data = pd.DataFrame([{
+        "neighbourhood_group": "Manhattan",
+        "neighbourhood": "Harlem",
+        "latitude": 40.82085,
+        "longitude": -73.94025,
+        "room_type": "Private room",
+        "minimum_nights": 3,
+        "number_of_reviews": 50,
+        "reviews_per_month": 1.5,
+        "calculated_host_listings_count": 1,
+        "availability_365": 200,
+    }])[FEATURE_COLUMNS]
+    features = preprocessor.transform(data)
+
+    compiled = compile_tree_model(model, trained_on_sparse=sparse.issparse(features))
+    if compiled is not None:
+        max_diff = check_parity(model, compiled, features, prepare_model_input)
+        print(f"\nartifacts/model.pkl ({compiled.source}) matches compiled version, max diff {max_diff:.2e}")
+
+print("\n All compiled models match their original models")
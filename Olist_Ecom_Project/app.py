@@ -5,8 +5,8 @@ import numpy as np
 import os
 import plotly.graph_objects as go
 import plotly.express as px
-from deep_translator import GoogleTranslator
-from src.preprocess import clean_text
+from src.translation import Translator
+from src.sentiment import SentimentScorer
 
 # 1. PAGE CONFIGURATION
 st.set_page_config(
@@ -229,14 +229,21 @@ def load_models():
     kmeans_model = joblib.load(os.path.join(base_path, 'customer_segmentation.pkl'))
     scaler_model = joblib.load(os.path.join(base_path, 'rfm_scaler.pkl'))
     
-    return nlp_model, vectorizer, kmeans_model, scaler_model
+    return SentimentScorer(vectorizer, nlp_model), kmeans_model, scaler_model
 
 try:
-    nlp_model, tfidf, kmeans, scaler = load_models()
+    sentiment_scorer, kmeans, scaler = load_models()
 except FileNotFoundError:
     st.error("System Error: Model files not found in 'models/' directory.")
     st.stop()
 
+# Translation to Portuguese (cached on disk, OLIST_TRANSLATOR=none for offline use)
+@st.cache_resource
+def load_translator():
+    return Translator(backend=os.environ.get('OLIST_TRANSLATOR', 'google'), target='pt')
+
+translator = load_translator()
+
 # 4. SIDEBAR NAVIGATION
 st.sidebar.title("Olist Analytics")
 st.sidebar.markdown("---")
@@ -302,18 +309,18 @@ elif app_mode == "Sentiment Analysis":
             try:
                 # Translation
                 with st.spinner("Processing your review..."):
-                    translated_text = GoogleTranslator(source='auto', target='pt').translate(user_text)
-                    cleaned_text = clean_text(translated_text)
+                    # Skipped for Portuguese text, cached for repeated text
+                    failed_before = translator.failed
+                    translated_text = translator.translate(user_text)
+                    translation_failed = translator.failed > failed_before
                     
-                    # Prediction
-                    vec_text = tfidf.transform([cleaned_text])
-                    pred = nlp_model.predict(vec_text)
-                    prob = nlp_model.predict_proba(vec_text)
+                    # Prediction (label + probabilities from one predict_proba call)
+                    result = sentiment_scorer.score_one(translated_text)
                     
                     # Logic
-                    sentiment_score = prob[0][1] * 100
-                    is_positive = pred[0] == 1
-                    confidence = np.max(prob) * 100
+                    sentiment_score = result['positive_probability'] * 100
+                    is_positive = result['label'] == 1
+                    confidence = result['confidence'] * 100
                     
                     # Display Result in Card
                     st.markdown(f"""
@@ -329,6 +336,9 @@ elif app_mode == "Sentiment Analysis":
                         </p>
                     </div>
                     """, unsafe_allow_html=True)
+                    
+                    if translation_failed:
+                        st.caption("Translation service unavailable: review was analyzed as written.")
 
             except Exception as e:
                 st.error(f"**Processing Error:** {str(e)}")
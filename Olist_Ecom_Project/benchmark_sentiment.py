@@ -0,0 +1,58 @@
+import time
+import random
+
+import numpy as np
+import pandas as pd
+
+from src.preprocess import clean_text
+from src.sentiment import SentimentScorer
+
+scorer = SentimentScorer.from_models_dir()
+tfidf, nlp_model = scorer.vectorizer, scorer.model
+
+def old_path(text):
+    # Same steps as the Streamlit page before SentimentScorer (model runs twice)
+    vec_text = tfidf.transform([clean_text(text)])
+    pred = nlp_model.predict(vec_text)
+    prob = nlp_model.predict_proba(vec_text)
+    return pred[0], prob[0][1], np.max(prob)
+
+def best_of(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+# Fake Reviews (Portuguese words from the vectorizer vocabulary)
+random.seed(42)
+vocabulary = list(tfidf.vocabulary_)
+reviews = [' '.join(random.choices(vocabulary, k=random.randint(3, 40))) + random.choice(['!', '.', ' 10/10', '\n'])
+           for _ in range(20000)]
+
+# 1. Same answers as the old path
+for text in reviews[:2000]:
+    label, positive, confidence = old_path(text)
+    new = scorer.score_one(text)
+    assert new['label'] == label
+    assert np.isclose(new['positive_probability'], positive) and np.isclose(new['confidence'], confidence)
+
+bulk = scorer.score(reviews)
+old_labels = nlp_model.predict(tfidf.transform([clean_text(text) for text in reviews]))
+assert (bulk['label'].to_numpy() == old_labels).all()
+print("SentimentScorer matches predict + predict_proba")
+
+# 2. One review (Streamlit page): about the same time. TF-IDF transform of one
+# text dominates, the saved predict call is within run to run noise
+sample = reviews[:500]
+old_seconds = best_of(lambda: [old_path(text) for text in sample])
+new_seconds = best_of(lambda: [scorer.score_one(text) for text in sample])
+print(f"One review:  old {old_seconds / len(sample) * 1e6:8.0f} us   new {new_seconds / len(sample) * 1e6:8.0f} us   ({old_seconds / new_seconds:.1f}x)")
+
+# 3. Many reviews (batch job): old = page logic in a loop, new = one vectorized pass.
+# This is where the speedup is (one transform + one predict_proba per batch)
+sample = pd.Series(reviews)
+old_seconds = best_of(lambda: [old_path(text) for text in sample], repeat=1)
+new_seconds = best_of(lambda: scorer.score(sample), repeat=3)
+print(f"{len(sample)} reviews: old {old_seconds:6.2f} s   new {new_seconds:6.2f} s   ({old_seconds / new_seconds:.1f}x)")
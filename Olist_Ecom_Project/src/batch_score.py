@@ -0,0 +1,390 @@
+"""
+Offline bulk scoring for all Olist models.
+
+Streams an input file (CSV or Parquet) in chunks, scores every chunk in a
+process pool and writes one typed Parquet file.
+
+Examples (from project root):
+    python -m src.batch_score reviews --input data/olist_order_reviews_dataset.csv --output outputs/review_sentiment.parquet
+    python -m src.batch_score delivery --input data/ --output outputs/delivery_risk.parquet
+    python -m src.batch_score customers --input data/ --output outputs/customer_segments.parquet
+
+Delivery scoring needs models/delivery_fill_values.json (training medians, saved
+by the notebook). When it is missing and --input is the Olist data/ folder (the
+data the model was trained on), the delivery job creates it first. Otherwise:
+    python -m src.batch_score fill-values --input data/ --output models/delivery_fill_values.json
+"""
+import os
+import json
+import argparse
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from threadpoolctl import threadpool_limits
+
+from src.sentiment import SentimentScorer
+from src.rfm import RFMEngine, RFM_COLUMNS
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
+
+# Cluster id -> business name (same as app.py)
+SEGMENT_NAMES = {
+    0: 'Active Customer',
+    1: 'Dormant/Lost',
+    2: 'Loyalist',
+    3: 'Whale (VIP)'
+}
+
+# Delivery model inputs (notebook Module 1/2)
+DELIVERY_NUMERIC = ['freight_value', 'product_weight_g', 'price']
+DELIVERY_CATEGORICAL = ['customer_state', 'product_category_name_english']
+
+# Notebook filled missing numbers with training medians (X.fillna(X.median())),
+# saved next to the model
+DELIVERY_FILL_VALUES_FILE = 'delivery_fill_values.json'
+
+# Models are loaded once per worker process (see init_worker)
+_models = {}
+
+def load_fill_values(models_dir=MODELS_DIR):
+    path = os.path.join(models_dir, DELIVERY_FILL_VALUES_FILE)
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"{path} not found: run the 'Save Final Model' cell of the notebook, or "
+            f"python -m src.batch_score fill-values --input data/ --output {path}"
+        )
+    with open(path) as f:
+        return json.load(f)
+
+def load_models(models_dir=MODELS_DIR, job=None):
+    """
+    Models of one job (job=None -> all)
+    """
+    loaders = {
+        'reviews': lambda: {
+            'sentiment': joblib.load(os.path.join(models_dir, 'sentiment_model.pkl')),
+            'tfidf': joblib.load(os.path.join(models_dir, 'tfidf_vectorizer.pkl')),
+        },
+        'delivery': lambda: {
+            'delivery': joblib.load(os.path.join(models_dir, 'delivery_late_model.pkl')),
+            'delivery_fill_values': load_fill_values(models_dir),
+        },
+        'customers': lambda: {
+            'kmeans': joblib.load(os.path.join(models_dir, 'customer_segmentation.pkl')),
+            'rfm_scaler': joblib.load(os.path.join(models_dir, 'rfm_scaler.pkl')),
+        },
+    }
+    models = {}
+    for name in ([job] if job else loaders):
+        models.update(loaders[name]())
+    return models
+
+def init_worker(models_dir, job):
+    # Each worker uses one core, the pool gives the parallelism.
+    # OpenMP / BLAS pools are already loaded (numpy, sklearn), so the env var
+    # alone would not change them
+    threadpool_limits(limits=1)
+    _models.update(load_models(models_dir, job))
+
+# 1. Scoring functions (one chunk in, one DataFrame out)
+def score_reviews(chunk, models):
+    """
+    clean_text -> tfidf -> one predict_proba call for the whole chunk
+    """
+    scores = SentimentScorer(models['tfidf'], models['sentiment']).score(chunk['review_comment_message'])
+
+    out = pd.DataFrame({'review_id': chunk['review_id'].astype('string')})
+    if 'order_id' in chunk.columns:
+        out['order_id'] = chunk['order_id'].astype('string')
+    out['has_comment'] = chunk['review_comment_message'].notna().to_numpy()
+    out['positive_probability'] = scores['positive_probability'].to_numpy('float32')
+    out['confidence'] = scores['confidence'].to_numpy('float32')
+    out['sentiment'] = scores['label'].to_numpy('int8')
+    return out
+
+def delivery_features(chunk, feature_names, fill_values):
+    """
+    Same encoding as training (get_dummies), then columns reordered to the
+    model's feature_names_in_. Dropped first / unseen categories -> all zeros.
+    """
+    X = chunk[DELIVERY_NUMERIC + DELIVERY_CATEGORICAL].copy()
+    X['product_category_name_english'] = X['product_category_name_english'].fillna('Unknown')
+    X[DELIVERY_NUMERIC] = X[DELIVERY_NUMERIC].astype('float64').fillna(fill_values)
+
+    X = pd.get_dummies(X, columns=DELIVERY_CATEGORICAL, dtype='float64')
+    return X.reindex(columns=feature_names, fill_value=0.0)
+
+def score_delivery(chunk, models):
+    model = models['delivery']
+    X = delivery_features(chunk, model.feature_names_in_, models['delivery_fill_values'])
+
+    proba = model.predict_proba(X)
+    late_col = list(model.classes_).index(1)
+
+    out = pd.DataFrame({'order_id': chunk['order_id'].astype('string')})
+    if 'order_item_id' in chunk.columns:
+        out['order_item_id'] = chunk['order_item_id'].astype('int32')
+    out['late_probability'] = proba[:, late_col].astype('float32')
+    out['is_late_pred'] = model.classes_[proba.argmax(axis=1)].astype('int8')
+    return out
+
+def score_customers(chunk, models):
+    """
+    rfm_scaler -> customer_segmentation on the whole chunk
+    """
+    rfm = chunk[RFM_COLUMNS].astype('float64')
+    clusters = models['kmeans'].predict(models['rfm_scaler'].transform(rfm))
+
+    out = pd.DataFrame({'customer_id': chunk['customer_id'].astype('string')})
+    out['Recency'] = rfm['Recency'].to_numpy('int32')
+    out['Frequency'] = rfm['Frequency'].to_numpy('int32')
+    out['Monetary'] = rfm['Monetary'].to_numpy('float64')
+    out['cluster'] = clusters.astype('int8')
+    out['segment'] = pd.Series(clusters).map(SEGMENT_NAMES).astype('string').to_numpy()
+    return out
+
+# Job -> input columns, scoring function, output schema
+JOBS = {
+    'reviews': {
+        'columns': ['review_id', 'order_id', 'review_comment_message'],
+        'optional': ['order_id'],
+        'score': score_reviews,
+        'schema': pa.schema([
+            ('review_id', pa.string()),
+            ('order_id', pa.string()),
+            ('has_comment', pa.bool_()),
+            ('positive_probability', pa.float32()),
+            ('confidence', pa.float32()),
+            ('sentiment', pa.int8()),
+        ]),
+    },
+    'delivery': {
+        'columns': ['order_id', 'order_item_id'] + DELIVERY_NUMERIC + DELIVERY_CATEGORICAL,
+        'optional': ['order_item_id'],
+        'score': score_delivery,
+        'schema': pa.schema([
+            ('order_id', pa.string()),
+            ('order_item_id', pa.int32()),
+            ('late_probability', pa.float32()),
+            ('is_late_pred', pa.int8()),
+        ]),
+    },
+    'customers': {
+        'columns': ['customer_id'] + RFM_COLUMNS,
+        'optional': [],
+        'score': score_customers,
+        'schema': pa.schema([
+            ('customer_id', pa.string()),
+            ('Recency', pa.int32()),
+            ('Frequency', pa.int32()),
+            ('Monetary', pa.float64()),
+            ('cluster', pa.int8()),
+            ('segment', pa.string()),
+        ]),
+    },
+}
+
+def score_chunk(job, chunk):
+    """
+    Runs inside a worker process
+    """
+    return JOBS[job]['score'](chunk, _models)
+
+# 2. Reading input
+def iter_file_chunks(path, columns, chunk_size):
+    """
+    Yields DataFrames of at most chunk_size rows with the wanted columns
+    (those present in the file)
+    """
+    if path.endswith('.parquet'):
+        parquet_file = pq.ParquetFile(path)
+        present = [col for col in columns if col in parquet_file.schema_arrow.names]
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=present):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=lambda col: col in columns, chunksize=chunk_size)
+
+def delivery_lookups(data_dir, chunk_size):
+    """
+    Small lookup tables for the item rows:
+    order_id -> customer_state, product_id -> category (English) + weight
+    """
+    customers = pd.read_csv(os.path.join(data_dir, 'olist_customers_dataset.csv'),
+                            usecols=['customer_id', 'customer_state']).set_index('customer_id')['customer_state']
+    customers = customers[~customers.index.duplicated()]
+
+    # Orders file is read in chunks, only order_id -> state is kept
+    order_state = pd.concat([
+        chunk.set_index('order_id')['customer_id'].map(customers)
+        for chunk in pd.read_csv(os.path.join(data_dir, 'olist_orders_dataset.csv'),
+                                 usecols=['order_id', 'customer_id'], chunksize=chunk_size)
+    ])
+    order_state = order_state[~order_state.index.duplicated()]
+
+    products = pd.read_csv(os.path.join(data_dir, 'olist_products_dataset.csv'),
+                           usecols=['product_id', 'product_category_name', 'product_weight_g'])
+    translation = pd.read_csv(os.path.join(data_dir, 'product_category_name_translation.csv'))
+    products = pd.merge(products, translation, on='product_category_name', how='left')
+    products = products.drop_duplicates('product_id').set_index('product_id')[
+        ['product_category_name_english', 'product_weight_g']
+    ]
+    return order_state, products
+
+def iter_delivery_chunks(data_dir, chunk_size):
+    """
+    Raw Olist tables -> one row per order item (same joins as the notebook,
+    reviews left out so items are not duplicated). Items file is streamed,
+    orders / customers / products are only used as lookups.
+    """
+    order_state, products = delivery_lookups(data_dir, chunk_size)
+    for chunk in pd.read_csv(os.path.join(data_dir, 'olist_order_items_dataset.csv'),
+                             usecols=['order_id', 'order_item_id', 'product_id', 'price', 'freight_value'],
+                             chunksize=chunk_size):
+        # Inner join with orders (like the notebook)
+        chunk = chunk[chunk['order_id'].isin(order_state.index)]
+        product = products.reindex(chunk['product_id'].to_numpy())
+        chunk = chunk.assign(
+            customer_state=chunk['order_id'].map(order_state).to_numpy(),
+            product_category_name_english=product['product_category_name_english'].to_numpy(),
+            product_weight_g=product['product_weight_g'].to_numpy(),
+        )
+        if len(chunk):
+            yield chunk
+
+def iter_customer_chunks(data_dir, chunk_size):
+    """
+    Raw Olist tables -> RFM table (orders streamed, see src/rfm.py).
+    The RFM table itself is one row per customer, that is the job's output size.
+    """
+    rfm = RFMEngine.from_data_dir(data_dir, chunk_size=chunk_size).to_frame()
+    for start in range(0, len(rfm), chunk_size):
+        yield rfm.iloc[start:start + chunk_size]
+
+def fit_delivery_fill_values(data_dir):
+    """
+    Training medians of the delivery model's numeric inputs, same rows as the
+    notebook (all joins incl. reviews, delivered orders, delivery_days <= 99th percentile).
+    Only for models trained before the notebook saved delivery_fill_values.json.
+    """
+    read = lambda name, **kwargs: pd.read_csv(os.path.join(data_dir, name), **kwargs)
+    df = pd.merge(read('olist_orders_dataset.csv'), read('olist_order_items_dataset.csv'), on='order_id', how='inner')
+    df = pd.merge(df, read('olist_products_dataset.csv'), on='product_id', how='left')
+    df = pd.merge(df, read('olist_order_reviews_dataset.csv', usecols=['order_id']), on='order_id', how='left')
+
+    df = df[df['order_status'] == 'delivered']
+    delivery_days = (pd.to_datetime(df['order_delivered_customer_date'], errors='coerce')
+                     - pd.to_datetime(df['order_purchase_timestamp'], errors='coerce')).dt.days
+    df = df[delivery_days <= delivery_days.quantile(0.99)]
+    return {col: float(value) for col, value in df[DELIVERY_NUMERIC].median().items()}
+
+def save_fill_values(fill_values, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(fill_values, f, indent=2)
+
+def ensure_fill_values(input_path, models_dir=MODELS_DIR):
+    """
+    Fresh checkout: models/ has the delivery model but no fill values yet.
+    The Olist data/ folder is the training data, so they are fitted from it once.
+    """
+    path = os.path.join(models_dir, DELIVERY_FILL_VALUES_FILE)
+    if os.path.exists(path) or not os.path.isdir(input_path):
+        return
+    fill_values = fit_delivery_fill_values(input_path)
+    save_fill_values(fill_values, path)
+    print(f"Delivery fill values {fill_values} -> {path}")
+
+def iter_input_chunks(job, path, chunk_size):
+    columns = JOBS[job]['columns']
+
+    # Olist data/ folder: reviews are read from their CSV, the other jobs
+    # are joined / aggregated from the raw CSVs chunk by chunk
+    if os.path.isdir(path) and job == 'reviews':
+        path = os.path.join(path, 'olist_order_reviews_dataset.csv')
+    elif os.path.isdir(path):
+        chunks = iter_delivery_chunks(path, chunk_size) if job == 'delivery' else iter_customer_chunks(path, chunk_size)
+        for chunk in chunks:
+            yield chunk[[col for col in columns if col in chunk.columns]]
+        return
+
+    required = [col for col in columns if col not in JOBS[job]['optional']]
+    for chunk in iter_file_chunks(path, columns, chunk_size):
+        missing = [col for col in required if col not in chunk.columns]
+        if missing:
+            raise ValueError(f"Input for '{job}' is missing columns: {missing}")
+        yield chunk
+
+# 3. Writing output
+def to_arrow(df, schema):
+    # Optional id columns that are not in the input are written as nulls
+    arrays = [
+        pa.array(df[field.name], type=field.type, from_pandas=True) if field.name in df.columns
+        else pa.nulls(len(df), type=field.type)
+        for field in schema
+    ]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def run_batch(job, input_path, output_path, chunk_size=50000, workers=None, models_dir=MODELS_DIR):
+    """
+    Scores input_path chunk by chunk in a process pool. Chunks are written
+    in input order; at most 2 chunks per worker are in flight.
+    """
+    workers = workers or os.cpu_count() or 1
+    schema = JOBS[job]['schema']
+    if job == 'delivery':
+        ensure_fill_values(input_path, models_dir)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = f"{output_path}.tmp"
+
+    rows = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(models_dir, job)) as pool, \
+            pq.ParquetWriter(tmp_path, schema, compression='snappy') as writer:
+        pending = deque()
+
+        def write_oldest():
+            table = to_arrow(pending.popleft().result(), schema)
+            writer.write_table(table)
+            return table.num_rows
+
+        for chunk in iter_input_chunks(job, input_path, chunk_size):
+            pending.append(pool.submit(score_chunk, job, chunk))
+            if len(pending) >= 2 * workers:
+                rows += write_oldest()
+        while pending:
+            rows += write_oldest()
+
+    # Readers never see a half written file
+    os.replace(tmp_path, output_path)
+
+    seconds = time.perf_counter() - started
+    print(f"{job}: scored {rows} rows in {seconds:.1f}s ({rows / max(seconds, 1e-9):.0f} rows/s) -> {output_path}")
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch scoring for Olist models")
+    parser.add_argument('job', choices=sorted(JOBS) + ['fill-values'])
+    parser.add_argument('--input', required=True, help="CSV / Parquet file, or the Olist data/ folder")
+    parser.add_argument('--output', required=True, help="Parquet file to write (fill-values: JSON file)")
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    args = parser.parse_args(argv)
+
+    if args.job == 'fill-values':
+        fill_values = fit_delivery_fill_values(args.input)
+        save_fill_values(fill_values, args.output)
+        print(f"Delivery fill values {fill_values} -> {args.output}")
+        return
+
+    run_batch(args.job, args.input, args.output, chunk_size=args.chunk_size,
+              workers=args.workers, models_dir=args.models_dir)
+
+if __name__ == '__main__':
+    main()
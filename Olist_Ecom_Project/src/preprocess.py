@@ -1,5 +1,15 @@
-import re
+import os
 import string
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Built once: newline -> space, digits and punctuation removed
+# (same characters the old re.sub passes handled)
+CLEAN_TABLE = str.maketrans(
+    {'\n': ' ', **{ch: None for ch in string.digits + string.punctuation}}
+)
 
 def clean_text(text):
     """
@@ -8,10 +18,36 @@ def clean_text(text):
     """
     if not isinstance(text, str):
         return ""
-    
-    text = text.lower()
-    text = re.sub(r'\n', ' ', text)
-    text = re.sub(r'[0-9]', '', text)
-    text = re.sub(f'[{re.escape(string.punctuation)}]', '', text)
-    
-    return text.strip()
\ No newline at end of file
+
+    return text.lower().translate(CLEAN_TABLE).strip()
+
+def clean_text_list(texts):
+    """
+    clean_text over many texts in one loop
+    """
+    table = CLEAN_TABLE
+    return [text.lower().translate(table).strip() if isinstance(text, str) else "" for text in texts]
+
+def clean_text_series(texts, n_jobs=1, min_rows_per_job=50000):
+    """
+    Bulk version of clean_text for a pandas Series / list / array.
+    Output is exactly clean_text applied to every value (Series keeps its index).
+
+    n_jobs > 1 (or -1 for all cores) splits big inputs across processes.
+    """
+    index = texts.index if isinstance(texts, pd.Series) else None
+    values = texts.tolist() if hasattr(texts, 'tolist') else list(texts)
+
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    # Small inputs: sending them to processes costs more than cleaning them
+    n_jobs = max(1, min(n_jobs, len(values) // min_rows_per_job))
+
+    if n_jobs == 1:
+        cleaned = clean_text_list(values)
+    else:
+        parts = [part.tolist() for part in np.array_split(np.asarray(values, dtype=object), n_jobs)]
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            cleaned = [text for part in pool.map(clean_text_list, parts) for text in part]
+
+    return pd.Series(cleaned, index=index, dtype=object)
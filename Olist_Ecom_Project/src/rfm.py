@@ -0,0 +1,224 @@
+"""
+RFM features (Recency, Frequency, Monetary) from raw Olist order data.
+
+Same aggregation as the notebook that trained rfm_scaler + customer_segmentation:
+delivered orders x order items, grouped by customer_unique_id
+    Recency   = days between last purchase and newest purchase in the data
+    Frequency = number of order items
+    Monetary  = sum of item price
+
+Row selection differs on purpose. The notebook builds RFM from df_clean, which
+also drops orders slower than the 99th percentile of delivery_days. That is a
+quantile over the whole history: every new day would move it and change rows
+that were counted before, so it can't be kept as running totals and is left
+out here. The notebook's df also has one row per item x review (left join with
+reviews); here every order item is counted once.
+
+Order files are read in chunks and only per-customer running totals are kept
+(last purchase, item count, total spent) plus the ids of counted orders, so new
+days of orders can be added later with update() without reading the history
+again. Orders that were already counted are skipped, so overlapping files
+(e.g. a full re-export) don't add anything twice.
+
+Example (from project root):
+    python -m src.rfm --data-dir data/ --state outputs/rfm_state.parquet --output outputs/rfm.parquet
+    python -m src.batch_score customers --input outputs/rfm.parquet --output outputs/customer_segments.parquet
+"""
+import os
+import argparse
+
+import pandas as pd
+
+RFM_COLUMNS = ['Recency', 'Frequency', 'Monetary']
+
+ORDERS_FILE = 'olist_orders_dataset.csv'
+ITEMS_FILE = 'olist_order_items_dataset.csv'
+CUSTOMERS_FILE = 'olist_customers_dataset.csv'
+
+ID_COLUMNS = {'order_id', 'customer_id', 'customer_unique_id'}
+
+def read_chunks(path, columns, chunk_size):
+    dtype = {col: 'string' for col in columns if col in ID_COLUMNS}
+    return pd.read_csv(path, usecols=columns, chunksize=chunk_size, dtype=dtype)
+
+def seen_orders_path(state_path):
+    # Counted order ids are saved next to the state file
+    return f"{os.path.splitext(state_path)[0]}_orders.parquet"
+
+class RFMEngine:
+    """
+    state: one row per customer_unique_id -> last_purchase, Frequency, Monetary
+    seen_orders: order_ids already added to the state (skipped by update())
+    An order and its items must come in the same update() call.
+    """
+    def __init__(self, state=None, seen_orders=None):
+        if state is None:
+            state = pd.DataFrame({
+                'last_purchase': pd.Series(dtype='datetime64[ns]'),
+                'Frequency': pd.Series(dtype='int64'),
+                'Monetary': pd.Series(dtype='float64'),
+            })
+            state.index = pd.Index([], dtype='string', name='customer_unique_id')
+        self.state = state
+        self.seen_orders = set(seen_orders) if seen_orders is not None else set()
+
+    # 1. Building / updating
+    def read_new_orders(self, orders_path, chunk_size):
+        """
+        Delivered orders (like training data) that are not counted yet:
+        order_id -> customer_id, purchase
+        """
+        orders = []
+        for chunk in read_chunks(orders_path, ['order_id', 'customer_id', 'order_status', 'order_purchase_timestamp'], chunk_size):
+            chunk = chunk[(chunk['order_status'] == 'delivered') & ~chunk['order_id'].isin(self.seen_orders)]
+            orders.append(pd.DataFrame({
+                'customer_id': chunk['customer_id'].to_numpy(),
+                'purchase': pd.to_datetime(chunk['order_purchase_timestamp'], errors='coerce').to_numpy(),
+            }, index=chunk['order_id'].to_numpy()))
+        if not orders:
+            return None
+        orders = pd.concat(orders)
+        return orders[~orders.index.duplicated()]
+
+    def read_customer_map(self, customers_path, customer_ids, chunk_size):
+        """
+        customer_id (one per order) -> customer_unique_id (one per person),
+        only for the customers of the new orders
+        """
+        customer_map = pd.concat([
+            chunk[chunk['customer_id'].isin(customer_ids)].set_index('customer_id')['customer_unique_id']
+            for chunk in read_chunks(customers_path, ['customer_id', 'customer_unique_id'], chunk_size)
+        ])
+        return customer_map[~customer_map.index.duplicated()]
+
+    def update(self, orders_path, items_path, customers_path, chunk_size=100000):
+        """
+        Adds new orders (with their items and customers) to the running totals.
+        Only orders not counted before are kept in memory (not the history).
+        """
+        orders = self.read_new_orders(orders_path, chunk_size)
+        if orders is None or orders.empty:
+            return self
+
+        customer_map = self.read_customer_map(customers_path, set(orders['customer_id'].unique()), chunk_size)
+        orders['customer_unique_id'] = orders['customer_id'].map(customer_map)
+        orders = orders.loc[orders['customer_unique_id'].notna(), ['customer_unique_id', 'purchase']]
+
+        # Items: join to their order, then totals per customer for each chunk
+        partials = []
+        counted = set()
+        for chunk in read_chunks(items_path, ['order_id', 'price'], chunk_size):
+            joined = orders.reindex(chunk['order_id'].to_numpy())
+            joined['price'] = chunk['price'].to_numpy('float64')
+            joined = joined[joined['customer_unique_id'].notna()]
+            counted.update(joined.index)
+            partials.append(joined.groupby('customer_unique_id').agg(
+                last_purchase=('purchase', 'max'),
+                Frequency=('price', 'size'),
+                Monetary=('price', 'sum'),
+            ))
+
+        self.add_totals(partials)
+        self.seen_orders.update(counted)
+        return self
+
+    def add_totals(self, partials):
+        """
+        Merges per-customer totals into the state (max date, summed counts / money)
+        """
+        combined = pd.concat([self.state] + list(partials))
+        combined.index = combined.index.astype('string')
+        self.state = combined.groupby(level=0).agg(
+            {'last_purchase': 'max', 'Frequency': 'sum', 'Monetary': 'sum'}
+        ).rename_axis('customer_unique_id')
+
+    @classmethod
+    def from_data_dir(cls, data_dir, chunk_size=100000):
+        return cls().update(
+            os.path.join(data_dir, ORDERS_FILE),
+            os.path.join(data_dir, ITEMS_FILE),
+            os.path.join(data_dir, CUSTOMERS_FILE),
+            chunk_size=chunk_size,
+        )
+
+    # 2. Output
+    def to_frame(self, reference_date=None):
+        """
+        Columnar RFM table for all customers:
+        customer_id, Recency, Frequency, Monetary (input columns of rfm_scaler)
+        """
+        if reference_date is None:
+            reference_date = self.state['last_purchase'].max()
+        reference_date = pd.Timestamp(reference_date)
+
+        return pd.DataFrame({
+            'customer_id': self.state.index.to_numpy(),
+            'Recency': (reference_date - self.state['last_purchase']).dt.days.to_numpy(),
+            'Frequency': self.state['Frequency'].to_numpy(),
+            'Monetary': self.state['Monetary'].to_numpy(),
+        })
+
+    def segment(self, scaler, kmeans, reference_date=None):
+        """
+        All customers through rfm_scaler + customer_segmentation at once
+        """
+        rfm = self.to_frame(reference_date)
+        rfm['cluster'] = kmeans.predict(scaler.transform(rfm[RFM_COLUMNS].astype('float64')))
+        return rfm
+
+    # 3. Saving state between runs
+    def save(self, path):
+        """
+        Running totals -> path, counted order ids -> <path>_orders.parquet
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        orders_path = seen_orders_path(path)
+        seen = pd.DataFrame({'order_id': pd.Series(sorted(self.seen_orders), dtype='string')})
+        seen.to_parquet(f"{orders_path}.tmp", index=False)
+        self.state.reset_index().to_parquet(f"{path}.tmp", index=False)
+        os.replace(f"{orders_path}.tmp", orders_path)
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, path):
+        state = pd.read_parquet(path)
+        state['customer_unique_id'] = state['customer_unique_id'].astype('string')
+
+        orders_path = seen_orders_path(path)
+        if not os.path.exists(orders_path):
+            raise FileNotFoundError(
+                f"{orders_path} not found: without the counted order ids, updates could add orders twice. "
+                f"Rebuild the state from the full data instead."
+            )
+        seen_orders = pd.read_parquet(orders_path)['order_id'].tolist()
+        return cls(state.set_index('customer_unique_id'), seen_orders)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build / update RFM features from raw Olist orders")
+    parser.add_argument('--data-dir', default='data', help="Folder with the Olist CSVs")
+    parser.add_argument('--orders', help=f"Orders CSV (default: <data-dir>/{ORDERS_FILE})")
+    parser.add_argument('--items', help=f"Order items CSV (default: <data-dir>/{ITEMS_FILE})")
+    parser.add_argument('--customers', help=f"Customers CSV (default: <data-dir>/{CUSTOMERS_FILE})")
+    parser.add_argument('--state', help="Running totals Parquet: loaded if it exists, saved after update")
+    parser.add_argument('--output', help="RFM table Parquet (input for batch_score customers)")
+    parser.add_argument('--chunk-size', type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    engine = RFMEngine.load(args.state) if args.state and os.path.exists(args.state) else RFMEngine()
+    engine.update(
+        args.orders or os.path.join(args.data_dir, ORDERS_FILE),
+        args.items or os.path.join(args.data_dir, ITEMS_FILE),
+        args.customers or os.path.join(args.data_dir, CUSTOMERS_FILE),
+        chunk_size=args.chunk_size,
+    )
+    if args.state:
+        engine.save(args.state)
+
+    rfm = engine.to_frame()
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        rfm.to_parquet(args.output, index=False)
+    print(f"RFM features for {len(rfm)} customers")
+
+if __name__ == '__main__':
+    main()
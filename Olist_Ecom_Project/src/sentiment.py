@@ -0,0 +1,70 @@
+"""
+Review sentiment scoring: clean_text -> tfidf_vectorizer -> sentiment_model.
+
+One predict_proba call gives label, probability and confidence together
+(no separate predict call), and the TF-IDF matrix stays sparse the whole way.
+"""
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from src.preprocess import clean_text, clean_text_series
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
+
+class SentimentScorer:
+    """
+    score(texts)     -> DataFrame with label / positive_probability / confidence
+    score_one(text)  -> dict with the same keys
+    Label 1 = positive review (3-5 stars), 0 = negative (1-2 stars).
+    """
+    def __init__(self, vectorizer, model):
+        self.vectorizer = vectorizer
+        self.model = model
+        self.positive_col = list(model.classes_).index(1)
+
+    @classmethod
+    def from_models_dir(cls, models_dir=MODELS_DIR):
+        return cls(
+            vectorizer=joblib.load(os.path.join(models_dir, 'tfidf_vectorizer.pkl')),
+            model=joblib.load(os.path.join(models_dir, 'sentiment_model.pkl')),
+        )
+
+    def vectorize(self, texts, clean=True):
+        cleaned = clean_text_series(texts) if clean else texts
+        X = self.vectorizer.transform(cleaned)
+        # Sparse CSR in, sparse dot product inside the model (never densified)
+        return X if sparse.isspmatrix_csr(X) else sparse.csr_matrix(X)
+
+    def predict_arrays(self, X):
+        """
+        One predict_proba pass -> (labels, positive probabilities, confidences)
+        """
+        proba = self.model.predict_proba(X)
+        best = proba.argmax(axis=1)
+        return self.model.classes_[best], proba[:, self.positive_col], proba[np.arange(len(proba)), best]
+
+    def score(self, texts, clean=True):
+        """
+        texts: list / Series / array of raw review texts (clean=False if already cleaned)
+        """
+        index = texts.index if isinstance(texts, pd.Series) else None
+        labels, positive, confidence = self.predict_arrays(self.vectorize(texts, clean=clean))
+        return pd.DataFrame({
+            'label': labels.astype('int8'),
+            'positive_probability': positive,
+            'confidence': confidence,
+        }, index=index)
+
+    def score_one(self, text, clean=True):
+        # No Series / DataFrame for a single text (Streamlit page)
+        X = self.vectorizer.transform([clean_text(text) if clean else text])
+        labels, positive, confidence = self.predict_arrays(X)
+        return {
+            'label': int(labels[0]),
+            'positive_probability': float(positive[0]),
+            'confidence': float(confidence[0]),
+        }
@@ -0,0 +1,200 @@
+"""
+Translation layer for review text.
+
+The sentiment model was trained on Portuguese reviews, so other languages are
+translated to Portuguese first. Translations are kept in a SQLite file so the
+same text is never sent to the translation service twice, and text that
+already looks Portuguese is not translated at all.
+"""
+import os
+import re
+import sqlite3
+import hashlib
+import threading
+
+CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache', 'translations.sqlite')
+
+# Common Portuguese words. Words that are also English or Spanish words
+# ("do", "da", "um", "os", "na", "com", "dos", "nada", "porque", ...) are left out,
+# otherwise short English / Spanish reviews would be taken for Portuguese.
+PORTUGUESE_WORDS = {
+    'não', 'nao', 'muito', 'muita', 'produto', 'produtos', 'entrega', 'entregue', 'chegou', 'prazo', 'recomendo',
+    'bom', 'ótimo', 'otimo', 'péssimo', 'pessimo', 'ainda', 'veio', 'comprei', 'recebi', 'loja', 'qualidade',
+    'até', 'uma', 'pra', 'foi', 'é', 'já', 'tudo', 'também', 'tambem', 'mais', 'pedido', 'gostei', 'obrigado',
+    'obrigada', 'estou', 'você', 'voce', 'ele', 'isso', 'esse', 'essa', 'meu', 'minha', 'agora', 'então', 'mesmo',
+    'nem', 'sem', 'ao', 'pelo', 'pela', 'seu', 'sua', 'ótima', 'otima', 'defeito', 'atraso',
+}
+# Letters that (almost) only Portuguese uses
+PORTUGUESE_CHARS = re.compile(r'[ãõç]')
+WORD_PATTERN = re.compile(r'\w+')
+
+def looks_portuguese(text, min_share=0.3):
+    """
+    Cheap language check: ã / õ / ç, or enough common Portuguese words
+    """
+    text = text.lower()
+    if PORTUGUESE_CHARS.search(text):
+        return True
+    words = WORD_PATTERN.findall(text)
+    if not words:
+        return False
+    return sum(word in PORTUGUESE_WORDS for word in words) / len(words) >= min_share
+
+# 1. Backends: translate_batch(texts, source, target) -> list of texts
+class GoogleBackend:
+    """
+    Google Translate through deep_translator (needs network)
+    """
+    name = 'google'
+    cacheable = True
+
+    def translate_batch(self, texts, source, target):
+        from deep_translator import GoogleTranslator
+
+        translator = GoogleTranslator(source=source, target=target)
+        return [translator.translate(text) for text in texts]
+
+class NoOpBackend:
+    """
+    Returns text unchanged. For offline use and reviews already in Portuguese.
+    """
+    name = 'none'
+    cacheable = False
+
+    def translate_batch(self, texts, source, target):
+        return list(texts)
+
+BACKENDS = {'google': GoogleBackend, 'none': NoOpBackend}
+
+# 2. Persistent cache
+class TranslationCache:
+    """
+    SQLite table: hash(source, target, text) -> translated text
+    """
+    def __init__(self, path=CACHE_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS translations "
+            "(key TEXT PRIMARY KEY, source TEXT, target TEXT, translated TEXT NOT NULL)"
+        )
+        self._connection.commit()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(text, source, target):
+        return hashlib.sha256(f"{source}\x00{target}\x00{text}".encode('utf-8')).hexdigest()
+
+    def get_many(self, keys, batch_size=500):
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), batch_size):
+                part = keys[start:start + batch_size]
+                rows = self._connection.execute(
+                    f"SELECT key, translated FROM translations WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def set_many(self, entries):
+        """
+        entries: list of (key, source, target, translated)
+        """
+        with self._lock:
+            self._connection.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?)", entries)
+            self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+# 3. Translator
+class Translator:
+    """
+    translate() for one text, translate_many() for bulk jobs.
+    Order: skip Portuguese -> cache -> backend (only unique misses, in batches).
+    If the backend fails, the original text is returned and `failed` goes up
+    (set raise_errors=True to get the exception instead).
+    """
+    def __init__(self, backend='google', source='auto', target='pt', cache_path=CACHE_PATH,
+                 detector=looks_portuguese, batch_size=50, raise_errors=False):
+        self.backend = BACKENDS[backend]() if isinstance(backend, str) else backend
+        self.source = source
+        self.target = target
+        self.cache = TranslationCache(cache_path) if cache_path else None
+        self.detector = detector
+        self.batch_size = batch_size
+        self.raise_errors = raise_errors
+
+        self.skipped = 0
+        self.cache_hits = 0
+        self.translated = 0
+        self.failed = 0
+
+    def needs_translation(self, text):
+        if not isinstance(text, str) or not text.strip():
+            return False
+        if self.source == self.target:
+            return False
+        if self.target == 'pt' and self.detector is not None and self.detector(text):
+            return False
+        return True
+
+    def translate(self, text):
+        return self.translate_many([text])[0]
+
+    def translate_many(self, texts):
+        results = list(texts)
+        todo = [i for i, text in enumerate(results) if self.needs_translation(text)]
+        self.skipped += len(results) - len(todo)
+        if not todo:
+            return results
+
+        # Same text only once per call
+        positions = {}
+        for i in todo:
+            positions.setdefault(results[i], []).append(i)
+        keys = {text: TranslationCache.make_key(text, self.source, self.target) for text in positions}
+
+        cached = self.cache.get_many(list(keys.values())) if self.cache is not None else {}
+        misses = []
+        for text, key in keys.items():
+            if key in cached:
+                self.cache_hits += len(positions[text])
+                for i in positions[text]:
+                    results[i] = cached[key]
+            else:
+                misses.append(text)
+
+        for start in range(0, len(misses), self.batch_size):
+            batch = misses[start:start + self.batch_size]
+            try:
+                translated = self.backend.translate_batch(batch, self.source, self.target)
+            except Exception:
+                if self.raise_errors:
+                    raise
+                # Keep original text, page / job still gets an answer
+                self.failed += sum(len(positions[text]) for text in batch)
+                continue
+
+            entries = []
+            for text, translated_text in zip(batch, translated):
+                translated_text = translated_text if isinstance(translated_text, str) else text
+                self.translated += len(positions[text])
+                for i in positions[text]:
+                    results[i] = translated_text
+                entries.append((keys[text], self.source, self.target, translated_text))
+            if self.cache is not None and self.backend.cacheable:
+                self.cache.set_many(entries)
+
+        return results
+
+    def stats(self):
+        return {
+            'backend': self.backend.name,
+            'skipped': self.skipped,
+            'cache_hits': self.cache_hits,
+            'translated': self.translated,
+            'failed': self.failed,
+        }
@@ -0,0 +1,179 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from threadpoolctl import threadpool_info, threadpool_limits
+
+from src import batch_score
+from src.batch_score import run_batch, iter_delivery_chunks, delivery_features, load_models, save_fill_values
+from src.sentiment import SentimentScorer
+
+MODELS_DIR = batch_score.MODELS_DIR
+FILL_VALUES = {'freight_value': 16.5, 'product_weight_g': 750.0, 'price': 89.9}
+
+def make_data_dir(folder, n_orders=600, seed=0):
+    """
+    Small fake Olist data/ folder (same files and columns as the real one)
+    """
+    rng = np.random.default_rng(seed)
+    order_ids = [f"o{i:04d}" for i in range(n_orders)]
+    customer_ids = [f"c{i:04d}" for i in range(n_orders)]
+    product_ids = [f"p{i:03d}" for i in range(80)]
+
+    orders = pd.DataFrame({
+        'order_id': order_ids,
+        'customer_id': customer_ids,
+        'order_status': rng.choice(['delivered', 'delivered', 'shipped'], n_orders),
+        'order_purchase_timestamp': (pd.Timestamp('2018-01-01') + pd.to_timedelta(rng.integers(0, 200, n_orders), unit='D')).astype(str),
+    })
+    orders['order_delivered_customer_date'] = (pd.to_datetime(orders['order_purchase_timestamp'])
+                                               + pd.to_timedelta(rng.integers(2, 40, n_orders), unit='D')).astype(str)
+    customers = pd.DataFrame({
+        'customer_id': customer_ids,
+        'customer_unique_id': [f"u{i:03d}" for i in rng.integers(0, 300, n_orders)],
+        'customer_state': rng.choice(['SP', 'RJ', 'MG', 'RS', 'BA'], n_orders),
+    })
+    products = pd.DataFrame({
+        'product_id': product_ids,
+        'product_category_name': rng.choice(['cama_mesa_banho', 'beleza_saude', 'esporte_lazer', None], len(product_ids)),
+        'product_weight_g': np.where(rng.random(len(product_ids)) < 0.1, np.nan, rng.integers(100, 5000, len(product_ids))),
+    })
+    translation = pd.DataFrame({
+        'product_category_name': ['cama_mesa_banho', 'beleza_saude', 'esporte_lazer'],
+        'product_category_name_english': ['bed_bath_table', 'health_beauty', 'sports_leisure'],
+    })
+    n_items = rng.integers(1, 3, n_orders)
+    items = pd.DataFrame({
+        'order_id': np.repeat(order_ids, n_items),
+        'order_item_id': np.concatenate([np.arange(1, n + 1) for n in n_items]),
+        'product_id': rng.choice(product_ids, n_items.sum()),
+        'price': rng.uniform(10, 400, n_items.sum()).round(2),
+        'freight_value': rng.uniform(5, 40, n_items.sum()).round(2),
+    })
+    # Item of an order missing from the orders file: dropped like the notebook's inner join
+    items.loc[len(items)] = ['o9999', 1, 'p000', 10.0, 5.0]
+    reviews = pd.DataFrame({
+        'review_id': [f"r{i:04d}" for i in range(200)],
+        'order_id': rng.choice(order_ids, 200),
+        'review_comment_message': rng.choice(['produto chegou antes do prazo', 'não recomendo, veio quebrado', None], 200),
+    })
+
+    os.makedirs(folder, exist_ok=True)
+    orders.to_csv(os.path.join(folder, 'olist_orders_dataset.csv'), index=False)
+    customers.to_csv(os.path.join(folder, 'olist_customers_dataset.csv'), index=False)
+    products.to_csv(os.path.join(folder, 'olist_products_dataset.csv'), index=False)
+    translation.to_csv(os.path.join(folder, 'product_category_name_translation.csv'), index=False)
+    items.to_csv(os.path.join(folder, 'olist_order_items_dataset.csv'), index=False)
+    reviews.to_csv(os.path.join(folder, 'olist_order_reviews_dataset.csv'), index=False)
+    return folder
+
+def models_with_fill_values(folder):
+    models_dir = os.path.join(folder, 'models')
+    shutil.copytree(MODELS_DIR, models_dir)
+    save_fill_values(FILL_VALUES, os.path.join(models_dir, batch_score.DELIVERY_FILL_VALUES_FILE))
+    return models_dir
+
+def test_delivery_chunks_match_notebook_join():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = make_data_dir(tmp_dir)
+        read = lambda name: pd.read_csv(os.path.join(data_dir, name))
+
+        # Notebook joins (in memory) vs streamed items + lookups
+        expected = pd.merge(read('olist_orders_dataset.csv'), read('olist_order_items_dataset.csv'), on='order_id', how='inner')
+        expected = pd.merge(expected, read('olist_products_dataset.csv'), on='product_id', how='left')
+        expected = pd.merge(expected, read('product_category_name_translation.csv'), on='product_category_name', how='left')
+        expected = pd.merge(expected, read('olist_customers_dataset.csv'), on='customer_id', how='left')
+        streamed = pd.concat(iter_delivery_chunks(data_dir, chunk_size=97))
+
+        columns = ['order_id', 'order_item_id', 'price', 'freight_value', 'product_weight_g',
+                   'customer_state', 'product_category_name_english']
+        sort = lambda df: df[columns].sort_values(['order_id', 'order_item_id']).reset_index(drop=True)
+        pd.testing.assert_frame_equal(sort(streamed), sort(expected), check_dtype=False)
+
+def test_fill_values_come_from_artifact():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        models_dir = models_with_fill_values(tmp_dir)
+        models = load_models(models_dir, 'delivery')
+        assert models['delivery_fill_values'] == FILL_VALUES
+
+        chunk = pd.DataFrame({
+            'freight_value': [10.0], 'product_weight_g': [np.nan], 'price': [50.0],
+            'customer_state': ['SP'], 'product_category_name_english': [None],
+        })
+        X = delivery_features(chunk, models['delivery'].feature_names_in_, models['delivery_fill_values'])
+        assert X['product_weight_g'].iloc[0] == FILL_VALUES['product_weight_g']
+
+        # No artifact -> clear error instead of a guessed value
+        os.remove(os.path.join(models_dir, batch_score.DELIVERY_FILL_VALUES_FILE))
+        try:
+            load_models(models_dir, 'delivery')
+        except FileNotFoundError as e:
+            assert 'fill-values' in str(e)
+        else:
+            raise AssertionError("missing delivery_fill_values.json must raise")
+
+def test_batch_jobs_on_data_dir():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = make_data_dir(os.path.join(tmp_dir, 'data'))
+        models_dir = models_with_fill_values(tmp_dir)
+
+        # Reviews: same numbers as scoring in this process
+        rows = run_batch('reviews', data_dir, os.path.join(tmp_dir, 'reviews.parquet'),
+                         chunk_size=64, workers=2, models_dir=models_dir)
+        scored = pd.read_parquet(os.path.join(tmp_dir, 'reviews.parquet'))
+        reviews = pd.read_csv(os.path.join(data_dir, 'olist_order_reviews_dataset.csv'))
+        expected = SentimentScorer.from_models_dir(models_dir).score(reviews['review_comment_message'])
+        assert rows == len(reviews)
+        assert scored['review_id'].tolist() == reviews['review_id'].tolist()
+        assert np.allclose(scored['positive_probability'], expected['positive_probability'], atol=1e-6)
+
+        # Delivery: one row per item of a known order, in input order
+        rows = run_batch('delivery', data_dir, os.path.join(tmp_dir, 'delivery.parquet'),
+                         chunk_size=100, workers=2, models_dir=models_dir)
+        scored = pd.read_parquet(os.path.join(tmp_dir, 'delivery.parquet'))
+        assert rows == len(pd.read_csv(os.path.join(data_dir, 'olist_order_items_dataset.csv'))) - 1
+        assert scored['late_probability'].between(0, 1).all()
+
+        # Customers: one row per person
+        rows = run_batch('customers', data_dir, os.path.join(tmp_dir, 'customers.parquet'),
+                         chunk_size=100, workers=2, models_dir=models_dir)
+        scored = pd.read_parquet(os.path.join(tmp_dir, 'customers.parquet'))
+        assert rows == scored['customer_id'].nunique()
+        assert scored['segment'].notna().all()
+
+def test_delivery_fits_missing_fill_values_from_data_dir():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = make_data_dir(os.path.join(tmp_dir, 'data'))
+        models_dir = os.path.join(tmp_dir, 'models')
+        shutil.copytree(MODELS_DIR, models_dir)
+        fill_values_path = os.path.join(models_dir, batch_score.DELIVERY_FILL_VALUES_FILE)
+        if os.path.exists(fill_values_path):
+            os.remove(fill_values_path)
+
+        # Fresh checkout: no fill values yet, the data/ folder is the training data
+        run_batch('delivery', data_dir, os.path.join(tmp_dir, 'delivery.parquet'),
+                  chunk_size=100, workers=1, models_dir=models_dir)
+        assert load_models(models_dir, 'delivery')['delivery_fill_values'] == batch_score.fit_delivery_fill_values(data_dir)
+
+def worker_thread_limits():
+    return {pool['internal_api']: pool['num_threads'] for pool in threadpool_info()}
+
+def test_worker_uses_one_thread():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        models_dir = models_with_fill_values(tmp_dir)
+        # Parent allows more threads, worker must still end up with 1
+        with threadpool_limits(limits=2), ProcessPoolExecutor(max_workers=1, initializer=batch_score.init_worker,
+                                                              initargs=(models_dir, 'reviews')) as pool:
+            limits = pool.submit(worker_thread_limits).result()
+        assert limits and all(threads == 1 for threads in limits.values()), limits
+
+if __name__ == "__main__":
+    test_delivery_chunks_match_notebook_join()
+    test_fill_values_come_from_artifact()
+    test_batch_jobs_on_data_dir()
+    test_delivery_fits_missing_fill_values_from_data_dir()
+    test_worker_uses_one_thread()
+    print("Batch scoring: streamed joins / fill values / jobs / worker threads checks passed")
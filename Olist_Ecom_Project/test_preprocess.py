@@ -0,0 +1,56 @@
+import re
+import string
+import time
+import random
+
+import numpy as np
+import pandas as pd
+
+from src.preprocess import clean_text, clean_text_series
+
+def old_clean_text(text):
+    # Previous implementation (3 re.sub passes), kept here as reference
+    if not isinstance(text, str):
+        return ""
+
+    text = text.lower()
+    text = re.sub(r'\n', ' ', text)
+    text = re.sub(r'[0-9]', '', text)
+    text = re.sub(f'[{re.escape(string.punctuation)}]', '', text)
+
+    return text.strip()
+
+# Fake Reviews: Portuguese words, accents, digits, punctuation, newlines, odd whitespace
+random.seed(42)
+pieces = ['Produto', 'chegou', 'ANTES', 'do', 'prazo', 'não', 'recomendo', 'ótimo', 'péssimo', 'Ç', 'İ', 'ß',
+          '10/10', 'R$ 59,90', '!!!', '...', '\n', '\r\n', '\t', ' ', ' ', '٣', '½', '😀', '“aspas”', '-', '_']
+texts = [''.join(random.choice(pieces) + random.choice([' ', '', '\n']) for _ in range(random.randint(0, 15)))
+         for _ in range(20000)]
+texts += [None, np.nan, 123, 4.5, '', '   ', '\n\n', string.punctuation, string.digits]
+series = pd.Series(texts, index=range(100, 100 + len(texts)))
+
+expected = [old_clean_text(text) for text in texts]
+
+# 1. Single text
+assert [clean_text(text) for text in texts] == expected
+print("clean_text matches old implementation")
+
+# 2. Bulk (one process / many processes)
+for n_jobs in (1, 2):
+    result = clean_text_series(series, n_jobs=n_jobs, min_rows_per_job=1000)
+    assert result.tolist() == expected
+    assert result.index.equals(series.index)
+    assert clean_text_series(np.array(texts, dtype=object), n_jobs=n_jobs, min_rows_per_job=1000).tolist() == expected
+print("clean_text_series matches old implementation")
+
+# 3. Speed
+big = pd.Series(texts * 10)
+start = time.perf_counter()
+big.apply(old_clean_text)
+old_seconds = time.perf_counter() - start
+
+start = time.perf_counter()
+clean_text_series(big)
+new_seconds = time.perf_counter() - start
+
+print(f"{len(big)} reviews: old {old_seconds:.2f}s, new {new_seconds:.2f}s ({old_seconds / new_seconds:.1f}x faster)")
@@ -0,0 +1,88 @@
+import tempfile
+import os
+
+from src.translation import looks_portuguese, Translator
+
+ENGLISH = [
+    "Do not buy",
+    "The product arrived late and broken",
+    "Great quality, fast delivery",
+    "I am very happy with it, will buy again",
+    "Da best seller, um, OK I guess",
+    "Com on, the box was empty",
+]
+SPANISH = [
+    "El producto llegó muy rápido",
+    "No lo recomiendo, nada bueno",
+    "Todo bien, gracias",
+    "Porque es muy malo",
+    "Dos unidades y las dos rotas",
+    "Excelente",
+]
+PORTUGUESE = [
+    "Produto chegou antes do prazo",
+    "Não recomendo",
+    "muito bom",
+    "Gostei muito do produto, entrega rápida",
+    "Ótimo produto",
+    "Veio com defeito",
+    "Recebi tudo certinho, obrigado",
+]
+
+def test_language_detection():
+    for text in ENGLISH + SPANISH:
+        assert not looks_portuguese(text), text
+    for text in PORTUGUESE:
+        assert looks_portuguese(text), text
+
+class UpperBackend:
+    '''
+    Stand-in "translation service": upper-cases text, counts calls
+    '''
+    name = 'upper'
+    cacheable = True
+
+    def __init__(self):
+        self.calls = 0
+
+    def translate_batch(self, texts, source, target):
+        self.calls += 1
+        return [text.upper() for text in texts]
+
+def test_translator_skips_portuguese_and_caches():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache_path = os.path.join(tmp_dir, 'translations.sqlite')
+        backend = UpperBackend()
+        translator = Translator(backend=backend, cache_path=cache_path)
+
+        texts = ENGLISH + SPANISH + PORTUGUESE + ENGLISH
+        result = translator.translate_many(texts)
+
+        # Portuguese untouched, everything else translated once per unique text (one batch)
+        assert result == [text.upper() for text in ENGLISH + SPANISH] + PORTUGUESE + [text.upper() for text in ENGLISH]
+        assert backend.calls == 1
+        assert translator.stats()['skipped'] == len(PORTUGUESE)
+
+        # New Translator, same cache file: no backend call
+        backend_2 = UpperBackend()
+        translator_2 = Translator(backend=backend_2, cache_path=cache_path)
+        assert translator_2.translate("Do not buy") == "DO NOT BUY"
+        assert backend_2.calls == 0 and translator_2.cache_hits == 1
+
+def test_failed_backend_keeps_text():
+    class BrokenBackend:
+        name = 'broken'
+        cacheable = True
+
+        def translate_batch(self, texts, source, target):
+            raise ConnectionError("no network")
+
+    translator = Translator(backend=BrokenBackend(), cache_path=None)
+    assert translator.translate("Do not buy") == "Do not buy"
+    assert translator.failed == 1
+
+if __name__ == '__main__':
+    test_language_detection()
+    test_translator_skips_portuguese_and_caches()
+    test_failed_backend_keeps_text()
+    print("Translation: language detection / cache / fallback checks passed")